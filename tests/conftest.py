@@ -0,0 +1,222 @@
+import os
+
+import pytest
+
+from tests.plugins.collection_index import CollectionIndex
+from tests.plugins.covering_arrays import report_covering_arrays
+from tests.plugins.fixture_profiling import FixtureProfiler
+from tests.plugins.fork_isolation import ForkServer
+from tests.plugins.import_profiling import ImportProfiler
+from tests.plugins.log_pipeline import LogPipeline
+from tests.plugins.memory_profiling import MemoryProfiler
+from tests.plugins.parallel_scheduler import ScopeScheduler
+from tests.plugins.result_cache import ResultCache
+from tests.plugins.sharding import Sharding, shard_spec
+from tests.plugins.shared_fixtures import SharedFixtures
+
+pytest_plugins = ["pytester", "tests.plugins.bench"]
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("performance")
+    group.addoption(
+        "--fixture-profile",
+        action="store_true",
+        help="Report the setup and teardown cost of every fixture.",
+    )
+    group.addoption(
+        "--fixture-profile-memory",
+        action="store_true",
+        help="Also record peak memory of fixture setup (implies --fixture-profile).",
+    )
+    group.addoption(
+        "--memory-profile",
+        action="store_true",
+        help="Report the peak and retained memory of every test and fixture leaks.",
+    )
+    group.addoption(
+        "--memory-profile-json",
+        metavar="PATH",
+        help="Write the memory profile as JSON to PATH (implies --memory-profile).",
+    )
+    group.addoption(
+        "--log-jsonl",
+        metavar="PATH",
+        help="Write log records as JSON lines to PATH from a background thread.",
+    )
+    group.addoption(
+        "--import-profile",
+        action="store_true",
+        help="Report the collection time of every test module and dependency.",
+    )
+    group.addoption(
+        "--startup-budget",
+        type=float,
+        metavar="SECONDS",
+        help="Fail the run when collection takes longer than SECONDS "
+        "(implies --import-profile).",
+    )
+    group.addoption(
+        "--bench-save",
+        metavar="PATH",
+        help="Save the results of the bench fixture as a JSON baseline to PATH.",
+    )
+    group.addoption(
+        "--bench-compare",
+        metavar="PATH",
+        help="Fail benchmarks that are significantly slower than the baseline "
+        "in PATH.",
+    )
+    group.addoption(
+        "--collection-index",
+        action="store_true",
+        help="Skip importing unchanged test modules without tests selected by "
+        "-k or -m.",
+    )
+    group.addoption(
+        "--no-result-cache",
+        action="store_true",
+        help="Run the tests marked as pure even when their result is cached.",
+    )
+    group.addoption(
+        "--workers",
+        type=int,
+        metavar="N",
+        help="Run the tests in N processes, grouped by their scoped fixtures.",
+    )
+    group.addoption(
+        "--shard",
+        type=shard_spec,
+        metavar="INDEX/COUNT",
+        help="Only run shard INDEX of COUNT shards balanced by duration, like 2/4.",
+    )
+    group.addoption(
+        "--shard-durations",
+        metavar="PATH",
+        help="Balance the shards with the durations of a merged shard report.",
+    )
+    group.addoption(
+        "--shard-report",
+        metavar="PATH",
+        help="Write the outcome and duration of every test of the shard to PATH.",
+    )
+    group.addoption(
+        "--isolate",
+        action="store_true",
+        help="Run every test in a forked child process, not only the ones "
+        "marked as isolated.",
+    )
+    group.addoption(
+        "--isolate-preload",
+        metavar="MODULES",
+        default="",
+        help="Comma separated modules to import before forking isolated tests.",
+    )
+    group.addoption(
+        "--run-benchmarks",
+        action="store_true",
+        help="Run the tests marked with @pytest.mark.benchmark.",
+    )
+
+
+def pytest_configure(config):
+    if config.getoption("workers") is not None and config.getoption("workers") <= 0:
+        raise pytest.UsageError("--workers must be a positive number")
+    if config.getoption("workers"):
+        # These profilers measure in the process running the tests, their
+        # results would stay behind in the workers.
+        for option in (
+            "--fixture-profile",
+            "--fixture-profile-memory",
+            "--memory-profile",
+            "--memory-profile-json",
+        ):
+            if config.getoption(option):
+                raise pytest.UsageError(f"{option} cannot be combined with --workers")
+    config.addinivalue_line(
+        "markers", "benchmark: slow benchmark, only runs with --run-benchmarks"
+    )
+    config.addinivalue_line(
+        "markers", "covering(array): cases generated by covering_parametrize"
+    )
+    # Registered even when their plugin is not, so --strict-markers accepts
+    # them with -p no:cacheprovider or on systems without fork.
+    config.addinivalue_line(
+        "markers",
+        "pure: the outcome only depends on the source, the result is cached",
+    )
+    config.addinivalue_line(
+        "markers", "isolated: run the test in a forked child process"
+    )
+    if config.getoption("fixture_profile_memory") and (
+        config.getoption("memory_profile") or config.getoption("memory_profile_json")
+    ):
+        # Both restart tracemalloc, each would reset the other's measurements.
+        raise pytest.UsageError(
+            "--fixture-profile-memory cannot be combined with --memory-profile"
+        )
+    if config.getoption("fixture_profile") or config.getoption(
+        "fixture_profile_memory"
+    ):
+        config.pluginmanager.register(
+            FixtureProfiler(trace_memory=config.getoption("fixture_profile_memory")),
+            "fixture-profiler",
+        )
+    if config.getoption("memory_profile") or config.getoption("memory_profile_json"):
+        config.pluginmanager.register(
+            MemoryProfiler(output=config.getoption("memory_profile_json")),
+            "memory-profiler",
+        )
+    if config.getoption("import_profile") or config.getoption("startup_budget"):
+        profiler = ImportProfiler(budget=config.getoption("startup_budget"))
+        config.pluginmanager.register(profiler, "import-profiler")
+    if config.getoption("collection_index"):
+        if not config.pluginmanager.has_plugin("cacheprovider"):
+            raise pytest.UsageError(
+                "--collection-index stores its index in the pytest cache and "
+                "cannot be combined with -p no:cacheprovider"
+            )
+        config.pluginmanager.register(CollectionIndex(), "collection-index")
+    if config.pluginmanager.has_plugin("cacheprovider"):
+        enabled = not config.getoption("no_result_cache")
+        config.pluginmanager.register(ResultCache(enabled), "result-cache")
+    if config.getoption("workers"):
+        config.pluginmanager.register(
+            ScopeScheduler(config.getoption("workers")), "scope-scheduler"
+        )
+    if config.getoption("shard"):
+        config.pluginmanager.register(
+            Sharding(
+                *config.getoption("shard"),
+                durations=config.getoption("shard_durations"),
+                report=config.getoption("shard_report"),
+            ),
+            "sharding",
+        )
+    if hasattr(os, "fork"):
+        preload = config.getoption("isolate_preload")
+        config.pluginmanager.register(
+            ForkServer(
+                isolate_all=config.getoption("isolate"),
+                preload=[name for name in preload.split(",") if name],
+            ),
+            "fork-server",
+        )
+        config.pluginmanager.register(SharedFixtures(), "shared-fixtures")
+    if config.getoption("log_jsonl"):
+        pipeline = LogPipeline(config.getoption("log_jsonl"))
+        pipeline.start()
+        config.add_cleanup(pipeline.stop)
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("run_benchmarks"):
+        return
+    skip_benchmark = pytest.mark.skip(reason="needs --run-benchmarks to run")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip_benchmark)
+
+
+def pytest_report_collectionfinish(config, items):
+    return report_covering_arrays(items)
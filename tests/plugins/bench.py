@@ -0,0 +1,289 @@
+import json
+import math
+import os
+import statistics
+import time
+from dataclasses import dataclass, field
+
+import pytest
+
+
+@dataclass
+class BenchStats:
+    """
+    The timings of one benchmark, in seconds per call.
+
+    `samples` holds the time per call of every round, after outliers further
+    than 1.5 IQR from the quartiles were removed.
+    """
+
+    name: str
+    samples: list
+    iterations: int
+    outliers: int = 0
+    baseline: "BenchStats | None" = field(default=None, repr=False)
+    p_value: float | None = None
+
+    @property
+    def min(self):
+        return min(self.samples)
+
+    @property
+    def median(self):
+        return statistics.median(self.samples)
+
+    @property
+    def iqr(self):
+        if len(self.samples) < 2:
+            return 0.0
+        q1, _, q3 = statistics.quantiles(self.samples, n=4)
+        return q3 - q1
+
+    @property
+    def ops(self):
+        return 1 / self.median if self.median else math.inf
+
+    @property
+    def change(self):
+        """
+        The relative change of the median against the baseline.
+        """
+        if self.baseline is None:
+            return None
+        return self.median / self.baseline.median - 1
+
+    def to_json(self):
+        return {"samples": self.samples, "iterations": self.iterations}
+
+
+def without_outliers(samples):
+    """
+    Return `samples` without the values further than 1.5 IQR from the
+    quartiles.
+    """
+    if len(samples) < 4:
+        return samples
+    q1, _, q3 = statistics.quantiles(samples, n=4)
+    low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    return [sample for sample in samples if low <= sample <= high]
+
+
+def slower_p_value(samples, baseline):
+    """
+    Return the one-sided p-value of the Mann-Whitney U test that `samples` are
+    slower than `baseline`, using the normal approximation.
+
+    The test only compares the ranks of the samples, so a few outliers on
+    either side do not distort it like they would a comparison of means.
+    """
+    n1, n2 = len(samples), len(baseline)
+    ranked = sorted(
+        [(value, 0) for value in samples] + [(value, 1) for value in baseline]
+    )
+    ranks = {}
+    position = 0
+    while position < len(ranked):
+        end = position
+        while end < len(ranked) and ranked[end][0] == ranked[position][0]:
+            end += 1
+        # Ties share the average of their ranks.
+        ranks[ranked[position][0]] = (position + end + 1) / 2
+        position = end
+    u = sum(ranks[value] for value in samples) - n1 * (n1 + 1) / 2
+    mean = n1 * n2 / 2
+    deviation = math.sqrt(n1 * n2 * (n1 + n2 + 1) / 12)
+    if deviation == 0:
+        return 1.0
+    return 0.5 * math.erfc((u - mean) / deviation / math.sqrt(2))
+
+
+class Benchmark:
+    """
+    Times a callable, the object provided by the `bench` fixture.
+
+    Calling it first runs the callable for `warmup` seconds, then calibrates
+    the number of iterations per round so that a round takes at least
+    `round_time` seconds, which keeps the timer resolution out of the result,
+    and finally times `rounds` rounds.
+
+    When a baseline is loaded, the run fails if the median got more than
+    `threshold` slower and the Mann-Whitney U test says the slowdown is
+    significant at level `alpha`.
+
+    With a `node` the results are also stored in its `bench` user properties.
+    """
+
+    def __init__(
+        self,
+        name,
+        recorder,
+        rounds=20,
+        round_time=0.002,
+        warmup=0.01,
+        threshold=0.1,
+        alpha=0.01,
+        node=None,
+    ):
+        self.name = name
+        self.recorder = recorder
+        self.node = node
+        self.rounds = rounds
+        self.round_time = round_time
+        self.warmup = warmup
+        self.threshold = threshold
+        self.alpha = alpha
+
+    def _time(self, function, args, kwargs, iterations):
+        timer = time.perf_counter
+        start = timer()
+        for _ in range(iterations):
+            function(*args, **kwargs)
+        return timer() - start
+
+    def __call__(self, function, *args, name=None, **kwargs):
+        """
+        Benchmark `function(*args, **kwargs)` and return its `BenchStats`.
+
+        Use `name` to tell apart several benchmarks in the same test.
+        """
+        end = time.perf_counter() + self.warmup
+        while time.perf_counter() < end:
+            function(*args, **kwargs)
+
+        iterations = 1
+        while self._time(function, args, kwargs, iterations) < self.round_time:
+            iterations *= 2
+
+        samples = [
+            self._time(function, args, kwargs, iterations) / iterations
+            for _ in range(self.rounds)
+        ]
+        kept = without_outliers(samples)
+        stats = BenchStats(
+            name=f"{self.name}[{name}]" if name else self.name,
+            samples=kept,
+            iterations=iterations,
+            outliers=len(samples) - len(kept),
+        )
+        self.recorder.record(stats)
+        if self.node is not None:
+            # Travels with the reports, so results from --workers are recorded
+            # by the main process too.
+            self.node.user_properties.append(
+                ("bench", {"name": stats.name, **stats.to_json()})
+            )
+        self.check(stats)
+        return stats
+
+    def check(self, stats):
+        """
+        Fail if `stats` is a significant regression against its baseline.
+        """
+        if stats.baseline is None:
+            return
+        stats.p_value = slower_p_value(stats.samples, stats.baseline.samples)
+        if stats.change > self.threshold and stats.p_value < self.alpha:
+            pytest.fail(
+                f"{stats.name} regressed: median {stats.median * 1e6:.3f}us, "
+                f"{stats.change:+.1%} against the baseline "
+                f"(p={stats.p_value:.2g})",
+                pytrace=False,
+            )
+
+
+class BenchRecorder:
+    """
+    A pytest plugin that collects the results of the `bench` fixture.
+
+    The results are reported at the end of the run. With `save` they are
+    written to a JSON file, which can be passed as `compare` to a later run
+    to use it as the baseline. This module registers one with the paths of
+    `--bench-save` and `--bench-compare` when it is loaded as a plugin, like
+    `conftest.py` does with `pytest_plugins`.
+
+    Results are also picked up from the `bench` user property of the reports,
+    which is how the results of tests run by `--workers` reach the main
+    process.
+    """
+
+    def __init__(self, save=None, compare=None):
+        self.save = save
+        self.results = {}
+        self.baseline = {}
+        if compare:
+            with open(compare) as f:
+                self.baseline = {
+                    name: BenchStats(name, entry["samples"], entry["iterations"])
+                    for name, entry in json.load(f).items()
+                }
+
+    def record(self, stats):
+        stats.baseline = self.baseline.get(stats.name)
+        self.results[stats.name] = stats
+
+    def pytest_runtest_logreport(self, report):
+        for name, value in report.user_properties:
+            if name == "bench" and value["name"] not in self.results:
+                self.record(
+                    BenchStats(value["name"], value["samples"], value["iterations"])
+                )
+
+    def pytest_sessionfinish(self, session):
+        if not self.save or not self.results:
+            return
+        saved = {}
+        if os.path.exists(self.save):
+            with open(self.save) as f:
+                saved = json.load(f)
+        saved.update({name: stats.to_json() for name, stats in self.results.items()})
+        with open(self.save, "w") as f:
+            json.dump(saved, f, indent=2)
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if not self.results:
+            return
+        terminalreporter.write_sep("=", "benchmarks")
+        width = max(len(name) for name in self.results)
+        terminalreporter.write_line(
+            f"{'benchmark':<{width}} {'min us':>9} {'median us':>9} {'IQR us':>9} "
+            f"{'ops/s':>12} {'change':>8}"
+        )
+        for name, stats in self.results.items():
+            change = "" if stats.change is None else f"{stats.change:+.1%}"
+            terminalreporter.write_line(
+                f"{name:<{width}} {stats.min * 1e6:>9.3f} {stats.median * 1e6:>9.3f} "
+                f"{stats.iqr * 1e6:>9.3f} {stats.ops:>12,.0f} {change:>8}"
+            )
+
+
+def pytest_configure(config):
+    # Recorders passed to `pytest.main(plugins=[...])` take precedence.
+    if not any(
+        isinstance(plugin, BenchRecorder)
+        for plugin in config.pluginmanager.get_plugins()
+    ):
+        config.pluginmanager.register(
+            BenchRecorder(
+                save=config.getoption("bench_save", None),
+                compare=config.getoption("bench_compare", None),
+            ),
+            "bench-recorder",
+        )
+
+
+@pytest.fixture
+def bench(request):
+    """
+    Provide a `Benchmark` named after the test, recording to the registered
+    `BenchRecorder`.
+    """
+    recorders = [
+        plugin
+        for plugin in request.config.pluginmanager.get_plugins()
+        if isinstance(plugin, BenchRecorder)
+    ]
+    return Benchmark(
+        request.node.nodeid,
+        recorders[0] if recorders else BenchRecorder(),
+        node=request.node,
+    )
@@ -0,0 +1,218 @@
+import collections
+import hashlib
+import sys
+import types
+
+import pytest
+from _pytest.mark import KeywordMatcher
+from _pytest.mark.expression import Expression
+
+_MISSING = object()
+
+
+def _marks(item):
+    # Only the keyword arguments -m can compare against are stored.
+    return [
+        {
+            "name": mark.name,
+            "kwargs": {
+                key: value
+                for key, value in mark.kwargs.items()
+                if value is None or isinstance(value, (str, int, bool))
+            },
+        }
+        for mark in item.iter_markers()
+    ]
+
+
+def _mark_matcher(marks):
+    def matcher(name, /, **kwargs):
+        return any(
+            mark["name"] == name
+            and all(mark["kwargs"].get(key, _MISSING) == v for key, v in kwargs.items())
+            for mark in marks
+        )
+
+    return matcher
+
+
+def _relative(path, rootpath):
+    try:
+        return path.relative_to(rootpath).as_posix()
+    except ValueError:
+        return None
+
+
+def local_dependencies(module, rootpath, transitive=False):
+    """
+    Return the files the collected `module` depends on, relative to `rootpath`.
+
+    These are the module itself, the `conftest.py` files above it and the local
+    modules it imports, or imports names from. With `transitive` the local
+    modules imported by those modules are followed as well, so a change
+    anywhere in the chain of local imports changes the result.
+    """
+    path = module.path
+    files = {_relative(path, rootpath)}
+    for directory in path.parents:
+        if _relative(directory, rootpath) is None:
+            break
+        if (directory / "conftest.py").exists():
+            files.add(_relative(directory / "conftest.py", rootpath))
+    pending = [module.obj]
+    while pending:
+        for value in vars(pending.pop()).values():
+            if not isinstance(value, types.ModuleType):
+                value = sys.modules.get(getattr(value, "__module__", None) or "")
+            filename = getattr(value, "__file__", None)
+            if not filename:
+                continue
+            relative = _relative(type(path)(filename), rootpath)
+            if (
+                relative is not None
+                and relative.endswith(".py")
+                and "site-packages" not in relative.split("/")
+                and relative not in files
+            ):
+                files.add(relative)
+                if transitive:
+                    pending.append(value)
+    return files
+
+
+class CollectionIndex:
+    """
+    A pytest plugin that keeps an index of the collected tests on disk, so
+    modules without selected tests do not have to be imported again.
+
+    For every test module the index stores the node IDs of its tests, including
+    every parametrize expansion, with their keywords and markers. The entry is
+    keyed by a hash of the module and of the files it depends on, which are the
+    `conftest.py` files above it and the local modules it imports from.
+
+    When the run is filtered with `-k` or `-m`, a module whose entry is still
+    valid and contains no matching test is skipped without importing it.
+    Modules that changed, or that contain a matching test, are collected as
+    usual and their entry is refreshed. Selecting a node ID like
+    `tests/test_mocking.py::TestMockingApi` already only imports that module.
+
+    Register it with `--collection-index`, or pass an instance to
+    `pytest.main(plugins=[...])`. The index is stored in the pytest cache, so
+    it cannot be combined with `-p no:cacheprovider`.
+
+    Matching `-k` and `-m` against stored entries uses `KeywordMatcher` and
+    `Expression` from `_pytest.mark`, the private classes pytest itself uses
+    for those options. Reimplementing the expression grammar would be the
+    only public alternative, and could silently select different tests than
+    pytest does. If a pytest release moves them, the import fails loudly
+    when the conftest is loaded instead of skipping modules wrongly.
+    """
+
+    KEY = "collection-index/v1"
+
+    def __init__(self):
+        self.entries = {}
+        self.skipped = []
+        self._config = None
+        self._hashes = {}
+        self._failed = set()
+
+    def pytest_sessionstart(self, session):
+        self._config = session.config
+        self.entries = session.config.cache.get(self.KEY, {})
+
+    def _hash(self, relative):
+        if relative not in self._hashes:
+            try:
+                content = (self._config.rootpath / relative).read_bytes()
+                self._hashes[relative] = hashlib.blake2b(content).hexdigest()
+            except OSError:
+                self._hashes[relative] = None
+        return self._hashes[relative]
+
+    def _relative(self, path):
+        return _relative(path, self._config.rootpath)
+
+    def select(self, keyword=None, markexpr=None):
+        """
+        Return the node IDs in the index matching `-k keyword` and `-m markexpr`,
+        without importing anything.
+        """
+        return [
+            item["nodeid"]
+            for entry in self.entries.values()
+            for item in entry["items"]
+            if self._selected(item, keyword, markexpr)
+        ]
+
+    @staticmethod
+    def _selected(item, keyword, markexpr):
+        if keyword and not Expression.compile(keyword).evaluate(
+            KeywordMatcher(set(item["keywords"]))
+        ):
+            return False
+        if markexpr and not Expression.compile(markexpr).evaluate(
+            _mark_matcher(item["marks"])
+        ):
+            return False
+        return True
+
+    def pytest_ignore_collect(self, collection_path, config):
+        keyword = config.option.keyword.lstrip()
+        markexpr = config.option.markexpr
+        if collection_path.suffix != ".py" or not (keyword or markexpr):
+            return None
+        entry = self.entries.get(self._relative(collection_path))
+        if entry is None or any(
+            self._hash(relative) != digest
+            for relative, digest in entry["files"].items()
+        ):
+            return None
+        if any(self._selected(item, keyword, markexpr) for item in entry["items"]):
+            return None
+        self.skipped.append(collection_path)
+        return True
+
+    def pytest_collectreport(self, report):
+        if report.failed:
+            self._failed.add(report.nodeid.split("::")[0])
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_collection_modifyitems(self, items):
+        # Runs before -k and -m deselect anything, so the whole module is seen.
+        modules = collections.defaultdict(list)
+        for item in items:
+            module = item.getparent(pytest.Module)
+            if module is not None:
+                modules[module].append(item)
+
+        for module, module_items in modules.items():
+            relative = self._relative(module.path)
+            if relative is None or relative in self._failed:
+                continue
+            self.entries[relative] = {
+                "files": {
+                    dependency: self._hash(dependency)
+                    for dependency in sorted(
+                        local_dependencies(module, self._config.rootpath)
+                    )
+                },
+                "items": [
+                    {
+                        "nodeid": item.nodeid,
+                        "keywords": sorted(KeywordMatcher.from_item(item)._names),
+                        "marks": _marks(item),
+                    }
+                    for item in module_items
+                ],
+            }
+
+    def pytest_sessionfinish(self, session):
+        session.config.cache.set(self.KEY, self.entries)
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if self.skipped:
+            terminalreporter.write_line(
+                f"collection index: skipped {len(self.skipped)} unchanged modules "
+                "without selected tests"
+            )
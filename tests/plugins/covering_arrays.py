@@ -0,0 +1,216 @@
+import functools
+import itertools
+import math
+import random
+from dataclasses import dataclass
+
+import pytest
+
+
+@dataclass
+class CoveringArray:
+    """
+    Test cases covering every combination of `strength` argument values.
+
+    `cases` are tuples of values in the order of `argnames`, and `full_size` is
+    the number of cases in the full cartesian product.
+    """
+
+    argnames: list
+    cases: list
+    full_size: int
+    strength: int
+    seed: int
+
+    @property
+    def summary(self):
+        return (
+            f"{len(self.cases)} of {self.full_size} combinations "
+            f"({self.strength}-wise, seed {self.seed})"
+        )
+
+
+def covering_array(domains, strength=2, pinned=(), seed=0, candidates=20):
+    """
+    Generate a small set of cases in which every combination of `strength`
+    argument values appears at least once.
+
+    Stacked `parametrize` decorators run the full cartesian product, which
+    grows with the product of the domain sizes. Most bugs are triggered by
+    the interaction of one or two arguments, and a pairwise covering array
+    checks every pair of values in a number of cases that only grows with the
+    square of the largest domain.
+
+    The cases are built greedily, like AETG: every new case is the best of a
+    few random candidates, each filled in one argument at a time with the value
+    that covers the most missing combinations. The same `seed` always gives
+    the same cases, and the cases are only generated once per process for the
+    same domain sizes, `strength`, `pinned` cases and `seed`.
+
+    Args:
+        domains: A dictionary from argument name to the list of its values.
+        strength: The number of arguments whose combinations are all covered,
+            2 for pairwise.
+        pinned: Cases that must be included, as dictionaries from argument
+            name to value. Missing arguments are filled in like any other case.
+        seed: Seed of the random number generator.
+        candidates: The number of candidates to choose each case from.
+    """
+    argnames = list(domains)
+    sizes = [len(domains[name]) for name in argnames]
+    strength = min(strength, len(argnames))
+    pinned_rows = []
+    for case in pinned:
+        unknown = set(case) - set(argnames)
+        if unknown:
+            raise ValueError(f"Pinned case has unknown arguments {sorted(unknown)}")
+        row = []
+        for name in argnames:
+            if name not in case:
+                row.append(None)
+            elif case[name] not in domains[name]:
+                raise ValueError(
+                    f"Pinned value {case[name]!r} of {name!r} is not one of "
+                    f"its values {domains[name]!r}"
+                )
+            else:
+                row.append(domains[name].index(case[name]))
+        pinned_rows.append(tuple(row))
+
+    rows = _covering_rows(tuple(sizes), strength, tuple(pinned_rows), seed, candidates)
+    return CoveringArray(
+        argnames=argnames,
+        cases=[tuple(domains[n][v] for n, v in zip(argnames, row)) for row in rows],
+        full_size=math.prod(sizes),
+        strength=strength,
+        seed=seed,
+    )
+
+
+@functools.cache
+def _covering_rows(sizes, strength, pinned, seed, candidates):
+    # Values are tracked by their index in the domain, so unhashable values
+    # like lists are supported and the rows can be cached for every set of
+    # domains of the same sizes.
+    rng = random.Random(seed)
+
+    combos = list(itertools.combinations(range(len(sizes)), strength))
+    combos_by_argument = {
+        i: [combo for combo in combos if i in combo] for i in range(len(sizes))
+    }
+    uncovered = {
+        (combo, values)
+        for combo in combos
+        for values in itertools.product(*(range(sizes[i]) for i in combo))
+    }
+
+    def newly_covered(row, combos):
+        return {
+            (combo, tuple(row[i] for i in combo))
+            for combo in combos
+            if all(row[i] is not None for i in combo)
+        } & uncovered
+
+    def complete(row):
+        order = [i for i, value in enumerate(row) if value is None]
+        rng.shuffle(order)
+        for i in order:
+            scores = []
+            for value in range(sizes[i]):
+                row[i] = value
+                scores.append(
+                    (
+                        len(newly_covered(row, combos_by_argument[i])),
+                        rng.random(),
+                        value,
+                    )
+                )
+            row[i] = max(scores)[2]
+        return row
+
+    rows = []
+    for case in pinned:
+        rows.append(complete(list(case)))
+        uncovered -= newly_covered(rows[-1], combos)
+
+    # Sorted once, covered combinations are skipped and only dropped from the
+    # pool when they make up half of it, instead of sorting for every row.
+    pool = sorted(uncovered)
+    first = 0
+    while uncovered:
+        if len(pool) > 2 * len(uncovered):
+            pool = [missing for missing in pool if missing in uncovered]
+            first = 0
+        while pool[first] not in uncovered:
+            first += 1
+        # The first candidate starts from the smallest missing combination,
+        # the others from random ones.
+        best = None
+        for candidate in range(candidates):
+            combo, values = pool[first]
+            if candidate:
+                combo, values = rng.choice(pool)
+                while (combo, values) not in uncovered:
+                    combo, values = rng.choice(pool)
+            row = [None] * len(sizes)
+            for i, value in zip(combo, values):
+                row[i] = value
+            row = complete(row)
+            covered = newly_covered(row, combos)
+            if best is None or len(covered) > len(best[1]):
+                best = row, covered
+        rows.append(best[0])
+        uncovered -= best[1]
+
+    return tuple(tuple(row) for row in rows)
+
+
+def covering_parametrize(domains, strength=2, pinned=(), seed=0):
+    """
+    Parametrize a test with a `covering_array` of `domains`, a replacement for
+    stacked `parametrize` decorators.
+
+    The number of cases next to the size of the full product is shown in the
+    header of the run, and the array itself is attached to the test as the
+    `covering` marker.
+    """
+    array = covering_array(domains, strength, pinned, seed)
+
+    def decorator(function):
+        function = pytest.mark.parametrize(array.argnames, array.cases)(function)
+        return pytest.mark.covering(array)(function)
+
+    return decorator
+
+
+def report_covering_arrays(items):
+    """
+    Return one line per test parametrized with `covering_parametrize`, with
+    the number of cases next to the size of the full product.
+    """
+    lines = {}
+    for item in items:
+        marker = item.get_closest_marker("covering")
+        if marker is not None:
+            name = item.nodeid.split("[")[0]
+            lines[name] = f"covering array {name}: {marker.args[0].summary}"
+    return list(lines.values())
+
+
+def uncovered_combinations(array, domains):
+    """
+    Return the `strength`-wise value combinations missing from `array`.
+    """
+    indexed = [
+        tuple(domains[name].index(value) for name, value in zip(array.argnames, case))
+        for case in array.cases
+    ]
+    missing = set()
+    for combo in itertools.combinations(range(len(array.argnames)), array.strength):
+        seen = {tuple(row[i] for i in combo) for row in indexed}
+        for values in itertools.product(
+            *(range(len(domains[array.argnames[i]])) for i in combo)
+        ):
+            if values not in seen:
+                missing.add((combo, values))
+    return missing
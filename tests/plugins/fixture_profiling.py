@@ -0,0 +1,184 @@
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+
+import pytest
+
+SCOPES = ["function", "class", "module", "package", "session"]
+
+
+@dataclass
+class FixtureStats:
+    """
+    Collected measurements for a single fixture definition.
+
+    `name` is the name of the fixture prefixed with the node ID of where it is
+    defined, like `test_fixtures.py::shopping_cart` or `.::number` for the
+    root `conftest.py`, or the bare name for fixtures of plugins, so fixtures
+    that override each other are measured separately. `dependencies` are the
+    names of the fixtures it requested, in the same form.
+
+    Times are wall clock seconds and include the setup of any fixture that is
+    requested dynamically with `request.getfixturevalue` from inside the body.
+    """
+
+    name: str
+    scope: str
+    argnames: tuple = ()
+    dependencies: tuple = ()
+    setups: int = 0
+    setup_time: float = 0.0
+    teardown_time: float = 0.0
+    peak_memory: int = 0
+    fingerprints: set = field(default_factory=set)
+    mutated: bool = False
+    failed: bool = False
+    teardown_started: float | None = field(default=None, repr=False)
+
+    @property
+    def total_time(self):
+        return self.setup_time + self.teardown_time
+
+
+class FixtureProfiler:
+    """
+    A pytest plugin that measures the cost of every fixture setup and teardown.
+
+    Register it with `--fixture-profile` (and `--fixture-profile-memory` to also
+    record peak memory with `tracemalloc`), or pass an instance to
+    `pytest.main(plugins=[...])`. A ranked report is printed at the end of the
+    run, listing the fixtures that cost the most in total together with the
+    fixtures that look safe to promote to a broader scope.
+    """
+
+    def __init__(self, trace_memory=False, limit=10):
+        self.trace_memory = trace_memory
+        self.limit = limit
+        self.stats = {}
+        self._started_tracemalloc = False
+        # The last definition set up for every fixture name, which is the one
+        # the fixtures set up after it depend on.
+        self._latest = {}
+
+    def pytest_configure(self, config):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def pytest_unconfigure(self, config):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_fixture_setup(self, fixturedef, request):
+        name = _fixture_name(fixturedef)
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = FixtureStats(
+                name,
+                fixturedef.scope,
+                tuple(fixturedef.argnames),
+                # The dependencies are set up before the fixture itself.
+                tuple(self._latest.get(argname) for argname in fixturedef.argnames),
+            )
+        self._latest[fixturedef.argname] = name
+        stats.setups += 1
+
+        # A test may have stopped tracing, then there is nothing to read.
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            result = yield
+        except BaseException:
+            stats.failed = True
+            raise
+        finally:
+            stats.setup_time += time.perf_counter() - start
+            if tracing and tracemalloc.is_tracing():
+                peak = tracemalloc.get_traced_memory()[1] - baseline
+                stats.peak_memory = max(stats.peak_memory, peak)
+
+        fingerprint = _fingerprint(result)
+        stats.fingerprints.add(fingerprint)
+
+        def start_teardown():
+            # Finalizers run last-in first-out, so this runs right before the
+            # fixture's own teardown and pytest_fixture_post_finalizer runs after.
+            if _fingerprint(result) != fingerprint:
+                stats.mutated = True
+            stats.teardown_started = time.perf_counter()
+
+        fixturedef.addfinalizer(start_teardown)
+        return result
+
+    def pytest_fixture_post_finalizer(self, fixturedef, request):
+        stats = self.stats.get(_fixture_name(fixturedef))
+        if stats is not None and stats.teardown_started is not None:
+            stats.teardown_time += time.perf_counter() - stats.teardown_started
+            stats.teardown_started = None
+
+    def ranked(self):
+        """
+        Return the collected stats ordered by total cost, most expensive first.
+        """
+        return sorted(self.stats.values(), key=lambda s: s.total_time, reverse=True)
+
+    def promotion_advice(self, stats):
+        """
+        Return the broadest scope the fixture can safely be promoted to, or None.
+
+        A fixture is a candidate when it is function scoped, was rebuilt more than
+        once, always produced an equal value, was never mutated by a test and only
+        depends on fixtures with a broader scope than function. The suggested
+        scope is the narrowest scope among those dependencies.
+        """
+        if stats.scope != "function" or stats.setups < 2 or stats.failed:
+            return None
+        if stats.mutated or len(stats.fingerprints) != 1:
+            return None
+
+        target = "session"
+        for name in stats.dependencies:
+            dependency = self.stats.get(name)
+            if dependency is None or dependency.scope == "function":
+                return None
+            target = min(target, dependency.scope, key=SCOPES.index)
+        return target
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if not self.stats:
+            return
+        terminalreporter.write_sep("=", "fixture profile")
+        ranked = self.ranked()[: self.limit]
+        # Names include the node ID of the definition, fit the longest one.
+        width = max(32, *(len(stats.name) for stats in ranked))
+        terminalreporter.write_line(
+            f"{'fixture':<{width}} {'scope':<9} {'setups':>6} {'setup s':>9} "
+            f"{'teardown s':>10} {'peak KiB':>9}  advice"
+        )
+        for stats in ranked:
+            advice = self.promotion_advice(stats)
+            terminalreporter.write_line(
+                f"{stats.name:<{width}} {stats.scope:<9} {stats.setups:>6} "
+                f"{stats.setup_time:>9.4f} {stats.teardown_time:>10.4f} "
+                f"{stats.peak_memory / 1024:>9.1f}  "
+                + (f"promote to scope={advice!r}" if advice else "")
+            )
+
+
+def _fixture_name(fixturedef):
+    # The same names as the fixtures of `MemoryProfiler`.
+    if fixturedef.baseid:
+        return f"{fixturedef.baseid}::{fixturedef.argname}"
+    return fixturedef.argname
+
+
+def _fingerprint(value):
+    try:
+        return repr(value)
+    except Exception:
+        return id(value)
@@ -0,0 +1,133 @@
+import importlib
+import os
+import pickle
+
+import pytest
+from _pytest.runner import runtestprotocol
+
+from tests.plugins.import_profiling import LazyModule
+
+
+class _SetUpNodes:
+    # Stands in for the next test in the child, the setup state keeps the
+    # nodes in its `listchain`.
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+    def listchain(self):
+        return self.nodes
+
+
+class ForkServer:
+    """
+    A pytest plugin that runs isolated tests in a forked child process, so
+    whatever they change in the interpreter is gone when they finish.
+
+    Mark the tests with `@pytest.mark.isolated`, or isolate every test with
+    `isolate_all`. The pytest process itself serves as the fork server: by the
+    time the first test runs it has imported pytest and every test module,
+    and before that the modules in `preload` and the modules the isolated
+    tests import with `lazy_import` are imported too. A child is forked from
+    this warm process for each isolated test, shares its memory copy-on-write,
+    and only runs the setup, call and teardown of the test. The reports are
+    sent back over a pipe and reported by the main process.
+
+    Fixtures of a wider scope that are already set up are inherited by the
+    child and used as they are, fixtures the child sets up for the first time
+    are set up again by the next test. Tests reported by `ResultCache` as
+    cached are not forked. Register it with `--isolate` and
+    `--isolate-preload`.
+    """
+
+    def __init__(self, isolate_all=False, preload=()):
+        self.isolate_all = isolate_all
+        self.preload = list(preload)
+
+    def isolated(self, item):
+        return self.isolate_all or item.get_closest_marker("isolated") is not None
+
+    def pytest_collection_finish(self, session):
+        preload = set(self.preload)
+        for item in session.items:
+            if self.isolated(item):
+                module = item.getparent(pytest.Module).obj
+                preload.update(
+                    value.__name__
+                    for value in vars(module).values()
+                    if isinstance(value, LazyModule)
+                )
+        for name in sorted(preload):
+            importlib.import_module(name)
+
+    # Not `tryfirst`, so plugins that do not run the test at all, like
+    # `ResultCache` for a cached pure test, are asked before a child is forked.
+    def pytest_runtest_protocol(self, item, nextitem):
+        if not self.isolated(item):
+            return None
+        item.ihook.pytest_runtest_logstart(nodeid=item.nodeid, location=item.location)
+        reports = self.run_forked(item)
+        # The child only tears down what it set up, the main process tears
+        # down the wider scopes the next test does not share.
+        call = pytest.CallInfo.from_call(
+            lambda: item.session._setupstate.teardown_exact(nextitem), "teardown"
+        )
+        if call.excinfo is not None or not reports or reports[-1].when != "teardown":
+            reports.append(item.ihook.pytest_runtest_makereport(item=item, call=call))
+        for report in reports:
+            item.ihook.pytest_runtest_logreport(report=report)
+        item.ihook.pytest_runtest_logfinish(nodeid=item.nodeid, location=item.location)
+        return True
+
+    def run_forked(self, item):
+        """
+        Run `item` in a forked child process and return its reports.
+        """
+        config = item.config
+        set_up = _SetUpNodes(list(item.session._setupstate.stack))
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                os.close(read_end)
+                capture = config.pluginmanager.getplugin("capturemanager")
+                if capture is not None:
+                    # The capture files are shared with the main process after
+                    # the fork, the child needs its own.
+                    capture.stop_global_capturing()
+                    capture.start_global_capturing()
+                reports = runtestprotocol(item, log=False, nextitem=set_up)
+                data = [
+                    config.hook.pytest_report_to_serializable(
+                        config=config, report=report
+                    )
+                    for report in reports
+                ]
+                with os.fdopen(write_end, "wb") as f:
+                    pickle.dump(data, f)
+                code = 0
+            finally:
+                os._exit(code)
+
+        os.close(write_end)
+        with os.fdopen(read_end, "rb") as f:
+            data = f.read()
+        _, status = os.waitpid(pid, 0)
+        if data:
+            return [
+                config.hook.pytest_report_from_serializable(config=config, data=entry)
+                for entry in pickle.loads(data)
+            ]
+        code = os.waitstatus_to_exitcode(status)
+        reason = f"killed by signal {-code}" if code < 0 else f"exited with {code}"
+        return [
+            pytest.TestReport(
+                item.nodeid,
+                item.location,
+                keywords=dict.fromkeys(item.keywords, 1),
+                outcome="failed",
+                longrepr=f"isolated test process {reason} before reporting",
+                when="call",
+            )
+        ]
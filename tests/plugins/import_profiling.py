@@ -0,0 +1,150 @@
+import builtins
+import collections
+import importlib
+import importlib.util
+import sys
+import time
+import types
+
+import pytest
+
+
+class LazyModule(types.ModuleType):
+    """
+    A stand-in for a module that is only imported on first attribute access.
+    """
+
+    def __getattr__(self, attribute):
+        # Dunder attributes are looked up by pytest on everything it collects,
+        # answering them must not import the module.
+        if attribute.startswith("__"):
+            raise AttributeError(attribute)
+        module = self.__dict__.get("_lazy_module")
+        if module is None:
+            module = self.__dict__["_lazy_module"] = importlib.import_module(
+                self.__name__
+            )
+        return getattr(module, attribute)
+
+
+def lazy_import(name):
+    """
+    Import a module lazily, it is only imported on the first attribute access.
+
+    Use it instead of a module level `import` for heavy dependencies that only
+    a few tests need, so collecting the module stays cheap:
+
+        requests = lazy_import("requests")
+
+    Attributes are looked up on the real module every time, so patches like
+    `mock.patch("requests.get")` are seen through the stand-in.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    if importlib.util.find_spec(name) is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    return LazyModule(name)
+
+
+class ImportProfiler:
+    """
+    A pytest plugin that measures what startup time is spent on.
+
+    Every test module is imported during collection, even when `-k` selects a
+    single test, so a heavy import in one module slows down every run. The
+    profiler records how long each test module took to collect, including its
+    imports, and the time spent executing each dependency, grouped by top level
+    package. Modules imported before the plugin was registered, such as those
+    imported by `conftest.py`, are not included.
+
+    With a `budget` in seconds, the run fails when the time from registering
+    the plugin to the end of collection exceeds it. Register it with
+    `--import-profile` and `--startup-budget`, or pass an instance to
+    `pytest.main(plugins=[...])`.
+    """
+
+    def __init__(self, budget=None, limit=10):
+        self.budget = budget
+        self.limit = limit
+        self.modules = {}
+        self.dependencies = collections.Counter()
+        self.startup_time = None
+        self._started = time.perf_counter()
+        self._stack = []
+        self._real_import = None
+
+    def pytest_configure(self, config):
+        self._real_import = builtins.__import__
+        builtins.__import__ = self._import
+
+    def pytest_collection_finish(self, session):
+        self._uninstall()
+        self.startup_time = time.perf_counter() - self._started
+
+    def pytest_unconfigure(self, config):
+        self._uninstall()
+
+    def _uninstall(self):
+        if self._real_import is not None:
+            builtins.__import__ = self._real_import
+            self._real_import = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._real_import(name, globals, locals, fromlist, level)
+        # Self time of a dependency excludes the nested imports of other
+        # dependencies, which are added to the stack entry of the parent.
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._real_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            self.dependencies[name.partition(".")[0]] += elapsed - nested
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_make_collect_report(self, collector):
+        if not isinstance(collector, pytest.Module):
+            return (yield)
+        start = time.perf_counter()
+        try:
+            return (yield)
+        finally:
+            self.modules[collector.nodeid] = time.perf_counter() - start
+
+    @property
+    def over_budget(self):
+        return (
+            self.budget is not None
+            and self.startup_time is not None
+            and self.startup_time > self.budget
+        )
+
+    def pytest_sessionfinish(self, session):
+        if self.over_budget and session.exitstatus == pytest.ExitCode.OK:
+            session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if self.startup_time is None:
+            return
+        terminalreporter.write_sep("=", "import profile")
+        terminalreporter.write_line(f"{'test module':<48} {'collect s':>9}")
+        ranked = sorted(self.modules.items(), key=lambda item: item[1], reverse=True)
+        for nodeid, seconds in ranked[: self.limit]:
+            terminalreporter.write_line(f"{nodeid:<48} {seconds:>9.4f}")
+        terminalreporter.write_line(f"{'dependency':<48} {'import s':>9}")
+        for package, seconds in self.dependencies.most_common(self.limit):
+            terminalreporter.write_line(f"{package:<48} {seconds:>9.4f}")
+
+        message = f"startup took {self.startup_time:.3f}s"
+        if self.budget is None:
+            terminalreporter.write_line(message)
+        elif self.over_budget:
+            terminalreporter.write_line(
+                f"{message}, over the budget of {self.budget}s", red=True
+            )
+        else:
+            terminalreporter.write_line(f"{message}, budget {self.budget}s")
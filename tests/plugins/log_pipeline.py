@@ -0,0 +1,92 @@
+import json
+import logging
+import logging.handlers
+import queue
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    Formats a record as a single line of JSON.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    A `QueueHandler` that leaves the formatting to the listener thread.
+
+    The standard `QueueHandler` formats the message before putting it on the
+    queue, so it can be sent to another process. Here the listener is a thread
+    in the same process, so the record can be passed on as it is.
+
+    !!! Note
+        Since the message is formatted later, mutable arguments that are changed
+        right after the log call are logged with their new value.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class LogPipeline:
+    """
+    Writes log records to a JSON lines file from a background thread.
+
+    The logging call in the test only checks the level and puts the record on a
+    queue, formatting and writing the file is done by a `QueueListener` thread.
+    Use %-style arguments (`logger.debug("a=%s", a)`) instead of f-strings, so
+    records that are filtered out by their level are never formatted at all.
+
+    Records below `level` are not written. While the pipeline runs, the level
+    of `logger` is lowered to `level` if it was higher, and `stop` puts the
+    previous level back.
+    """
+
+    def __init__(self, path, level=logging.INFO, logger=None):
+        self.path = path
+        self.level = level
+        self.logger = logging.getLogger(logger)
+        self._queue = queue.SimpleQueue()
+        self._handler = DeferredQueueHandler(self._queue)
+        self._handler.setLevel(level)
+        self._listener = None
+        self._previous_level = None
+
+    def start(self):
+        file_handler = logging.FileHandler(self.path, mode="a", delay=True)
+        file_handler.setFormatter(JsonLinesFormatter())
+        self._listener = logging.handlers.QueueListener(self._queue, file_handler)
+        self._listener.start()
+        self._previous_level = self.logger.level
+        if self.logger.getEffectiveLevel() > self.level:
+            self.logger.setLevel(self.level)
+        self.logger.addHandler(self._handler)
+
+    def stop(self):
+        """
+        Detach from the logger and wait until every queued record is written.
+        """
+        self.logger.removeHandler(self._handler)
+        self.logger.setLevel(self._previous_level)
+        try:
+            self._listener.stop()
+        finally:
+            for handler in self._listener.handlers:
+                handler.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,356 @@
+import contextlib
+import gc
+import json
+import os
+import sys
+import tracemalloc
+import types
+from dataclasses import asdict, dataclass, field
+from unittest import mock
+
+import pytest
+
+# Allocations made by pytest and by the profiler itself, like the reports of
+# the test, are left out of the retained memory and the allocation sites.
+IGNORED_FILES = (
+    os.path.dirname(pytest.__file__),
+    os.path.dirname(sys.modules["_pytest"].__file__),
+    os.path.dirname(sys.modules["pluggy"].__file__),
+    tracemalloc.__file__,
+    __file__,
+    "<frozen importlib._bootstrap",
+)
+
+
+@dataclass
+class TracedMemory:
+    """
+    The memory allocated inside a `traced_memory` block, in bytes.
+
+    `retained` is what was still allocated at the end of the block, `peak` the
+    highest allocation during the block, both above what was allocated when it
+    started.
+    """
+
+    retained: int = 0
+    peak: int = 0
+
+
+@contextlib.contextmanager
+def traced_memory():
+    """
+    Measure the memory allocated inside the block with `tracemalloc`.
+
+    When `tracemalloc` is already tracing, like under `--memory-profile` or
+    `--fixture-profile-memory`, the running trace is only read, not stopped,
+    so the profilers keep working for the rest of the run. Only the peak is
+    reset, like the profilers do between phases.
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    measured = TracedMemory()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    try:
+        yield measured
+    finally:
+        current, peak = tracemalloc.get_traced_memory()
+        measured.retained = current - baseline
+        measured.peak = peak - baseline
+        if started:
+            tracemalloc.stop()
+
+
+@dataclass
+class ItemMemory:
+    """
+    The memory used by a single test, in bytes.
+
+    `peaks` holds the peak allocation of the setup, call and teardown phases,
+    above what was allocated when the phase started. `retained` is what the
+    test allocated and was still allocated after its teardown, except what
+    the fixtures of a wider scope set up by the test hold, which is in
+    `scoped_fixtures`. `sites` lists where the largest part of the memory
+    left after the teardown was allocated. `rss` is the resident set size of
+    the process after the test, where available.
+    """
+
+    nodeid: str
+    peaks: dict = field(default_factory=dict)
+    retained: int = 0
+    scoped_fixtures: int = 0
+    sites: list = field(default_factory=list)
+    patches: list = field(default_factory=list)
+    rss: int | None = None
+
+    @property
+    def peak(self):
+        return max(self.peaks.values(), default=0)
+
+    def to_json(self):
+        return {**asdict(self), "peak": self.peak}
+
+
+@dataclass
+class FixtureMemory:
+    """
+    The memory used by a single fixture, in bytes.
+
+    `name` is the fixture name, prefixed with the node ID of the module or
+    class it is defined in.
+
+    `peak` is the largest peak allocation of a setup, and `held` the largest
+    amount of memory still allocated when a setup returned. For fixtures with
+    a scope wider than function, `growth` is how much larger the value got
+    between its setup and its teardown.
+    """
+
+    name: str
+    scope: str
+    setups: int = 0
+    peak: int = 0
+    held: int = 0
+    growth: int = 0
+
+
+def deep_size(value):
+    """
+    Return the size of `value` and every object it references, except
+    modules, classes and functions, in bytes.
+    """
+    seen = set()
+    size = 0
+    stack = [value]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(
+            obj, (type, types.ModuleType, types.FunctionType)
+        ):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj, 0)
+        stack.extend(gc.get_referents(obj))
+    return size
+
+
+def _rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _describe_patch(patcher):
+    if isinstance(patcher, mock._patch_dict):
+        return f"patch.dict({patcher.in_dict!r:.60})"
+    target = patcher.getter()
+    name = getattr(target, "__name__", type(target).__name__)
+    return f"patch({name}.{patcher.attribute})"
+
+
+class MemoryProfiler:
+    """
+    A pytest plugin that measures the memory every test and every fixture
+    allocates, and what they leave behind.
+
+    `tracemalloc` is restarted at the start of every test, so it only traces
+    the allocations of that test. This keeps the snapshot taken after the
+    teardown small enough to take for every test, and the allocation sites it
+    reports are the ones of the test, not of everything imported before.
+
+    Memory that outlives a test is reported as leaked: memory the test still
+    holds after its teardown, values of session and module scoped fixtures
+    that grew while tests used them, and `mock.patch` patchers started with
+    `start()` and never stopped. The results are written to a JSON file with
+    `output`, to track them across runs.
+
+    Register it with `--memory-profile` and `--memory-profile-json`. Both
+    restart `tracemalloc`, so `conftest.py` refuses to combine them with
+    `--fixture-profile-memory`.
+    """
+
+    def __init__(self, output=None, limit=10, sites=3, frames=1, threshold=64 * 1024):
+        self.output = output
+        self.limit = limit
+        self.threshold = threshold
+        self.sites = sites
+        self.frames = frames
+        self.tests = {}
+        self.fixtures = {}
+        self._current = None
+        self._phase_peak = 0
+        self._patches = []
+        self._rss_start = None
+
+    def pytest_sessionstart(self, session):
+        self._rss_start = _rss()
+
+    def pytest_unconfigure(self, config):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _phase(self, item, phase):
+        memory = self._current
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        self._phase_peak = 0
+        try:
+            return (yield)
+        finally:
+            peak = max(self._phase_peak, tracemalloc.get_traced_memory()[1])
+            memory.peaks[phase] = max(peak - baseline, 0)
+
+    @pytest.hookimpl(wrapper=True, tryfirst=True)
+    def pytest_runtest_setup(self, item):
+        # Restarting drops the traces of everything allocated so far.
+        tracemalloc.stop()
+        tracemalloc.start(self.frames)
+        self._current = self.tests[item.nodeid] = ItemMemory(item.nodeid)
+        self._patches = list(mock._patch._active_patches)
+        return (yield from self._phase(item, "setup"))
+
+    @pytest.hookimpl(wrapper=True, tryfirst=True)
+    def pytest_runtest_call(self, item):
+        return (yield from self._phase(item, "call"))
+
+    @pytest.hookimpl(wrapper=True, tryfirst=True)
+    def pytest_runtest_teardown(self, item, nextitem):
+        try:
+            return (yield from self._phase(item, "teardown"))
+        finally:
+            self._finish(self._current)
+
+    def _finish(self, memory):
+        memory.patches = [
+            _describe_patch(patcher)
+            for patcher in mock._patch._active_patches
+            if patcher not in self._patches
+        ]
+        memory.rss = _rss()
+        if not tracemalloc.is_tracing():
+            # Stopped by the test, like a nested run of pytest.
+            return
+        # Objects in reference cycles are only freed by the garbage collector,
+        # they are not retained.
+        gc.collect()
+        statistics = [
+            stat
+            for stat in tracemalloc.take_snapshot().statistics("lineno")
+            if not stat.traceback[0].filename.startswith(IGNORED_FILES)
+        ]
+        total = sum(stat.size for stat in statistics)
+        memory.retained = max(total - memory.scoped_fixtures, 0)
+        memory.sites = [
+            {"site": str(stat.traceback), "size": stat.size, "count": stat.count}
+            for stat in statistics[: self.sites]
+        ]
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_fixture_setup(self, fixturedef, request):
+        name = fixturedef.argname
+        if fixturedef.baseid:
+            name = f"{fixturedef.baseid}::{name}"
+        stats = self.fixtures.get(name)
+        if stats is None:
+            stats = self.fixtures[name] = FixtureMemory(name, fixturedef.scope)
+        stats.setups += 1
+        if not tracemalloc.is_tracing():
+            return (yield)
+
+        # The phase has a single peak, the part before the fixture is kept
+        # aside so resetting it does not lose it.
+        self._phase_peak = max(self._phase_peak, tracemalloc.get_traced_memory()[1])
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        result = yield
+        current, peak = tracemalloc.get_traced_memory()
+        stats.peak = max(stats.peak, peak - baseline)
+        stats.held = max(stats.held, current - baseline)
+
+        if fixturedef.scope == "function":
+            return result
+        if self._current is not None:
+            self._current.scoped_fixtures += current - baseline
+        # The values of the fixtures of pytest itself, like `pytestconfig`,
+        # are expected to change during the run.
+        if not fixturedef.func.__module__.startswith("_pytest"):
+            size = deep_size(result)
+
+            def measure_growth():
+                # Runs right before the fixture's own teardown.
+                stats.growth = max(stats.growth, deep_size(result) - size)
+
+            fixturedef.addfinalizer(measure_growth)
+        return result
+
+    def leaks(self):
+        """
+        Return a description of every leak found: tests that left patches
+        active, and fixtures that grew and tests that retained at least
+        `threshold` bytes.
+        """
+        found = []
+        for memory in self.tests.values():
+            for patch in memory.patches:
+                found.append(f"{memory.nodeid} left {patch} active")
+        for stats in self.fixtures.values():
+            if stats.growth >= self.threshold:
+                found.append(
+                    f"{stats.scope} fixture {stats.name} grew by "
+                    f"{stats.growth / 1024:.1f} KiB while in use"
+                )
+        for memory in sorted(self.tests.values(), key=lambda m: -m.retained):
+            if memory.retained < self.threshold:
+                break
+            site = memory.sites[0]["site"] if memory.sites else "unknown"
+            found.append(
+                f"{memory.nodeid} retained {memory.retained / 1024:.1f} KiB, "
+                f"mostly from {site}"
+            )
+        return found
+
+    def pytest_sessionfinish(self, session):
+        if not self.output:
+            return
+        with open(self.output, "w") as f:
+            json.dump(
+                {
+                    "rss": {"start": self._rss_start, "end": _rss()},
+                    "tests": {
+                        nodeid: memory.to_json()
+                        for nodeid, memory in self.tests.items()
+                    },
+                    "fixtures": {
+                        name: asdict(stats) for name, stats in self.fixtures.items()
+                    },
+                    "leaks": self.leaks(),
+                },
+                f,
+                indent=2,
+            )
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if not self.tests:
+            return
+        terminalreporter.write_sep("=", "memory profile")
+        width = max(len(nodeid) for nodeid in self.tests)
+        width = min(width, 80)
+        terminalreporter.write_line(
+            f"{'test':<{width}} {'peak KiB':>10} {'retained KiB':>12}  top site"
+        )
+        ranked = sorted(self.tests.values(), key=lambda m: m.peak, reverse=True)
+        for memory in ranked[: self.limit]:
+            site = memory.sites[0]["site"] if memory.sites else ""
+            terminalreporter.write_line(
+                f"{memory.nodeid:<{width}} {memory.peak / 1024:>10.1f} "
+                f"{memory.retained / 1024:>12.1f}  {site}"
+            )
+        leaks = self.leaks()
+        for leak in leaks[: self.limit]:
+            terminalreporter.write_line(f"leak: {leak}")
+        if len(leaks) > self.limit:
+            terminalreporter.write_line(
+                f"{len(leaks) - self.limit} more leaks, see --memory-profile-json"
+            )
@@ -0,0 +1,275 @@
+import multiprocessing
+import os
+import queue
+import statistics
+
+import pytest
+
+DEFAULT_DURATION = 0.1
+
+
+class DurationHistory:
+    """
+    The durations of previous runs, by node ID, stored in the pytest cache.
+
+    The duration of a test is the sum of its setup, call and teardown. To keep
+    a single slow run from reordering everything, a new measurement is
+    averaged with the previous one. Without the cache, with
+    `-p no:cacheprovider`, every run starts from an empty history.
+    """
+
+    KEY = "scheduler/durations"
+
+    def __init__(self, durations=None):
+        self.durations = dict(durations or {})
+        self._current = {}
+
+    @classmethod
+    def load(cls, config):
+        # Without the cacheprovider plugin there is no history to load.
+        if getattr(config, "cache", None) is None:
+            return cls()
+        return cls(config.cache.get(cls.KEY, {}))
+
+    def get(self, nodeid):
+        """
+        Return the recorded duration of `nodeid`, or the median of every
+        recorded duration for a test that never ran.
+        """
+        if nodeid in self.durations:
+            return self.durations[nodeid]
+        if self.durations:
+            return statistics.median(self.durations.values())
+        return DEFAULT_DURATION
+
+    def record(self, report):
+        self._current[report.nodeid] = (
+            self._current.get(report.nodeid, 0.0) + report.duration
+        )
+
+    def save(self, config):
+        if getattr(config, "cache", None) is None:
+            return
+        for nodeid, duration in self._current.items():
+            previous = self.durations.get(nodeid, duration)
+            self.durations[nodeid] = (previous + duration) / 2
+        config.cache.set(self.KEY, self.durations)
+
+
+def scope_key(item):
+    """
+    Return the node ID of the widest node that owns a package, module or class
+    scoped fixture used by `item`, or the node ID of `item` itself.
+
+    Tests with the same key share the fixture, so running them on the same
+    worker sets it up once. Session scoped fixtures are shared by every test,
+    so they are set up once per worker whatever the grouping.
+    """
+    scopes = {
+        fixturedefs[-1].scope
+        for fixturedefs in item._fixtureinfo.name2fixturedefs.values()
+    }
+    for scope, node_type in [
+        ("package", pytest.Package),
+        ("module", pytest.Module),
+        ("class", pytest.Class),
+    ]:
+        if scope in scopes:
+            node = item.getparent(node_type) or item.getparent(pytest.Module)
+            return node.nodeid
+    return item.nodeid
+
+
+def schedule(items, history):
+    """
+    Group `items` by `scope_key` and return the groups as lists of indexes
+    into `items`, longest first according to `history`.
+
+    Within a group the collection order is kept, so fixtures are set up and
+    torn down just like in a serial run.
+    """
+    groups = {}
+    for index, item in enumerate(items):
+        groups.setdefault(scope_key(item), []).append(index)
+    return sorted(
+        groups.values(),
+        key=lambda group: sum(history.get(items[i].nodeid) for i in group),
+        reverse=True,
+    )
+
+
+class _SessionBoundary:
+    # Stands in for the next test at the end of a group, the setup state keeps
+    # the nodes in its `listchain`.
+
+    def __init__(self, session):
+        self.session = session
+
+    def listchain(self):
+        return [self.session]
+
+
+class _ReportCollector:
+    # Collects the reports of a worker instead of the terminal reporter.
+
+    def __init__(self):
+        self.reports = []
+
+    def pytest_runtest_logreport(self, report):
+        self.reports.append(report)
+
+
+class ScopeScheduler:
+    """
+    A pytest plugin that runs the tests in `workers` processes, keeping the
+    tests that share a package, module or class scoped fixture on the same
+    worker.
+
+    The processes are forked after collection, so the test modules are not
+    imported again. The groups of tests from `schedule` are put on a shared
+    queue longest first, and every worker takes the next group as soon as it
+    finishes one, so an idle worker always steals the remaining work instead
+    of waiting for a fixed share. Putting the longest groups first keeps a
+    long group from starting last and finishing after everything else.
+
+    The reports are sent back to the main process, which reports them like a
+    serial run and records the durations for the next run. Register it with
+    `--workers`.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.history = None
+
+    def pytest_sessionstart(self, session):
+        self.history = DurationHistory.load(session.config)
+
+    def pytest_runtest_logreport(self, report):
+        self.history.record(report)
+
+    def pytest_sessionfinish(self, session):
+        self.history.save(session.config)
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtestloop(self, session):
+        if (
+            session.testsfailed
+            and not session.config.option.continue_on_collection_errors
+        ):
+            raise session.Interrupted(
+                f"{session.testsfailed} error"
+                f"{'s' if session.testsfailed != 1 else ''} during collection"
+            )
+        if session.config.option.collectonly or not session.items:
+            return True
+
+        groups = schedule(session.items, self.history)
+        context = multiprocessing.get_context("fork")
+        tasks, results = context.Queue(), context.Queue()
+        processes = [
+            context.Process(target=self._work, args=(session, tasks, results))
+            for _ in range(min(self.workers, len(groups)))
+        ]
+        for group in groups:
+            tasks.put(group)
+        for _ in processes:
+            tasks.put(None)
+        for process in processes:
+            process.start()
+        try:
+            self._receive(session, processes, results)
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+        return True
+
+    def _work(self, session, tasks, results):
+        config = session.config
+        capture = config.pluginmanager.getplugin("capturemanager")
+        if capture is not None:
+            # The capture files are shared with the main process after the
+            # fork, every worker needs its own.
+            capture.stop_global_capturing()
+            capture.start_global_capturing()
+        # The main process reports the results, the full protocol still runs so
+        # plugins like the result cache and the fork server work on workers.
+        config.pluginmanager.unregister(name="terminalreporter")
+        collector = _ReportCollector()
+        config.pluginmanager.register(collector, "scheduler-report-collector")
+
+        boundary = _SessionBoundary(session)
+        for group in iter(tasks.get, None):
+            for position, index in enumerate(group):
+                # At the end of a group everything but the session scoped
+                # fixtures is torn down, those are kept for the next group.
+                nextitem = (
+                    session.items[group[position + 1]]
+                    if position + 1 < len(group)
+                    else boundary
+                )
+                item = session.items[index]
+                item.ihook.pytest_runtest_protocol(item=item, nextitem=nextitem)
+                reports, collector.reports = collector.reports, []
+                results.put(
+                    (
+                        index,
+                        [
+                            config.hook.pytest_report_to_serializable(
+                                config=config, report=report
+                            )
+                            for report in reports
+                        ],
+                    )
+                )
+        session._setupstate.teardown_exact(None)
+        results.put((None, os.getpid()))
+
+    def _receive(self, session, processes, results):
+        config = session.config
+        pending = set(range(len(session.items)))
+        running = len(processes)
+        while running:
+            try:
+                index, data = results.get(timeout=0.1)
+            except queue.Empty:
+                if any(process.is_alive() for process in processes):
+                    continue
+                try:
+                    # The last messages of an exited worker can still be on
+                    # their way.
+                    index, data = results.get(timeout=1)
+                except queue.Empty:
+                    break
+            if index is None:
+                running -= 1
+                continue
+            reports = [
+                config.hook.pytest_report_from_serializable(config=config, data=entry)
+                for entry in data
+            ]
+            self._log(session.items[index], reports)
+            pending.discard(index)
+            if session.shouldfail:
+                raise session.Failed(session.shouldfail)
+            if session.shouldstop:
+                raise session.Interrupted(session.shouldstop)
+
+        for index in sorted(pending):
+            item = session.items[index]
+            report = pytest.TestReport(
+                item.nodeid,
+                item.location,
+                keywords=dict.fromkeys(item.keywords, 1),
+                outcome="failed",
+                longrepr="worker process exited before running this test",
+                when="call",
+            )
+            self._log(item, [report])
+
+    def _log(self, item, reports):
+        item.ihook.pytest_runtest_logstart(nodeid=item.nodeid, location=item.location)
+        for report in reports:
+            item.ihook.pytest_runtest_logreport(report=report)
+        item.ihook.pytest_runtest_logfinish(nodeid=item.nodeid, location=item.location)
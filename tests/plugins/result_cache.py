@@ -0,0 +1,120 @@
+import hashlib
+import sys
+
+import pytest
+
+from tests.plugins.collection_index import local_dependencies
+
+
+class ResultCache:
+    """
+    A pytest plugin that does not run pure tests again while nothing they
+    depend on has changed since they last passed.
+
+    Mark deterministic tests with `@pytest.mark.pure`. When such a test passes,
+    a key is stored in the pytest cache, made of a hash of its node ID, its
+    parameters, the Python version and every file returned by
+    `local_dependencies` for its module: the module itself, the `conftest.py`
+    files above it and the local modules it imports, directly or through other
+    local modules. On the next run a test with an unchanged key is reported as
+    "cached-pass" without setting up any fixture or running it.
+
+    Tests whose parameters have no stable `repr`, like objects shown as
+    `<object at 0x...>`, are always run. The plugin is registered by
+    `conftest.py`, run with `--no-result-cache` to run every test while still
+    recording the results.
+    """
+
+    KEY = "result-cache/v1"
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.results = {}
+        self.keys = {}
+        self.cached = []
+        self._config = None
+        self._digests = {}
+        self._failed = set()
+
+    def pytest_sessionstart(self, session):
+        self._config = session.config
+        self.results = session.config.cache.get(self.KEY, {})
+
+    def _module_digest(self, module):
+        if module.path not in self._digests:
+            rootpath = self._config.rootpath
+            digest = hashlib.blake2b(sys.version.encode())
+            for dependency in sorted(
+                local_dependencies(module, rootpath, transitive=True)
+            ):
+                digest.update(dependency.encode())
+                digest.update((rootpath / dependency).read_bytes())
+            self._digests[module.path] = digest.hexdigest()
+        return self._digests[module.path]
+
+    def key(self, item):
+        """
+        Return the cache key of `item`, or None if it cannot be cached.
+        """
+        callspec = getattr(item, "callspec", None)
+        params = repr(sorted(callspec.params.items())) if callspec else ""
+        if " at 0x" in params:
+            return None
+        digest = hashlib.blake2b(
+            self._module_digest(item.getparent(pytest.Module)).encode()
+        )
+        digest.update(item.nodeid.encode())
+        digest.update(params.encode())
+        return digest.hexdigest()
+
+    def pytest_collection_modifyitems(self, items):
+        for item in items:
+            if item.get_closest_marker("pure") is not None:
+                key = self.key(item)
+                if key is not None:
+                    self.keys[item.nodeid] = key
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtest_protocol(self, item, nextitem):
+        key = self.keys.get(item.nodeid)
+        if not self.enabled or key is None or self.results.get(item.nodeid) != key:
+            return None
+        item.ihook.pytest_runtest_logstart(nodeid=item.nodeid, location=item.location)
+        for when in ("setup", "call", "teardown"):
+            report = pytest.TestReport(
+                item.nodeid,
+                item.location,
+                keywords=dict.fromkeys(item.keywords, 1),
+                outcome="passed",
+                longrepr=None,
+                when=when,
+                cached_pass=True,
+            )
+            item.ihook.pytest_runtest_logreport(report=report)
+        item.ihook.pytest_runtest_logfinish(nodeid=item.nodeid, location=item.location)
+        self.cached.append(item.nodeid)
+        return True
+
+    def pytest_report_teststatus(self, report, config):
+        if getattr(report, "cached_pass", False) and report.when == "call":
+            return "cached-pass", "c", "CACHED-PASS"
+
+    def pytest_runtest_logreport(self, report):
+        if report.nodeid not in self.keys or getattr(report, "cached_pass", False):
+            return
+        if not report.passed:
+            # Failed, skipped or expected to fail, either way not green.
+            self._failed.add(report.nodeid)
+            self.results.pop(report.nodeid, None)
+        elif report.when == "teardown" and report.nodeid not in self._failed:
+            self.results[report.nodeid] = self.keys[report.nodeid]
+
+    def pytest_sessionfinish(self, session):
+        session.config.cache.set(self.KEY, self.results)
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if self.cached:
+            terminalreporter.write_line(
+                f"result cache: {len(self.cached)} unchanged pure tests were not "
+                "run again, use --no-result-cache to run them"
+            )
@@ -0,0 +1,146 @@
+import argparse
+import json
+
+import pytest
+
+from tests.plugins.parallel_scheduler import DurationHistory, scope_key
+
+
+def shard_spec(value):
+    """
+    Parse a `--shard` value like `2/4` into `(2, 4)`.
+    """
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected INDEX/COUNT, got {value!r}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard {index} is not between 1 and {count}")
+    return index, count
+
+
+def partition(items, history, count):
+    """
+    Split `items` into `count` shards of about the same duration, and return
+    the shards as lists of indexes into `items`, with the estimated duration
+    of each shard.
+
+    The groups of `scope_key` are never split, so a scoped fixture is only
+    set up on one machine. They are assigned longest first, each to the shard
+    with the least work so far, which leaves the short groups to even out the
+    shards at the end. Ties are broken by the group key and the shard number,
+    never by chance, so every machine computes the same partition from the
+    same tests and history.
+    """
+    groups = {}
+    for index, item in enumerate(items):
+        groups.setdefault(scope_key(item), []).append(index)
+    durations = {
+        key: sum(history.get(items[i].nodeid) for i in group)
+        for key, group in groups.items()
+    }
+    shards = [[] for _ in range(count)]
+    loads = [0.0] * count
+    for key in sorted(groups, key=lambda key: (-durations[key], key)):
+        shard = min(range(count), key=lambda shard: (loads[shard], shard))
+        shards[shard].extend(groups[key])
+        loads[shard] += durations[key]
+    return [sorted(shard) for shard in shards], loads
+
+
+def merge_reports(paths, output=None):
+    """
+    Merge the partial reports written by `--shard-report` into one, and write
+    it to `output` if given.
+
+    The merged report lists the shards it was made from, so a missing shard
+    is easy to spot, and can be passed to `--shard-durations` to balance the
+    next run.
+    """
+    merged = {"shards": [], "durations": {}, "outcomes": {}}
+    for path in paths:
+        with open(path) as f:
+            report = json.load(f)
+        merged["shards"].extend(report["shards"])
+        merged["durations"].update(report["durations"])
+        merged["outcomes"].update(report["outcomes"])
+    merged["shards"].sort()
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump(merged, f, indent=2, sort_keys=True)
+    return merged
+
+
+class Sharding:
+    """
+    A pytest plugin that runs one of `count` shards of the selected tests, so
+    a suite can be split across independent machines.
+
+    Every machine collects every test, and keeps the tests of shard `index`
+    from `partition`, balanced by the durations in the `durations` file. A
+    missing file, or tests missing from it, count as the median duration.
+    With `report`, the outcome and duration of every test of the shard are
+    written to a JSON file, to be combined with `merge_reports`. Register it
+    with `--shard`, `--shard-durations` and `--shard-report`.
+    """
+
+    def __init__(self, index, count, durations=None, report=None):
+        self.index = index
+        self.count = count
+        self.report = report
+        self.history = DurationHistory()
+        if durations:
+            try:
+                with open(durations) as f:
+                    self.history = DurationHistory(json.load(f)["durations"])
+            except FileNotFoundError:
+                pass
+        self.estimate = 0.0
+        self.durations = {}
+        self.outcomes = {}
+        self._config = None
+
+    def pytest_configure(self, config):
+        self._config = config
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(self, config, items):
+        shards, loads = partition(items, self.history, self.count)
+        selected = set(shards[self.index - 1])
+        self.estimate = loads[self.index - 1]
+        deselected = [item for i, item in enumerate(items) if i not in selected]
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+        items[:] = [item for i, item in enumerate(items) if i in selected]
+
+    def pytest_report_collectionfinish(self, items):
+        return (
+            f"shard {self.index}/{self.count}: {len(items)} tests, "
+            f"{self.estimate:.1f}s estimated"
+        )
+
+    def pytest_runtest_logreport(self, report):
+        nodeid = report.nodeid
+        self.durations[nodeid] = self.durations.get(nodeid, 0.0) + report.duration
+        category = self._config.hook.pytest_report_teststatus(
+            report=report, config=self._config
+        )[0]
+        # Setup and teardown only count when they did not pass, an error in
+        # teardown overrides the outcome of the call.
+        if category and (nodeid not in self.outcomes or category == "error"):
+            self.outcomes[nodeid] = category
+
+    def pytest_sessionfinish(self, session):
+        if not self.report:
+            return
+        with open(self.report, "w") as f:
+            json.dump(
+                {
+                    "shards": [f"{self.index}/{self.count}"],
+                    "durations": self.durations,
+                    "outcomes": self.outcomes,
+                },
+                f,
+                indent=2,
+                sort_keys=True,
+            )
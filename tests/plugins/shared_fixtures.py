@@ -0,0 +1,183 @@
+import array
+import functools
+import hashlib
+import inspect
+import mmap
+import os
+import pickle
+import re
+import shutil
+import struct
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ALIGNMENT = 64
+_HEADER = struct.Struct("<Q")
+directory_key = pytest.StashKey[Path]()
+
+
+def _cast(buffer, typecode):
+    return memoryview(buffer).cast(typecode)
+
+
+class _TypedBuffer:
+    # An `array.array` pickled out-of-band, it comes back as a memoryview of
+    # the same type.
+
+    def __init__(self, values):
+        self.values = values
+
+    def __reduce_ex__(self, protocol):
+        return _cast, (pickle.PickleBuffer(self.values), self.values.typecode)
+
+
+def _out_of_band(value):
+    # Bytes are always pickled in-band, wrapping them in a `PickleBuffer`
+    # passes them to the buffer callback instead.
+    if isinstance(value, (bytes, bytearray)):
+        return pickle.PickleBuffer(value)
+    if isinstance(value, array.array):
+        return _TypedBuffer(value)
+    if isinstance(value, dict):
+        return {key: _out_of_band(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_out_of_band(item) for item in value)
+    return value
+
+
+def publish(path, value):
+    """
+    Write `value` to `path`, with every buffer stored separately so `attach`
+    can map it without copying.
+
+    The buffers are bytes, bytearrays, `array.array` and NumPy arrays, also
+    inside dictionaries, lists and tuples. Everything else is pickled.
+    """
+    buffers = []
+    stream = pickle.dumps(
+        _out_of_band(value), protocol=5, buffer_callback=buffers.append
+    )
+    raws = [buffer.raw() for buffer in buffers]
+    offsets = []
+    # The buffers start after the header, the table and the stream, which
+    # are written first, so their size decides where the first buffer goes.
+    position = 0
+    for raw in raws:
+        offsets.append((position, raw.nbytes))
+        position += -(-raw.nbytes // ALIGNMENT) * ALIGNMENT
+    table = pickle.dumps((stream, offsets))
+    start = -(-(_HEADER.size + len(table)) // ALIGNMENT) * ALIGNMENT
+
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(_HEADER.pack(len(table)))
+        f.write(table)
+        for (offset, _), raw in zip(offsets, raws):
+            f.seek(start + offset)
+            f.write(raw)
+        f.truncate(start + position)
+    os.replace(tmp, path)
+
+
+def attach(path):
+    """
+    Map a file written by `publish` and return its value.
+
+    The buffers are read-only views of the mapped file: bytes and arrays come
+    back as memoryviews and NumPy arrays as read-only arrays. The pages are
+    shared by every process mapping the file.
+    """
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(data)
+    (size,) = _HEADER.unpack(view[: _HEADER.size])
+    stream, offsets = pickle.loads(view[_HEADER.size : _HEADER.size + size])
+    start = -(-(_HEADER.size + size) // ALIGNMENT) * ALIGNMENT
+    buffers = [
+        view[start + offset : start + offset + length] for offset, length in offsets
+    ]
+    return pickle.loads(stream, buffers=buffers)
+
+
+class SharedFixtures:
+    """
+    A pytest plugin that provides the directory the values of `shared_fixture`
+    are published to, for the duration of the run.
+
+    The directory is created by the main process, under `/dev/shm` where it
+    exists so the files are backed by shared memory instead of the disk.
+    Processes forked from the main process, like the workers of the parallel
+    scheduler, inherit it. It is removed when the main process finishes.
+    The plugin is registered by `conftest.py`.
+    """
+
+    def __init__(self):
+        self.directory = None
+        self._owner = None
+
+    def pytest_configure(self, config):
+        parent = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        self.directory = Path(tempfile.mkdtemp(prefix="pytest-shared-", dir=parent))
+        self._owner = os.getpid()
+        config.stash[directory_key] = self.directory
+
+    def pytest_unconfigure(self, config):
+        if os.getpid() == self._owner:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def shared_fixture(func):
+    """
+    A decorator that builds a session fixture once per run and shares its
+    value between processes.
+
+        @pytest.fixture(scope="session")
+        @shared_fixture
+        def reference_data():
+            return {"table": numpy.load("reference.npy")}
+
+    The first process that requests the fixture builds it and `publish`es it,
+    every process, including the first, then gets the value from `attach`.
+    With the parallel scheduler every worker maps the same pages instead of
+    holding its own copy. Without the `SharedFixtures` plugin, the fixture is
+    built as usual.
+
+    The value is keyed by the module and qualified name of the fixture and by
+    the `repr` of its param. The values of the fixtures it depends on are not
+    part of the key, they are expected to be the same in every process, like
+    other session fixtures.
+    """
+    if inspect.isgeneratorfunction(func):
+        raise TypeError(f"Cannot share generator fixture {func.__name__!r}")
+
+    signature = inspect.signature(func)
+    takes_request = "request" in signature.parameters
+    # Fixtures of the same name in different modules must not share a file.
+    name = re.sub(r"[^\w.]", "_", f"{func.__module__}.{func.__qualname__}")
+
+    @functools.wraps(func)
+    def wrapper(*args, request, **kwargs):
+        if takes_request:
+            kwargs["request"] = request
+        directory = request.config.stash.get(directory_key, None)
+        if directory is None:
+            return func(*args, **kwargs)
+        param = repr(getattr(request, "param", None))
+        key = hashlib.sha256(param.encode()).hexdigest()[:16]
+        path = directory / f"{name}.{key}"
+        import fcntl
+
+        with open(directory / f"{name}.{key}.lock", "w") as lock:
+            # Only one process builds the value, the others wait for it.
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if not path.exists():
+                publish(path, func(*args, **kwargs))
+        return attach(path)
+
+    if not takes_request:
+        parameters = list(signature.parameters.values())
+        parameters.append(inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY))
+        wrapper.__signature__ = signature.replace(parameters=parameters)
+    return wrapper
@@ -32,6 +32,7 @@ class TestAssertion:
         """
         assert 1 == 2, "1 is not equal to 2"
 
+    @pytest.mark.pure
     def test_list_equality(self):
         """
         This test checks if two lists are equal.
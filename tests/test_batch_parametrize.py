@@ -0,0 +1,428 @@
+import functools
+import inspect
+import time
+
+import pytest
+
+MAX_REPORTED_ROWS = 10
+
+_PARAMETER_SET = type(pytest.param())
+
+
+def _row_id(argnames, values, index, make_id=None):
+    # The same ids pytest generates for plain values, e.g. "1-2", `make_id` is
+    # called for every value like a callable `ids` of `pytest.mark.parametrize`.
+    parts = []
+    for argname, value in zip(argnames, values):
+        part = make_id(value) if make_id is not None else None
+        if part is not None:
+            parts.append(str(part))
+        elif value is None or isinstance(value, (str, int, float, bool, complex)):
+            parts.append(str(value))
+        else:
+            parts.append(f"{argname}{index}")
+    return "-".join(parts)
+
+
+def _row_outcome(marks, index):
+    # Returns "skip", "xfail" or None for the marks of a `pytest.param` row,
+    # with the reason of the mark.
+    for mark in marks:
+        mark = getattr(mark, "mark", mark)
+        if mark.name not in ("skip", "skipif", "xfail"):
+            raise ValueError(
+                f"row {index}: batch_parametrize does not support the "
+                f"{mark.name!r} mark, only skip, skipif and xfail"
+            )
+        conditions = mark.args if mark.name != "skip" else ()
+        if any(isinstance(condition, str) for condition in conditions):
+            raise ValueError(
+                f"row {index}: the conditions of {mark.name!r} must be booleans"
+            )
+        if not conditions or any(conditions):
+            reason = mark.kwargs.get("reason", "")
+            if mark.name == "skip" and mark.args:
+                reason = mark.args[0]
+            return ("xfail" if mark.name == "xfail" else "skip"), reason
+    return None, ""
+
+
+def batch_parametrize(argnames, argvalues, ids=None, arrays=False):
+    """
+    Like `pytest.mark.parametrize`, but the test is called once with the whole
+    case table instead of once per row.
+
+    The test receives one column per argument name, as a list or as a NumPy
+    array with `arrays=True`, and returns the outcome of every row as a
+    sequence of booleans, for example `input_data + 1 == expected`. The table
+    is a single test item, so the setup and reporting overhead is paid once,
+    no matter how many rows it has.
+
+    Rows are read like `pytest.mark.parametrize` reads them: with a single
+    argument name every value is a row as it is, even a tuple, otherwise every
+    row must have one value per argument. A function passed as `ids` is called
+    for every value and the results are joined with "-", where it returns
+    None the value gets its default id. `pytest.param` rows can set the id
+    of the row and mark it with `skip`, `skipif` or `xfail`. Skipped rows are
+    left out of the columns, and an xfail row is allowed to fail.
+
+    Failing rows are reported by their parametrize ids, like
+    `test_add_one[3-5]`, as subtests when pytest provides them, so every row
+    gets its own report. The outcome of the table is also stored in the
+    `batch` user property of the item, which `--junitxml` writes to the report.
+    """
+    if isinstance(argnames, str):
+        argnames = [name.strip() for name in argnames.split(",") if name.strip()]
+    entries = list(argvalues)
+    make_id = None
+    if callable(ids):
+        make_id, ids = ids, None
+    elif ids is not None and len(ids) != len(entries):
+        raise ValueError(f"{len(ids)} ids given for {len(entries)} rows")
+
+    rows, row_ids, skipped, expected_failures = [], [], [], {}
+    for index, entry in enumerate(entries):
+        row_id = ids[index] if ids is not None else None
+        outcome, reason = None, ""
+        if isinstance(entry, _PARAMETER_SET):
+            values = entry.values
+            row_id = entry.id if entry.id is not None else row_id
+            outcome, reason = _row_outcome(entry.marks, index)
+        elif len(argnames) == 1:
+            values = (entry,)
+        else:
+            values = tuple(entry)
+        if len(values) != len(argnames):
+            raise ValueError(
+                f"row {index} has {len(values)} values for "
+                f"{len(argnames)} arguments {', '.join(argnames)}"
+            )
+        if row_id is None:
+            row_id = _row_id(argnames, values, index, make_id)
+        if outcome == "skip":
+            skipped.append((row_id, reason))
+            continue
+        if outcome == "xfail":
+            expected_failures[len(rows)] = reason
+        rows.append(values)
+        row_ids.append(row_id)
+    columns = [[row[i] for row in rows] for i in range(len(argnames))]
+
+    def decorator(function):
+        signature = inspect.signature(function)
+        parameters = [
+            p for name, p in signature.parameters.items() if name not in argnames
+        ]
+        needs_request = "request" not in signature.parameters
+        if needs_request:
+            parameters.append(
+                inspect.Parameter("request", inspect.Parameter.POSITIONAL_OR_KEYWORD)
+            )
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            request = kwargs.pop("request") if needs_request else kwargs["request"]
+            if arrays:
+                import numpy
+
+                table = {n: numpy.asarray(c) for n, c in zip(argnames, columns)}
+            else:
+                table = dict(zip(argnames, columns))
+
+            outcome = function(*args, **kwargs, **table)
+            outcome = [bool(passed) for passed in outcome]
+            if len(outcome) != len(rows):
+                raise ValueError(
+                    f"{function.__name__} returned {len(outcome)} results "
+                    f"for {len(rows)} rows"
+                )
+
+            failed = [
+                index
+                for index, passed in enumerate(outcome)
+                if not passed and index not in expected_failures
+            ]
+            names = [f"{function.__name__}[{row_ids[index]}]" for index in failed]
+            request.node.user_properties.append(
+                ("batch", {"rows": len(rows), "failed": names})
+            )
+            if hasattr(pytest, "Subtests"):
+                _report_rows(
+                    request, names, row_ids, outcome, expected_failures, skipped
+                )
+            if names:
+                shown = "\n".join(f"    {name}" for name in names[:MAX_REPORTED_ROWS])
+                more = len(names) - MAX_REPORTED_ROWS
+                pytest.fail(
+                    f"{len(names)} of {len(rows)} rows failed:\n{shown}"
+                    + (f"\n    ... and {more} more" if more > 0 else ""),
+                    pytrace=False,
+                )
+
+        wrapper.__signature__ = signature.replace(parameters=parameters)
+        return wrapper
+
+    return decorator
+
+
+def _report_rows(request, names, row_ids, outcome, expected_failures, skipped):
+    # Only the rows that did not simply pass get a report, so a table of a
+    # million passing rows does not print a million reports.
+    subtests = request.getfixturevalue("subtests")
+    names = iter(names)
+    for row_id, reason in skipped:
+        with subtests.test(msg=row_id):
+            pytest.skip(reason)
+    for index, passed in enumerate(outcome):
+        if index in expected_failures:
+            with subtests.test(msg=row_ids[index]):
+                if not passed:
+                    pytest.xfail(expected_failures[index])
+        elif not passed:
+            with subtests.test(msg=row_ids[index]):
+                pytest.fail(f"{next(names)} failed", pytrace=False)
+
+
+class TestBatchParametrization:
+    """
+    This class demonstrates the pure tables from `TestParametrization`
+    evaluated as a whole, instead of once per row.
+    """
+
+    @batch_parametrize(
+        "input_data, expected",
+        [
+            (1, 2),
+            (2, 3),
+            (3, 4),
+        ],
+    )
+    def test_add_one(self, input_data, expected):
+        """
+        This test checks if adding 1 to the input_data produces the expected result.
+        """
+        return [i + 1 == e for i, e in zip(input_data, expected)]
+
+    @batch_parametrize(
+        "dividend, divisor, expected",
+        [
+            (10, 2, 5),
+            (9, 3, 3),
+            (5, 2, 2.5),
+        ],
+    )
+    def test_division(self, dividend, divisor, expected):
+        """
+        This test checks if division produces the expected result.
+        """
+        return [a / b == e for a, b, e in zip(dividend, divisor, expected)]
+
+    @batch_parametrize(
+        "base, exponent, expected",
+        [
+            (2, 3, 8),
+            (3, 2, 9),
+            (5, 0, 1),
+        ],
+    )
+    def test_power(self, base, exponent, expected):
+        """
+        This test checks if raising a base to an exponent gives the expected result.
+        """
+        return [b**e == r for b, e, r in zip(base, exponent, expected)]
+
+    @batch_parametrize(
+        "integer_list, target_sum, expected",
+        [
+            ([1, 2, 3], 6, True),
+            ([1, 2, 3], 7, False),
+            ([1, 1, 1], 3, True),
+        ],
+    )
+    def test_sum_of_list(self, integer_list, target_sum, expected):
+        """
+        This test checks if the sum of the list equals the target sum.
+        """
+        return [
+            (sum(numbers) == target) == e
+            for numbers, target, e in zip(integer_list, target_sum, expected)
+        ]
+
+    def test_power_arrays(self, pytester):
+        """
+        With `arrays=True` the columns are NumPy arrays, so a million rows are
+        checked in a single vectorized expression.
+        """
+        pytest.importorskip("numpy")
+        pytester.makepyfile("""
+            import numpy
+            from tests.test_batch_parametrize import batch_parametrize
+
+            base = numpy.arange(1_000_000) % 100
+
+            @batch_parametrize("base, expected", zip(base, base * base), arrays=True)
+            def test_power(base, expected):
+                return base**2 == expected
+            """)
+        pytester.inline_run().assertoutcome(passed=1)
+
+    def test_failing_rows_are_reported(self, pytester):
+        """
+        A failing row is reported with the id it would have had with
+        `pytest.mark.parametrize`, as a subtest of its own when pytest
+        provides subtests.
+        """
+        pytester.makepyfile("""
+            from tests.test_batch_parametrize import batch_parametrize
+
+            @batch_parametrize("input_data, expected", [(1, 2), (2, 4), (3, 5)])
+            def test_add_one(input_data, expected):
+                return [i + 1 == e for i, e in zip(input_data, expected)]
+            """)
+        result = pytester.runpytest()
+
+        subtests = hasattr(pytest, "Subtests")
+        result.assert_outcomes(failed=3 if subtests else 1)
+        result.stdout.fnmatch_lines(
+            [
+                "*2 of 3 rows failed:",
+                "*test_add_one[[]2-4[]]",
+                "*test_add_one[[]3-5[]]",
+            ]
+        )
+        if subtests:
+            result.stdout.fnmatch_lines(
+                [
+                    "*_ test_add_one [[]2-4[]] _*",
+                    "test_add_one[[]2-4[]] failed",
+                    "*_ test_add_one [[]3-5[]] _*",
+                    "test_add_one[[]3-5[]] failed",
+                ]
+            )
+
+    def test_rows_are_read_like_parametrize(self, pytester):
+        """
+        With a single argument name a tuple is one value, and `pytest.param`
+        rows can set their id and be skipped or expected to fail.
+        """
+        pytester.makepyfile("""
+            import pytest
+            from tests.test_batch_parametrize import batch_parametrize
+
+            @batch_parametrize("pair", [(1, 2), (3, 4)])
+            def test_pairs(pair):
+                return [len(p) == 2 for p in pair]
+
+            @batch_parametrize(
+                "input_data, expected",
+                [
+                    pytest.param(1, 2, id="one"),
+                    pytest.param(2, 4, marks=pytest.mark.xfail(reason="wrong")),
+                    pytest.param(3, 5, marks=pytest.mark.skip(reason="later")),
+                    pytest.param(4, 6, marks=pytest.mark.skipif(True, reason="no")),
+                ],
+            )
+            def test_add_one(input_data, expected, request):
+                assert input_data == [1, 2]
+                return [i + 1 == e for i, e in zip(input_data, expected)]
+            """)
+        reprec = pytester.inline_run()
+
+        reports = {
+            report.head_line: report
+            for report in reprec.getreports("pytest_runtest_logreport")
+            if report.when == "call"
+            and not isinstance(report, getattr(pytest, "SubtestReport", ()))
+        }
+        assert reports["test_pairs"].passed
+        assert reports["test_add_one"].passed
+        batch = dict(reports["test_add_one"].user_properties)["batch"]
+        assert batch == {"rows": 2, "failed": []}
+
+    def test_ids_function(self, pytester):
+        """
+        A function passed as `ids` names every value, like with
+        `pytest.mark.parametrize`.
+        """
+        pytester.makepyfile("""
+            from tests.test_batch_parametrize import batch_parametrize
+
+            @batch_parametrize(
+                "input_data, expected",
+                [(1, 2), (3, 5)],
+                ids=lambda value: f"odd{value}" if value % 2 else None,
+            )
+            def test_add_one(input_data, expected):
+                return [i + 1 == e for i, e in zip(input_data, expected)]
+            """)
+        result = pytester.runpytest()
+
+        result.stdout.fnmatch_lines(
+            ["*1 of 2 rows failed:", "*test_add_one[[]odd3-odd5[]]"]
+        )
+
+    @pytest.mark.parametrize(
+        "argvalues, message",
+        [
+            ([(1, 2), (3,)], "row 1 has 1 values for 2 arguments"),
+            ([(1, 2, 3)], "row 0 has 3 values for 2 arguments"),
+            ([pytest.param(1, 2, marks=pytest.mark.benchmark)], "does not support"),
+        ],
+    )
+    def test_invalid_rows(self, argvalues, message):
+        """
+        Rows with the wrong number of values are rejected instead of being
+        truncated, and so are marks that cannot apply to a single row.
+        """
+        with pytest.raises(ValueError, match=message):
+            batch_parametrize("input_data, expected", argvalues)
+
+    def test_fixtures_and_user_property(self, pytester):
+        """
+        Other fixtures are passed as usual, the outcome of every row is stored
+        in the `batch` user property.
+        """
+        pytester.makepyfile("""
+            import pytest
+            from tests.test_batch_parametrize import batch_parametrize
+
+            @pytest.fixture
+            def offset():
+                return 1
+
+            @batch_parametrize("input_data, expected", [(1, 2), (2, 3)])
+            def test_add_offset(input_data, expected, offset):
+                return [i + offset == e for i, e in zip(input_data, expected)]
+            """)
+        reprec = pytester.inline_run()
+
+        reprec.assertoutcome(passed=1)
+        report = reprec.matchreport("test_add_offset")
+        assert dict(report.user_properties)["batch"] == {"rows": 2, "failed": []}
+
+    @pytest.mark.benchmark
+    def test_benchmark_against_parametrize(self, pytester):
+        """
+        Compares running a table of 10 000 rows with `pytest.mark.parametrize`
+        and with `batch_parametrize`.
+        """
+        pytester.makepyfile(
+            test_parametrize="""
+                import pytest
+
+                @pytest.mark.parametrize("n", range(10_000))
+                def test_add_one(n):
+                    assert n + 1 > n
+                """,
+            test_batch="""
+                from tests.test_batch_parametrize import batch_parametrize
+
+                @batch_parametrize("n", range(10_000))
+                def test_add_one(n):
+                    return [value + 1 > value for value in n]
+                """,
+        )
+        for name in ["test_parametrize.py", "test_batch.py"]:
+            start = time.perf_counter()
+            pytester.runpytest_inprocess(name, "-q", "-p", "no:cacheprovider")
+            print(f"{name}: {time.perf_counter() - start:.2f}s")
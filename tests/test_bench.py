@@ -0,0 +1,127 @@
+import json
+import os
+from unittest import mock
+
+import pytest
+
+import tests.test_mocking
+from tests.plugins.bench import (
+    BenchRecorder,
+    BenchStats,
+    slower_p_value,
+    without_outliers,
+)
+from tests.test_exceptions import CustomException, function_that_raises
+
+
+def raise_and_catch(value):
+    """
+    Function for demonstration purposes, `function_that_raises` on a raising
+    path, with the exception caught.
+    """
+    try:
+        function_that_raises(value)
+    except (ValueError, KeyError, CustomException):
+        pass
+
+
+class TestBenchmarks:
+    """
+    A starter suite of micro-benchmarks, which runs with the rest of the tests
+    so performance regressions fail the same run as functional ones.
+    """
+
+    def test_function_that_raises_return_path(self, bench):
+        """
+        The path of `function_that_raises` that returns its input.
+        """
+        bench(function_that_raises, 1)
+
+    @pytest.mark.parametrize("value", [-1, 0, 99])
+    def test_function_that_raises_raise_path(self, bench, value):
+        """
+        The paths of `function_that_raises` that raise, which are more
+        expensive than returning.
+        """
+        bench(raise_and_catch, value)
+
+    def test_function_to_mock(self, bench):
+        """
+        Calling `function_to_mock` unpatched and patched with a `MagicMock`.
+        """
+        unpatched = bench(tests.test_mocking.function_to_mock, name="unpatched")
+        with mock.patch("tests.test_mocking.function_to_mock"):
+            patched = bench(tests.test_mocking.function_to_mock, name="patched")
+        assert patched.median > unpatched.median
+
+    def test_approx(self, bench):
+        """
+        Comparing floats with `pytest.approx`.
+        """
+        bench(lambda: 0.1 + 0.2 == pytest.approx(0.3))
+
+
+class TestBenchFixture:
+    """
+    This class demonstrates the statistics and the regression gate of the
+    `bench` fixture.
+    """
+
+    def test_statistics(self):
+        """
+        Outliers are removed before the statistics are calculated.
+        """
+        samples = [1.0, 1.1, 1.2, 1.3, 1.4, 100.0]
+        stats = BenchStats("example", without_outliers(samples), iterations=1)
+
+        assert stats.samples == samples[:-1]
+        assert stats.min == 1.0
+        assert stats.median == 1.2
+        assert stats.iqr == pytest.approx(0.3)
+        assert stats.ops == pytest.approx(1 / 1.2)
+
+    def test_p_value(self):
+        """
+        Clearly slower samples give a small p-value, overlapping samples a
+        large one.
+        """
+        baseline = [1.0 + i / 100 for i in range(20)]
+        assert slower_p_value([2.0 + i / 100 for i in range(20)], baseline) < 0.001
+        assert slower_p_value(baseline, baseline) > 0.4
+
+    def test_save_and_compare(self, pytester):
+        """
+        A run with a baseline fails when the benchmark got significantly
+        slower, and passes otherwise.
+        """
+        pytester.makepyfile(test_sleep="""
+            import os
+            import time
+
+            def test_sleep(bench):
+                delay = float(os.environ["BENCH_DELAY"])
+                bench(time.sleep, delay)
+            """)
+        baseline = pytester.path / "baseline.json"
+
+        with mock.patch.dict(os.environ, {"BENCH_DELAY": "0"}):
+            pytester.runpytest(
+                "-p", "tests.plugins.bench", plugins=[BenchRecorder(save=baseline)]
+            )
+        assert list(json.loads(baseline.read_text())) == ["test_sleep.py::test_sleep"]
+
+        with mock.patch.dict(os.environ, {"BENCH_DELAY": "0.0005"}):
+            result = pytester.runpytest(
+                "-p", "tests.plugins.bench", plugins=[BenchRecorder(compare=baseline)]
+            )
+        result.assert_outcomes(failed=1)
+        result.stdout.fnmatch_lines(
+            ["*test_sleep.py::test_sleep regressed: median *us, +*% against*"]
+        )
+
+        with mock.patch.dict(os.environ, {"BENCH_DELAY": "0"}):
+            result = pytester.runpytest(
+                "-p", "tests.plugins.bench", plugins=[BenchRecorder(compare=baseline)]
+            )
+        result.assert_outcomes(passed=1)
+        result.stdout.fnmatch_lines(["*benchmarks*", "test_sleep.py::test_sleep *"])
@@ -0,0 +1,154 @@
+import collections
+from unittest import mock
+
+import pytest
+
+import tests.test_mocking
+from tests.plugins.memory_profiling import traced_memory
+
+
+class RingCallList(mock._CallList):
+    """
+    A call list that only keeps the latest `maxlen` calls.
+    """
+
+    def __init__(self, maxlen):
+        super().__init__()
+        self.maxlen = maxlen
+
+    def append(self, value):
+        super().append(value)
+        if len(self) > self.maxlen:
+            del self[0]
+
+
+class BoundedMock(mock.MagicMock):
+    """
+    A `MagicMock` with bounded call bookkeeping for calls in hot loops.
+
+    A regular mock keeps every call in `call_args_list` and `mock_calls`, so
+    calling it millions of times keeps millions of call objects alive. This mock
+    only keeps the latest `max_calls` calls in those lists, together with
+    `call_count` and a histogram of call signatures in `call_signatures`.
+
+    `assert_called_with`, `assert_called_once` and `assert_not_called` behave
+    exactly as before, since they only look at the last call and the count.
+    `assert_any_call` and `assert_has_calls` only see the retained calls.
+    """
+
+    def __init__(self, *args, max_calls=100, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__dict__["_max_calls"] = max_calls
+        self._install_call_lists()
+
+    def _install_call_lists(self):
+        max_calls = self.__dict__["_max_calls"]
+        self.call_args_list = RingCallList(max_calls)
+        self.mock_calls = RingCallList(max_calls)
+        self.method_calls = RingCallList(max_calls)
+        self.__dict__["call_signatures"] = collections.Counter()
+
+    def _get_child_mock(self, **kwargs):
+        return super()._get_child_mock(max_calls=self.__dict__["_max_calls"], **kwargs)
+
+    def _increment_mock_call(self, /, *args, **kwargs):
+        super()._increment_mock_call(*args, **kwargs)
+        signature = (
+            tuple(type(arg).__name__ for arg in args),
+            tuple(sorted(kwargs)),
+        )
+        self.call_signatures[signature] += 1
+
+    def reset_mock(self, *args, **kwargs):
+        super().reset_mock(*args, **kwargs)
+        self._install_call_lists()
+
+
+def hot_loop(iterations):
+    """
+    Function for demonstration purposes, calling `function_to_mock` in a loop.
+    """
+    for i in range(iterations):
+        tests.test_mocking.function_to_mock(str(i))
+    tests.test_mocking.function_to_mock(arg1="done")
+
+
+class TestBoundedMock:
+    """
+    This class demonstrates a mock that can be called millions of times
+    without keeping every call in memory.
+    """
+
+    def test_assertions_still_work(self):
+        """
+        The usual assertions on the last call and the call count still work.
+        """
+        with mock.patch(
+            "tests.test_mocking.function_to_mock", new_callable=BoundedMock
+        ) as mocked_function:
+            hot_loop(1000)
+
+        mocked_function.assert_called_with(arg1="done")
+        assert mocked_function.call_count == 1001
+        assert len(mocked_function.call_args_list) == 100
+        assert mocked_function.call_args_list[-2] == mock.call("999")
+
+    def test_call_signatures(self):
+        """
+        The histogram counts calls by the types of the positional arguments
+        and the names of the keyword arguments.
+        """
+        mocked_function = BoundedMock()
+        with mock.patch("tests.test_mocking.function_to_mock", mocked_function):
+            hot_loop(10)
+
+        assert mocked_function.call_signatures == {
+            (("str",), ()): 10,
+            ((), ("arg1",)): 1,
+        }
+
+    def test_assert_called_once(self, mocker):
+        """
+        `assert_called_once` and `reset_mock` behave like on a `MagicMock`.
+        """
+        mocked_function = mocker.patch(
+            "tests.test_mocking.function_to_mock", new_callable=BoundedMock
+        )
+        tests.test_mocking.function_to_mock("mocked result")
+        mocked_function.assert_called_once_with("mocked result")
+
+        mocked_function.reset_mock()
+        mocked_function.assert_not_called()
+        assert mocked_function.call_signatures == {}
+        tests.test_mocking.function_to_mock("again")
+        mocked_function.assert_called_once()
+
+    def test_child_mocks_are_bounded(self):
+        """
+        Methods of the mock are bounded mocks as well, including the calls
+        recorded on the parent.
+        """
+        mocked = BoundedMock(max_calls=5)
+        for i in range(50):
+            mocked.method(i)
+
+        assert isinstance(mocked.method, BoundedMock)
+        assert len(mocked.method.call_args_list) == 5
+        assert len(mocked.mock_calls) == 5
+        assert mocked.method_calls[-1] == mock.call.method(49)
+
+    @pytest.mark.parametrize("mock_class", [mock.MagicMock, BoundedMock])
+    def test_memory_in_hot_loop(self, mock_class):
+        """
+        Compares the memory kept alive by a regular and a bounded mock after
+        20 000 calls.
+        """
+        mocked_function = mock_class()
+        with traced_memory() as memory:
+            for i in range(20_000):
+                mocked_function(i)
+
+        if mock_class is BoundedMock:
+            assert memory.retained < 512 * 1024
+        else:
+            assert memory.retained > 2 * 1024 * 1024
@@ -0,0 +1,118 @@
+import sys
+
+import pytest
+
+from tests.plugins.collection_index import CollectionIndex
+
+INDEXED_SUITE = {
+    "test_math": """
+        import pytest
+
+        @pytest.mark.parametrize("number, expected", [(1, 2), (2, 3)])
+        def test_add_one(number, expected):
+            assert number + 1 == expected
+        """,
+    "test_slow": """
+        import pytest
+        import helpers
+
+        helpers.record_import(__name__)
+
+        @pytest.mark.slow
+        def test_sleep():
+            pass
+
+        def test_upper():
+            assert "a".upper() == "A"
+        """,
+    "helpers": """
+        def record_import(name):
+            with open("imports.log", "a") as f:
+                f.write(name + "\\n")
+        """,
+}
+
+
+class TestCollectionIndex:
+    """
+    This class demonstrates skipping the import of test modules that cannot
+    contain a selected test.
+    """
+
+    @pytest.fixture
+    def suite(self, pytester):
+        pytester.makepyfile(**INDEXED_SUITE)
+        pytester.makeini("[pytest]\nmarkers = slow")
+        pytester.syspathinsert()
+        pytester.inline_run(plugins=[CollectionIndex()])
+        (pytester.path / "imports.log").unlink()
+        sys.modules.pop("helpers", None)
+        return pytester
+
+    def imported(self, pytester):
+        log = pytester.path / "imports.log"
+        return log.read_text().split() if log.exists() else []
+
+    def test_index_contents(self, suite):
+        """
+        The index stores every parametrize expansion and the dependencies of
+        each module.
+        """
+        index = CollectionIndex()
+        index.entries = suite.parseconfigure().cache.get(CollectionIndex.KEY, {})
+
+        assert sorted(index.entries["test_slow.py"]["files"]) == [
+            "helpers.py",
+            "test_slow.py",
+        ]
+        assert index.select(keyword="add_one") == [
+            "test_math.py::test_add_one[1-2]",
+            "test_math.py::test_add_one[2-3]",
+        ]
+        assert index.select(markexpr="slow") == ["test_slow.py::test_sleep"]
+
+    def test_keyword_skips_unrelated_modules(self, suite):
+        """
+        With `-k add_one`, `test_slow.py` is not imported at all.
+        """
+        index = CollectionIndex()
+        reprec = suite.inline_run("-k", "add_one", plugins=[index])
+
+        reprec.assertoutcome(passed=2)
+        assert self.imported(suite) == []
+        assert [path.name for path in index.skipped] == ["test_slow.py"]
+
+    def test_marker_selects_module(self, suite):
+        """
+        With `-m slow`, only the module containing a slow test is imported.
+        """
+        index = CollectionIndex()
+        reprec = suite.inline_run("-m", "slow", plugins=[index])
+
+        reprec.assertoutcome(passed=1)
+        assert self.imported(suite) == ["test_slow"]
+        assert [path.name for path in index.skipped] == ["test_math.py"]
+
+    def test_changed_dependency(self, suite):
+        """
+        A module is collected again when a file it depends on changed, since
+        the index can no longer vouch for its contents.
+        """
+        suite.makepyfile(helpers=INDEXED_SUITE["helpers"] + "\ndef test_new(): pass\n")
+        index = CollectionIndex()
+        suite.inline_run("-k", "add_one", plugins=[index])
+
+        assert self.imported(suite) == ["test_slow"]
+        assert index.skipped == []
+
+    def test_without_cacheprovider(self, pytester):
+        """
+        Without the pytest cache there is nowhere to keep the index, so the
+        option is refused instead of failing inside the plugin.
+        """
+        result = pytester.runpytest_subprocess(
+            "-p", "no:cacheprovider", "--collection-index", "--collect-only", __file__
+        )
+
+        assert result.ret == pytest.ExitCode.USAGE_ERROR
+        result.stderr.fnmatch_lines(["*cannot be combined with -p no:cacheprovider"])
@@ -0,0 +1,123 @@
+import itertools
+
+import pytest
+
+from tests.plugins.covering_arrays import (
+    _covering_rows,
+    covering_array,
+    covering_parametrize,
+    report_covering_arrays,
+    uncovered_combinations,
+)
+
+CONFIG_DOMAINS = {
+    "string": ["Hello, world!", "Pytest is great", ""],
+    "substring": ["world", "great", "Python", ""],
+    "repeat": [1, 2, 3],
+    "case": ["lower", "upper", "title"],
+}
+
+
+class TestCoveringArrays:
+    """
+    This class demonstrates generating a small set of cases covering every
+    pair of argument values, instead of listing cases by hand or running the
+    full product.
+    """
+
+    @covering_parametrize(
+        CONFIG_DOMAINS,
+        pinned=[{"string": "Hello, world!", "substring": "world", "case": "lower"}],
+    )
+    def test_string_contains(self, string, substring, repeat, case):
+        """
+        Checks the property from `TestParametrization.test_string_contains`
+        for every pair of values.
+        """
+        string = getattr(string * repeat, case)()
+        substring = getattr(substring, case)()
+        assert (substring in string) == (string.find(substring) >= 0)
+
+    def test_every_pair_is_covered(self):
+        """
+        The pairwise array is much smaller than the full product, but still
+        covers every pair of values.
+        """
+        domains = {f"argument{i}": list(range(5)) for i in range(6)}
+        array = covering_array(domains)
+
+        assert uncovered_combinations(array, domains) == set()
+        assert array.full_size == 5**6
+        assert len(array.cases) <= 40
+
+    def test_three_wise(self):
+        """
+        Higher strengths cover every combination of three values.
+        """
+        domains = {f"argument{i}": list(range(3)) for i in range(5)}
+        array = covering_array(domains, strength=3)
+
+        assert uncovered_combinations(array, domains) == set()
+        assert len(array.cases) < array.full_size
+
+    def test_pinned_cases_and_seed(self):
+        """
+        Pinned cases come first, and the same seed gives the same cases.
+        """
+        pinned = [{"string": "", "substring": "", "repeat": 3, "case": "title"}]
+        array = covering_array(CONFIG_DOMAINS, pinned=pinned, seed=1)
+
+        assert array.cases[0] == ("", "", 3, "title")
+        assert covering_array(CONFIG_DOMAINS, pinned=pinned, seed=1) == array
+        assert (
+            array.summary == f"{len(array.cases)} of 108 combinations (2-wise, seed 1)"
+        )
+
+    def test_rows_are_cached(self):
+        """
+        Domains of the same sizes reuse the generated rows, whatever their
+        values are.
+        """
+        domains = {f"argument{i}": list(range(4)) for i in range(8)}
+        array = covering_array(domains, seed=7)
+        hits = _covering_rows.cache_info().hits
+        letters = {name: list("abcd") for name in domains}
+        array_of_letters = covering_array(letters, seed=7)
+
+        assert _covering_rows.cache_info().hits == hits + 1
+        assert array_of_letters.cases == [
+            tuple("abcd"[value] for value in case) for case in array.cases
+        ]
+
+    def test_pinned_value_outside_the_domain(self):
+        """
+        A pinned value that is not in the domain of its argument is rejected
+        with the argument and its values.
+        """
+        with pytest.raises(ValueError, match="'Goodbye' of 'string' is not one of"):
+            covering_array(CONFIG_DOMAINS, pinned=[{"string": "Goodbye"}])
+
+    def test_unhashable_values(self):
+        """
+        Values do not have to be hashable, like the lists of `test_list_equality`.
+        """
+        domains = {"list1": [[1, 2, 3], [1, 2], []], "list2": [[1, 2, 3], [2, 1], []]}
+        array = covering_array(domains)
+
+        assert sorted(array.cases) == sorted(itertools.product(*domains.values()))
+
+    def test_report(self, pytester):
+        """
+        The reduction is reported once per test function.
+        """
+        items = pytester.getitems("""
+            from tests.plugins.covering_arrays import covering_parametrize
+
+            @covering_parametrize({"a": [1, 2, 3], "b": [1, 2, 3], "c": [1, 2, 3]})
+            def test_sum(a, b, c):
+                pass
+            """)
+
+        (line,) = report_covering_arrays(items)
+        assert line.startswith("covering array test_report.py::test_sum: ")
+        assert line.endswith(" of 27 combinations (2-wise, seed 0)")
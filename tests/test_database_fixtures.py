@@ -0,0 +1,220 @@
+import contextlib
+import hashlib
+import os
+import sqlite3
+
+import pytest
+
+SCHEMA = """
+CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+INSERT INTO users (name) VALUES ('Alice'), ('Bob');
+INSERT INTO settings (key, value) VALUES ('theme', 'dark');
+"""
+
+
+class ConnectionPool:
+    """
+    A pool of SQLite connections that already contain the schema.
+
+    Creating the schema is usually the most expensive part of a database test,
+    so it is done once per connection instead of once per test. Every test runs
+    inside a `SAVEPOINT` that is rolled back afterwards, which gives each test
+    a clean database without rebuilding anything.
+
+    With `database=":memory:"` each pooled connection is its own in-memory
+    database. With a file path, the schema is written to the file once and
+    reused by later runs until the schema changes. Parallel workers from
+    `pytest-xdist` each get their own file, so they never wait on each other's
+    locks.
+
+    !!! Note
+        The code under test must not call `commit()` on the connection, since
+        that would commit the savepoint of the test as well.
+    """
+
+    def __init__(self, schema, database=":memory:", size=4):
+        self.schema = schema
+        self.schema_version = int(hashlib.sha256(schema.encode()).hexdigest()[:7], 16)
+        self.database = database
+        worker = os.environ.get("PYTEST_XDIST_WORKER")
+        if database != ":memory:" and worker:
+            root, ext = os.path.splitext(database)
+            self.database = f"{root}-{worker}{ext}"
+        self.size = size
+        self.schema_builds = 0
+        self._idle = []
+
+    def _connect(self):
+        # isolation_level=None stops the sqlite3 module from opening
+        # transactions on its own, so the savepoints are fully under our control.
+        connection = sqlite3.connect(self.database, isolation_level=None)
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != self.schema_version:
+            self._create_schema(connection)
+        return connection
+
+    def _create_schema(self, connection):
+        # Everything the old schema created, apart from the internal objects
+        # of SQLite like `sqlite_sequence`, which cannot be dropped. Views and
+        # triggers go first, since they refer to the tables.
+        objects = connection.execute(
+            "SELECT type, name FROM sqlite_master "
+            "WHERE name NOT LIKE 'sqlite_%' "
+            "ORDER BY CASE type WHEN 'view' THEN 0 WHEN 'trigger' THEN 1 "
+            "WHEN 'index' THEN 2 ELSE 3 END"
+        ).fetchall()
+        for kind, name in objects:
+            connection.execute(f'DROP {kind.upper()} IF EXISTS "{name}"')
+        connection.executescript(self.schema)
+        connection.execute(f"PRAGMA user_version = {self.schema_version}")
+        self.schema_builds += 1
+
+    def acquire(self):
+        """
+        Return a connection from the pool, connecting if the pool is empty.
+        """
+        if self._idle:
+            return self._idle.pop()
+        return self._connect()
+
+    def release(self, connection):
+        """
+        Return a connection to the pool, closing it if the pool is full.
+        """
+        if connection.in_transaction:
+            connection.rollback()
+        if len(self._idle) < self.size:
+            self._idle.append(connection)
+        else:
+            connection.close()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Provide a pooled connection wrapped in a savepoint that is always rolled back.
+        """
+        connection = self.acquire()
+        connection.execute("SAVEPOINT test")
+        try:
+            yield connection
+        finally:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK TO test")
+                connection.execute("RELEASE test")
+            self.release(connection)
+
+    def close(self):
+        while self._idle:
+            self._idle.pop().close()
+
+
+@pytest.fixture(scope="session")
+def connection_pool():
+    """
+    Session wide connection pool, shared by every module in the test suite.
+    """
+    pool = ConnectionPool(SCHEMA)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def database_connection(connection_pool):
+    """
+    A database connection where every change is rolled back after the test.
+    """
+    with connection_pool.transaction() as connection:
+        yield connection
+
+
+class TestTransactionalDatabase:
+    """
+    This class demonstrates a database fixture that isolates tests with
+    savepoints instead of creating a fresh database for every test.
+
+    The two tests modifying the `users` table can run in any order, since each
+    of them starts from the same state.
+    """
+
+    def test_insert_user(self, database_connection):
+        """
+        The inserted row is visible within the test.
+        """
+        database_connection.execute("INSERT INTO users (name) VALUES ('Charlie')")
+        count = database_connection.execute("SELECT COUNT(*) FROM users").fetchone()
+        assert count == (3,)
+
+    def test_delete_users(self, database_connection):
+        """
+        Changes made by other tests are not visible here.
+        """
+        count = database_connection.execute("SELECT COUNT(*) FROM users").fetchone()
+        assert count == (2,)
+        database_connection.execute("DELETE FROM users")
+        count = database_connection.execute("SELECT COUNT(*) FROM users").fetchone()
+        assert count == (0,)
+
+    def test_schema_is_built_once(self, connection_pool):
+        """
+        Sequential tests reuse the same pooled connection, so the schema is
+        only created for the first of them.
+        """
+        for _ in range(3):
+            with connection_pool.transaction() as connection:
+                connection.execute("UPDATE settings SET value = 'light'")
+        assert connection_pool.schema_builds == 1
+
+    def test_file_database_is_reused_across_pools(self, tmp_path):
+        """
+        A file backed database keeps its schema between runs and only rebuilds
+        it when the schema changes.
+        """
+        database = str(tmp_path / "test.sqlite")
+        for _ in range(2):
+            pool = ConnectionPool(SCHEMA, database=database)
+            with pool.transaction() as connection:
+                connection.execute("DELETE FROM users")
+            pool.close()
+        assert pool.schema_builds == 0
+
+        pool = ConnectionPool(SCHEMA + "CREATE TABLE logs (line TEXT);", database)
+        with pool.transaction() as connection:
+            count = connection.execute("SELECT COUNT(*) FROM users").fetchone()
+        pool.close()
+        assert pool.schema_builds == 1
+        assert count == (2,)
+
+    def test_schema_change_drops_every_object(self, tmp_path):
+        """
+        Rebuilding the schema also drops views, triggers and indexes, and
+        leaves the internal `sqlite_sequence` table of AUTOINCREMENT alone.
+        """
+        database = str(tmp_path / "test.sqlite")
+        schema = """
+            CREATE TABLE events (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT);
+            CREATE INDEX events_by_name ON events (name);
+            CREATE VIEW event_names AS SELECT name FROM events;
+            CREATE TRIGGER events_insert AFTER INSERT ON events BEGIN SELECT 1; END;
+            INSERT INTO events (name) VALUES ('started');
+            """
+        pool = ConnectionPool(schema, database)
+        with pool.transaction():
+            pass
+        pool.close()
+
+        pool = ConnectionPool(schema + "CREATE TABLE logs (line TEXT);", database)
+        with pool.transaction() as connection:
+            names = connection.execute(
+                "SELECT type, name FROM sqlite_master ORDER BY type, name"
+            ).fetchall()
+        pool.close()
+        assert pool.schema_builds == 1
+        assert names == [
+            ("index", "events_by_name"),
+            ("table", "events"),
+            ("table", "logs"),
+            ("table", "sqlite_sequence"),
+            ("trigger", "events_insert"),
+            ("view", "event_names"),
+        ]
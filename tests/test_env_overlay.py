@@ -0,0 +1,182 @@
+import collections.abc
+import contextlib
+import os
+import subprocess
+import sys
+import timeit
+from unittest import mock
+
+import pytest
+
+_UNSET = object()
+
+
+class EnvironmentOverlay(collections.abc.MutableMapping):
+    """
+    Test-specific environment variables layered over `os.environ`.
+
+    `mock.patch.dict(os.environ, ...)` copies the whole environment to save it
+    and restores it key by key, which costs time proportional to the size of
+    the environment on every test. The overlay only remembers the original
+    value of a variable the first time it is changed, so `restore` runs in
+    O(changed keys).
+
+    Changes are written through to `os.environ`, which updates the environment
+    of the process itself, so subprocesses started inside the test see the
+    overlay as well.
+    """
+
+    def __init__(self, environ=None):
+        self._environ = os.environ if environ is None else environ
+        self._originals = {}
+
+    def _remember(self, key):
+        if key not in self._originals:
+            self._originals[key] = self._environ.get(key, _UNSET)
+
+    def __getitem__(self, key):
+        return self._environ[key]
+
+    def __setitem__(self, key, value):
+        self._remember(key)
+        self._environ[key] = value
+
+    def __delitem__(self, key):
+        if key not in self._environ:
+            raise KeyError(key)
+        self._remember(key)
+        del self._environ[key]
+
+    def __iter__(self):
+        return iter(self._environ)
+
+    def __len__(self):
+        return len(self._environ)
+
+    @property
+    def changed(self):
+        """
+        The names of the variables changed since the last `restore`.
+        """
+        return set(self._originals)
+
+    def restore(self):
+        """
+        Put back the original value of every changed variable.
+        """
+        for key, original in self._originals.items():
+            if original is _UNSET:
+                self._environ.pop(key, None)
+            else:
+                self._environ[key] = original
+        self._originals.clear()
+
+
+@contextlib.contextmanager
+def environment(values=(), **kwargs):
+    """
+    Apply an `EnvironmentOverlay` for the duration of the `with` block, a
+    replacement for `mock.patch.dict(os.environ, values)`.
+
+    A value of `None` removes the variable.
+    """
+    overlay = EnvironmentOverlay()
+    try:
+        for key, value in {**dict(values), **kwargs}.items():
+            if value is None:
+                overlay.pop(key, None)
+            else:
+                overlay[key] = value
+        yield overlay
+    finally:
+        overlay.restore()
+
+
+@pytest.fixture
+def env():
+    """
+    Provide an `EnvironmentOverlay` that is restored when the test is done.
+    """
+    overlay = EnvironmentOverlay()
+    yield overlay
+    overlay.restore()
+
+
+class TestEnvironmentOverlay:
+    """
+    This class demonstrates setting environment variables for a test without
+    saving and restoring the whole environment.
+    """
+
+    def test_mock_environment_variable(self, env):
+        """
+        The same test as `test_mock_environment_variable_pytest` in the
+        mocking section.
+        """
+        env["ENV_VAR"] = "mocked_value"
+        assert os.environ["ENV_VAR"] == "mocked_value"
+        assert os.getenv("ENV_VAR") == "mocked_value"
+
+    def test_restore(self):
+        """
+        Added, changed and removed variables are all put back.
+        """
+        os.environ["EXISTING_VAR"] = "original"
+        try:
+            with environment(ENV_VAR="mocked_value", EXISTING_VAR=None) as overlay:
+                overlay["EXISTING_VAR"] = "changed"
+                del overlay["EXISTING_VAR"]
+                assert overlay.changed == {"ENV_VAR", "EXISTING_VAR"}
+                assert "EXISTING_VAR" not in os.environ
+
+            assert "ENV_VAR" not in os.environ
+            assert os.environ["EXISTING_VAR"] == "original"
+        finally:
+            del os.environ["EXISTING_VAR"]
+
+    def test_subprocess_sees_overlay(self, env):
+        """
+        Subprocesses inherit the variables of the overlay.
+        """
+        env["ENV_VAR"] = "mocked_value"
+        output = subprocess.run(
+            [sys.executable, "-c", "import os; print(os.environ['ENV_VAR'])"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        assert output.strip() == "mocked_value"
+
+    def test_restore_only_touches_changed_keys(self):
+        """
+        Restoring does not write to variables that were never changed.
+        """
+        environ = mock.MagicMock(wraps={"A": "1", "B": "2"})
+        overlay = EnvironmentOverlay(environ)
+        overlay["A"] = "changed"
+        environ.reset_mock()
+
+        overlay.restore()
+        environ.__setitem__.assert_called_once_with("A", "1")
+
+    @pytest.mark.benchmark
+    def test_benchmark_against_patch_dict(self, env):
+        """
+        Compares `mock.patch.dict` and the overlay in a large environment of
+        2 000 variables.
+        """
+        for i in range(2_000):
+            env[f"LARGE_ENV_{i}"] = "x" * 100
+
+        def with_patch_dict():
+            with mock.patch.dict(os.environ, {"ENV_VAR": "mocked_value"}):
+                pass
+
+        def with_overlay():
+            with environment(ENV_VAR="mocked_value"):
+                pass
+
+        number = 5
+        for benchmark in [with_patch_dict, with_overlay]:
+            seconds = min(timeit.repeat(benchmark, number=number, repeat=5))
+            print(f"{benchmark.__name__}: {seconds / number * 1e6:.1f}us per test")
@@ -66,6 +66,7 @@ class TestExceptionHandling:
         with pytest.raises(expected_exception, match=expected_message):
             function_that_raises(input_value)
 
+    @pytest.mark.pure
     def test_no_exception(self):
         """
         This test verifies that no exception is raised for positive input except 99.
@@ -0,0 +1,329 @@
+import contextlib
+import functools
+import pkgutil
+import timeit
+from unittest import mock
+
+import pytest
+
+import tests.test_mocking
+from tests.test_mocking import ClassToMock, function_to_mock
+
+_MISSING = object()
+_MOCKS = {}
+_IN_USE = set()
+# The instance attributes of a new MagicMock, anything else was set by a test.
+_PRISTINE = frozenset(vars(mock.MagicMock()))
+
+
+@functools.cache
+def resolve_target(target):
+    """
+    Resolve a dotted target like `"tests.test_mocking.function_to_mock"` into
+    the object that owns the attribute and the name of the attribute.
+
+    `mock.patch` imports and walks the dotted path every time it is used, here
+    the result is cached for the rest of the session.
+
+    !!! Note
+        Since the owner is only looked up once, patching the owner itself (for
+        example replacing `ClassToMock`) does not redirect later patches of
+        its attributes.
+    """
+    try:
+        owner_name, attribute = target.rsplit(".", 1)
+    except ValueError:
+        raise TypeError(
+            f"Need a valid target to patch. You supplied: {target!r}"
+        ) from None
+    return pkgutil.resolve_name(owner_name), attribute
+
+
+def reusable_mock(target, **configure):
+    """
+    Return the `MagicMock` used for `target`, reset to a pristine state.
+
+    Creating a `MagicMock` is by far the most expensive part of patching, so
+    one mock per target is kept and reset instead of building a new one. The
+    kept mock is in use until it is given back with `release_mock`, while it
+    is in use, like for nested patches of the same target, a new mock is
+    returned instead.
+
+    !!! Note
+        The kept mock is reset the next time the target is patched, do not
+        hold on to it after its patch was undone.
+    """
+    if target in _IN_USE:
+        return mock.MagicMock(**configure)
+    _IN_USE.add(target)
+    mocked = _MOCKS.get(target)
+    if mocked is None:
+        mocked = _MOCKS[target] = mock.MagicMock()
+    else:
+        _reset(mocked)
+    if configure:
+        mocked.configure_mock(**configure)
+    return mocked
+
+
+def _reset(mocked):
+    mocked.reset_mock(return_value=True, side_effect=True)
+    # Attributes configured by an earlier test, like
+    # `mocked.json.return_value` or `mocked.name = "value"`, must not leak
+    # into the next one.
+    mocked._mock_children.clear()
+    for name in set(vars(mocked)) - _PRISTINE:
+        del vars(mocked)[name]
+    # Configured magic methods live on the class of the mock, they are put
+    # back to the proxies of a new MagicMock.
+    magics = type(mocked)
+    for name, value in list(vars(magics).items()):
+        if name.startswith("__") and not isinstance(value, mock.MagicProxy):
+            if name in mock._all_magics:
+                delattr(magics, name)
+    mocked._mock_set_magics()
+
+
+def release_mock(target, mocked):
+    """
+    Give back a mock returned by `reusable_mock`, so it can be reused.
+    """
+    if _MOCKS.get(target) is mocked:
+        _IN_USE.discard(target)
+
+
+class FastPatcher:
+    """
+    Patches one or many dotted targets with cached target resolution and
+    reusable mocks.
+
+    It is used like `mocker.patch`, every patch is undone by `undo`, which the
+    `fast_patcher` fixture calls at teardown.
+    """
+
+    def __init__(self):
+        self._undo = []
+
+    def patch(self, *targets, new=mock.DEFAULT, **configure):
+        """
+        Patch every target and return the replacement, or a tuple of
+        replacements when more than one target is given.
+
+        Without `new` each target is replaced by a reusable `MagicMock`, which is
+        configured with the keyword arguments, for example `return_value=...`.
+        """
+        replacements = []
+        for target in targets:
+            owner, attribute = resolve_target(target)
+            original = vars(owner).get(attribute, _MISSING)
+            if original is _MISSING and not hasattr(owner, attribute):
+                raise AttributeError(
+                    f"{owner!r} does not have the attribute {attribute!r}"
+                )
+
+            if new is mock.DEFAULT:
+                replacement = reusable_mock(target, **configure)
+            else:
+                replacement = new
+            setattr(owner, attribute, replacement)
+            self._undo.append((target, owner, attribute, original, replacement))
+            replacements.append(replacement)
+        return replacements[0] if len(replacements) == 1 else tuple(replacements)
+
+    def undo(self):
+        """
+        Restore every patched target, in reverse order.
+        """
+        while self._undo:
+            target, owner, attribute, original, replacement = self._undo.pop()
+            if original is _MISSING:
+                # The attribute was inherited, e.g. from a base class.
+                delattr(owner, attribute)
+            else:
+                setattr(owner, attribute, original)
+            release_mock(target, replacement)
+
+
+@contextlib.contextmanager
+def fast_patch(*targets, new=mock.DEFAULT, **configure):
+    """
+    Context manager version of `FastPatcher.patch`.
+    """
+    patcher = FastPatcher()
+    try:
+        yield patcher.patch(*targets, new=new, **configure)
+    finally:
+        patcher.undo()
+
+
+class SubClassToMock(ClassToMock):
+    """
+    Class for demonstration purposes, inheriting `variable` from `ClassToMock`.
+    """
+
+
+@pytest.fixture
+def fast_patcher():
+    """
+    Provide a `FastPatcher` that is undone when the test is done.
+    """
+    patcher = FastPatcher()
+    yield patcher
+    patcher.undo()
+
+
+class TestFastPatch:
+    """
+    This class demonstrates a faster alternative to `mock.patch` for tests
+    that patch a lot of targets.
+    """
+
+    def test_mock_function(self):
+        """
+        Replacing a function, like with `mock.patch`.
+        """
+        with fast_patch("tests.test_mocking.function_to_mock", new=lambda: "mocked"):
+            assert tests.test_mocking.function_to_mock() == "mocked"
+        assert tests.test_mocking.function_to_mock() == "original result"
+
+    def test_assert_called_with(self, fast_patcher):
+        """
+        The default replacement is a `MagicMock`, configured with the keyword
+        arguments.
+        """
+        mocked_function = fast_patcher.patch(
+            "tests.test_mocking.function_to_mock", return_value="mocked result"
+        )
+        assert tests.test_mocking.function_to_mock("argument") == "mocked result"
+        mocked_function.assert_called_once_with("argument")
+
+    def test_mocks_are_reused_but_reset(self, fast_patcher):
+        """
+        The same mock is handed out for the same target, but without the calls
+        and configuration of the previous use.
+        """
+        with fast_patch("tests.test_mocking.function_to_mock") as first:
+            first.json.return_value = {"key": "value"}
+            tests.test_mocking.function_to_mock()
+
+        second = fast_patcher.patch("tests.test_mocking.function_to_mock")
+        assert second is first
+        second.assert_not_called()
+        assert second.json() != {"key": "value"}
+
+    def test_attributes_and_magic_methods_are_reset(self, fast_patcher):
+        """
+        Plain attributes and configured magic methods of the previous use are
+        gone too, the reused mock behaves like a new `MagicMock`.
+        """
+        with fast_patch("tests.test_mocking.function_to_mock") as first:
+            first.foo = "leak"
+            first.__len__.return_value = 1
+            first.__iter__ = lambda self: iter([1, 2])
+            assert len(first) == 1
+
+        second = fast_patcher.patch("tests.test_mocking.function_to_mock")
+        fresh = mock.MagicMock()
+        assert second is first
+        assert isinstance(second.foo, mock.MagicMock)
+        assert len(second) == len(fresh) == 0
+        assert list(second) == list(fresh) == []
+        second.__len__.return_value = 3
+        assert len(second) == 3
+
+    def test_nested_patches_get_their_own_mock(self, fast_patcher):
+        """
+        While the kept mock of a target is in use, patching the target again
+        gives a new mock, which does not reset the outer one.
+        """
+        outer = fast_patcher.patch("tests.test_mocking.function_to_mock")
+        tests.test_mocking.function_to_mock()
+
+        with fast_patch("tests.test_mocking.function_to_mock") as inner:
+            assert inner is not outer
+            tests.test_mocking.function_to_mock()
+        inner.assert_called_once()
+        outer.assert_called_once()
+        assert tests.test_mocking.function_to_mock is outer
+
+        fast_patcher.undo()
+        with fast_patch("tests.test_mocking.function_to_mock") as reused:
+            assert reused is outer
+
+    def test_many_targets(self, fast_patcher):
+        """
+        Several targets can be patched in one call.
+        """
+        mocked_function, mocked_method = fast_patcher.patch(
+            "tests.test_mocking.function_to_mock",
+            "tests.test_mocking.ClassToMock.method",
+            return_value="mocked",
+        )
+        assert tests.test_mocking.function_to_mock() == "mocked"
+        assert ClassToMock().method() == "mocked"
+        mocked_function.assert_called_once()
+        mocked_method.assert_called_once()
+
+        fast_patcher.undo()
+        assert ClassToMock().method() == "original method result"
+        assert tests.test_mocking.function_to_mock is function_to_mock
+
+    def test_inherited_attribute_is_restored(self, fast_patcher):
+        """
+        Patching an attribute inherited from a base class shadows it on the
+        subclass, undoing the patch removes the shadow again.
+        """
+        fast_patcher.patch(
+            "tests.test_fast_patch.SubClassToMock.variable", new="mocked variable"
+        )
+        assert SubClassToMock.variable == "mocked variable"
+
+        fast_patcher.undo()
+        assert "variable" not in vars(SubClassToMock)
+        assert SubClassToMock.variable == "original variable"
+
+    def test_invalid_target(self):
+        """
+        Invalid targets raise the same errors as `mock.patch`.
+        """
+        with pytest.raises(TypeError, match="Need a valid target"):
+            with fast_patch("function_to_mock"):
+                pass
+        with pytest.raises(AttributeError, match="does not have the attribute"):
+            with fast_patch("tests.test_mocking.missing_function"):
+                pass
+
+    @pytest.mark.benchmark
+    @pytest.mark.parametrize("targets", [1, 30])
+    def test_benchmark_against_mock_patch(self, mocker, targets):
+        """
+        Compares patching the examples from `TestMockingFunctions` and
+        `TestMockingClasses` with `mock.patch`, `mocker.patch` and `fast_patch`.
+        """
+        names = [
+            "tests.test_mocking.function_to_mock",
+            "tests.test_mocking.ClassToMock.method",
+        ]
+        names = (names * targets)[:targets]
+
+        def with_mock_patch():
+            with contextlib.ExitStack() as stack:
+                for name in names:
+                    stack.enter_context(mock.patch(name))
+
+        def with_mocker_patch():
+            for name in names:
+                mocker.patch(name)
+            mocker.stopall()
+
+        def with_fast_patch():
+            with fast_patch(*names):
+                pass
+
+        number = 200
+        for benchmark in [with_mock_patch, with_mocker_patch, with_fast_patch]:
+            seconds = min(timeit.repeat(benchmark, number=number, repeat=5))
+            print(
+                f"{benchmark.__name__} {targets} targets: "
+                f"{seconds / number * 1e6:.1f}us per test"
+            )
@@ -0,0 +1,289 @@
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import re
+import tempfile
+from pathlib import Path
+
+import pytest
+
+MISSING = object()
+
+
+class FixtureCache:
+    """
+    A decorator that persists the return value of an expensive fixture between
+    test runs.
+
+    The value is pickled to disk, keyed by the module and qualified name of
+    the fixture, a hash of its source code and its parameters, and loaded
+    instead of calling the fixture on the next run. Editing the fixture changes
+    the source hash, so stale entries are never used and are removed the next
+    time the fixture is stored. When the store grows beyond `max_bytes`, the
+    least recently used entries are evicted.
+
+    By default the entries live in pytest's own cache directory, so
+    `pytest --cache-clear` also clears the fixture cache.
+
+    !!! Note
+        Only fixtures that return or yield a picklable value can be cached.
+        The teardown code of a fixture using `yield` only runs when the value
+        was built, a value loaded from the cache has nothing to tear down.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = Path(directory) if directory is not None else None
+
+    def __call__(self, func):
+        # Fixtures with the same name in different modules get their own entries.
+        name = re.sub(r"[^\w.]", "_", f"{func.__module__}.{func.__qualname__}")
+        source_hash = _hash(inspect.getsource(func))
+        signature = inspect.signature(func)
+        takes_request = "request" in signature.parameters
+
+        def lookup(request, kwargs):
+            key = _hash(repr((getattr(request, "param", None), sorted(kwargs.items()))))
+            directory = self._resolve_directory(request)
+            if takes_request:
+                kwargs["request"] = request
+            return directory, key, self.load(directory, name, source_hash, key)
+
+        if inspect.isgeneratorfunction(func):
+
+            @functools.wraps(func)
+            def wrapper(*args, request, **kwargs):
+                directory, key, value = lookup(request, kwargs)
+                if value is not MISSING:
+                    yield value
+                    return
+                generator = func(*args, **kwargs)
+                value = next(generator)
+                self.store(directory, name, source_hash, key, value)
+                yield value
+                # The teardown code, a second `yield` is reported by pytest.
+                yield from generator
+
+        else:
+
+            @functools.wraps(func)
+            def wrapper(*args, request, **kwargs):
+                directory, key, value = lookup(request, kwargs)
+                if value is MISSING:
+                    value = func(*args, **kwargs)
+                    self.store(directory, name, source_hash, key, value)
+                return value
+
+        if not takes_request:
+            parameters = list(signature.parameters.values())
+            parameters.append(
+                inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY)
+            )
+            wrapper.__signature__ = signature.replace(parameters=parameters)
+        return wrapper
+
+    def _resolve_directory(self, request):
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            return self.directory
+        return request.config.cache.mkdir("fixture-cache")
+
+    def load(self, directory, name, source_hash, key):
+        """
+        Return the cached value, or `MISSING` if there is no usable entry.
+        """
+        path = directory / f"{name}.{source_hash}.{key}.pickle"
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return MISSING
+        except Exception:
+            # A corrupt or incompatible entry is treated as a cache miss.
+            path.unlink(missing_ok=True)
+            return MISSING
+        # The modification time doubles as the "last used" timestamp.
+        os.utime(path)
+        return value
+
+    def store(self, directory, name, source_hash, key, value):
+        """
+        Write a value to the store, drop entries built from an older version of
+        the fixture and evict the least recently used entries above the size limit.
+        """
+        for stale in directory.glob(f"{name}.*.pickle"):
+            # The name itself contains dots, the hashes never do.
+            stale_name, stale_hash, _, _ = stale.name.rsplit(".", 3)
+            if stale_name == name and stale_hash != source_hash:
+                stale.unlink(missing_ok=True)
+
+        path = directory / f"{name}.{source_hash}.{key}.pickle"
+        # Write to a temporary file first so a parallel run never reads a
+        # partially written entry.
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self.evict(directory)
+
+    def evict(self, directory):
+        """
+        Remove the least recently used entries until the store fits in `max_bytes`.
+        """
+        entries = []
+        for path in directory.glob("*.pickle"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+def _hash(text):
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+CACHED_SUITE = """
+import pytest
+from tests.test_fixture_cache import FixtureCache
+
+fixture_cache = FixtureCache()
+BUILDS = []
+
+@pytest.fixture(scope="session")
+@fixture_cache
+def app_config():
+    BUILDS.append("app_config")
+    return {{"version": "{version}", "name": "Sample Application"}}
+
+@pytest.fixture(params=["dark", "light"])
+@fixture_cache
+def complex_data(request, app_config):
+    BUILDS.append("complex_data")
+    return {{"theme": request.param, "version": app_config["version"]}}
+
+def test_config(app_config, complex_data):
+    assert complex_data["version"] == app_config["version"] == "{version}"
+
+def test_builds():
+    print("\\nBUILDS", sorted(BUILDS))
+"""
+
+
+class TestFixtureCache:
+    """
+    This class demonstrates caching expensive fixtures across test runs.
+
+    Each test runs a small suite twice with `pytester`, the second run should
+    load the fixtures from disk instead of building them again.
+    """
+
+    def run_suite(self, pytester, version="1.0.0"):
+        pytester.makepyfile(test_suite=CACHED_SUITE.format(version=version))
+        result = pytester.runpytest("-s")
+        result.assert_outcomes(passed=3)
+        return [line for line in result.outlines if line.startswith("BUILDS")][0]
+
+    def test_second_run_loads_from_cache(self, pytester):
+        """
+        The first run builds every fixture, the second run builds nothing.
+        """
+        first = self.run_suite(pytester)
+        second = self.run_suite(pytester)
+
+        assert first == "BUILDS ['app_config', 'complex_data', 'complex_data']"
+        assert second == "BUILDS []"
+
+    def test_source_change_invalidates(self, pytester):
+        """
+        Changing the fixture source code rebuilds the fixture and removes the
+        stale entries. The dependent fixture is rebuilt as well, since the value
+        of `app_config` is part of its key.
+        """
+        self.run_suite(pytester, version="1.0.0")
+        rebuilt = self.run_suite(pytester, version="2.0.0")
+
+        assert rebuilt == "BUILDS ['app_config', 'complex_data', 'complex_data']"
+        cache_dir = pytester.path / ".pytest_cache" / "d" / "fixture-cache"
+        assert len(list(cache_dir.glob("test_suite.app_config.*.pickle"))) == 1
+
+    def test_least_recently_used_is_evicted(self, tmp_path):
+        """
+        When the store exceeds `max_bytes`, the entry that was used the longest
+        time ago is removed first.
+        """
+        cache = FixtureCache(max_bytes=2500, directory=tmp_path)
+        cache.store(tmp_path, "first", "src", "key", b"1" * 1000)
+        cache.store(tmp_path, "second", "src", "key", b"2" * 1000)
+        os.utime(tmp_path / "first.src.key.pickle", (0, 0))
+        os.utime(tmp_path / "second.src.key.pickle", (1, 1))
+
+        # Using "first" makes "second" the least recently used entry.
+        assert cache.load(tmp_path, "first", "src", "key") == b"1" * 1000
+        cache.store(tmp_path, "third", "src", "key", b"3" * 1000)
+
+        assert cache.load(tmp_path, "second", "src", "key") is MISSING
+        assert cache.load(tmp_path, "first", "src", "key") == b"1" * 1000
+        assert cache.load(tmp_path, "third", "src", "key") == b"3" * 1000
+
+    def test_same_name_in_different_modules(self, pytester):
+        """
+        Fixtures with the same name in different modules are cached apart, and
+        do not remove each other's entries.
+        """
+        for module in ["first", "second"]:
+            pytester.makepyfile(**{f"test_{module}": f"""
+                    import pytest
+                    from tests.test_fixture_cache import FixtureCache
+
+                    @pytest.fixture
+                    @FixtureCache()
+                    def app_config():
+                        print("BUILD {module}")
+                        return {{"name": "{module}"}}
+
+                    def test_config(app_config):
+                        assert app_config["name"] == "{module}"
+                    """})
+        pytester.runpytest("-s").assert_outcomes(passed=2)
+        result = pytester.runpytest("-s")
+
+        result.assert_outcomes(passed=2)
+        assert not [line for line in result.outlines if line.startswith("BUILD")]
+
+    def test_generator_fixtures(self, pytester):
+        """
+        The value of a fixture using `yield` is cached too, and its teardown
+        code only runs after the value was built.
+        """
+        pytester.makepyfile("""
+            import pytest
+            from tests.test_fixture_cache import FixtureCache
+
+            @pytest.fixture(scope="session")
+            @FixtureCache()
+            def app_config():
+                print("SETUP")
+                yield {"version": "1.0.0", "name": "Sample Application"}
+                print("TEARDOWN")
+
+            def test_config(app_config):
+                assert app_config["version"] == "1.0.0"
+            """)
+        first = pytester.runpytest("-s")
+        second = pytester.runpytest("-s")
+
+        first.assert_outcomes(passed=1)
+        second.assert_outcomes(passed=1)
+        first.stdout.fnmatch_lines(["*SETUP*", "*TEARDOWN*"])
+        assert "SETUP" not in second.stdout.str()
+        assert "TEARDOWN" not in second.stdout.str()
@@ -0,0 +1,185 @@
+from tests.plugins.fixture_profiling import FixtureProfiler
+
+PROFILED_SUITE = """
+import pytest
+
+@pytest.fixture(scope="session")
+def app_config():
+    return {"version": "1.0.0"}
+
+@pytest.fixture
+def complex_data(app_config):
+    return {"users": ["Alice", "Bob"], "version": app_config["version"]}
+
+@pytest.fixture
+def shopping_cart():
+    return []
+
+@pytest.fixture
+def temp_file(tmp_path):
+    return tmp_path / "temp_file.txt"
+
+def test_one(complex_data, shopping_cart, temp_file):
+    shopping_cart.append("apple")
+
+def test_two(complex_data, shopping_cart, temp_file):
+    shopping_cart.append("pear")
+"""
+
+
+class TestFixtureProfiler:
+    """
+    This class demonstrates how a small plugin can hook into
+    `pytest_fixture_setup` to find out where fixture time is spent.
+
+    The `pytester` fixture runs a throw away test suite in a temporary directory,
+    which is the usual way of testing pytest plugins.
+    """
+
+    def test_counts_every_rebuild(self, pytester):
+        """
+        Function scoped fixtures are set up once per test, while the session
+        scoped fixture is only set up once.
+        """
+        pytester.makepyfile(PROFILED_SUITE)
+        profiler = FixtureProfiler()
+        pytester.inline_run(plugins=[profiler]).assertoutcome(passed=2)
+
+        module = "test_counts_every_rebuild.py"
+        assert profiler.stats[f"{module}::complex_data"].setups == 2
+        assert profiler.stats[f"{module}::shopping_cart"].setups == 2
+        assert profiler.stats[f"{module}::app_config"].setups == 1
+        assert profiler.ranked()[0].total_time >= profiler.ranked()[-1].total_time
+
+    def test_teardown_is_timed(self, pytester):
+        """
+        Teardown time covers the code after `yield` in a fixture.
+        """
+        pytester.makepyfile("""
+            import time
+            import pytest
+
+            @pytest.fixture
+            def slow_teardown():
+                yield
+                time.sleep(0.05)
+
+            def test_one(slow_teardown):
+                pass
+            """)
+        profiler = FixtureProfiler()
+        pytester.inline_run(plugins=[profiler]).assertoutcome(passed=1)
+
+        stats = profiler.stats["test_teardown_is_timed.py::slow_teardown"]
+        assert stats.teardown_time >= 0.05
+        assert stats.setup_time < stats.teardown_time
+
+    def test_promotion_advice(self, pytester):
+        """
+        Only fixtures that always build the same value, are not mutated by the
+        tests and do not depend on function scoped fixtures are suggested for
+        promotion.
+        """
+        pytester.makepyfile(PROFILED_SUITE)
+        profiler = FixtureProfiler()
+        pytester.inline_run(plugins=[profiler])
+
+        advice = {
+            name.rpartition("::")[2]: profiler.promotion_advice(s)
+            for name, s in profiler.stats.items()
+        }
+        assert advice["complex_data"] == "session"
+        assert advice["shopping_cart"] is None  # mutated by the tests
+        assert advice["temp_file"] is None  # depends on tmp_path
+        assert advice["app_config"] is None  # already session scoped
+
+    def test_peak_memory(self, pytester):
+        """
+        With `trace_memory=True` the peak allocation during setup is recorded.
+        """
+        pytester.makepyfile("""
+            import pytest
+
+            @pytest.fixture
+            def big_list():
+                return [0] * 100_000
+
+            def test_one(big_list):
+                pass
+            """)
+        profiler = FixtureProfiler(trace_memory=True)
+        pytester.inline_run(plugins=[profiler])
+
+        stats = profiler.stats["test_peak_memory.py::big_list"]
+        assert stats.peak_memory >= 100_000 * 8
+
+    def test_tracing_stopped_by_a_fixture(self, pytester):
+        """
+        A fixture that stops `tracemalloc` does not break the profiler.
+        """
+        pytester.makepyfile("""
+            import tracemalloc
+            import pytest
+
+            @pytest.fixture
+            def untraced():
+                tracemalloc.stop()
+                yield
+                tracemalloc.start()
+
+            def test_one(untraced):
+                pass
+            """)
+        profiler = FixtureProfiler(trace_memory=True)
+        pytester.inline_run(plugins=[profiler]).assertoutcome(passed=1)
+
+        stats = profiler.stats["test_tracing_stopped_by_a_fixture.py::untraced"]
+        assert stats.peak_memory == 0
+
+    def test_overridden_fixtures(self, pytester):
+        """
+        Fixtures with the same name in different modules are measured
+        separately, like the same name in `conftest.py` and a test module.
+        """
+        pytester.makeconftest("""
+            import pytest
+
+            @pytest.fixture
+            def number():
+                return 1
+            """)
+        pytester.makepyfile(
+            test_default="def test_default(number):\n    assert number == 1\n",
+            test_override="""
+                import pytest
+
+                @pytest.fixture
+                def number(number):
+                    return number + 1
+
+                def test_override(number):
+                    assert number == 2
+                """,
+        )
+        profiler = FixtureProfiler()
+        pytester.inline_run(plugins=[profiler]).assertoutcome(passed=2)
+
+        # The node ID of the root directory is ".".
+        assert profiler.stats[".::number"].setups == 2
+        override = profiler.stats["test_override.py::number"]
+        assert override.setups == 1
+        assert override.dependencies == (".::number",)
+
+    def test_terminal_report(self, pytester):
+        """
+        The report is written at the end of the run.
+        """
+        pytester.makepyfile(PROFILED_SUITE)
+        result = pytester.runpytest(plugins=[FixtureProfiler()])
+
+        result.stdout.fnmatch_lines(
+            [
+                "*fixture profile*",
+                "*::complex_data*function*2*promote to scope='session'",
+            ]
+        )
@@ -40,6 +40,9 @@ class TestFixtures:
         """
         This fixture mocks a database connection. It is set to module
         scope so it will be setup once per module and shared between tests.
+
+        See [database fixtures](database-fixtures.md) for a pooled SQLite
+        version where every test runs in its own transaction.
         """
         connection = "database_connection"
         yield connection
@@ -0,0 +1,162 @@
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+import tests.test_mocking
+from tests.plugins.fork_isolation import ForkServer
+from tests.plugins.result_cache import ResultCache
+
+
+class TestForkIsolation:
+    """
+    This class demonstrates running tests that change module globals in a
+    forked process, without paying for a new interpreter.
+    """
+
+    @pytest.mark.isolated
+    def test_change_global(self):
+        """
+        Changes the globals of `tests.test_mocking` without patching.
+        """
+        tests.test_mocking.VARIABLE = "changed_value"
+        tests.test_mocking.ClassToMock.variable = "changed variable"
+
+    def test_globals_are_unchanged(self):
+        """
+        Runs after `test_change_global`, which changed nothing outside its
+        process.
+        """
+        assert tests.test_mocking.VARIABLE == "original_value"
+        assert tests.test_mocking.ClassToMock.variable == "original variable"
+
+    def test_reports_and_fixtures(self, pytester):
+        """
+        Failures and output of the child are reported, and module scoped
+        fixtures are set up in the main process before the first isolated test
+        are shared with it.
+        """
+        pytester.makepyfile("""
+            import os
+            import pytest
+
+            pids = []
+
+            @pytest.fixture(scope="module")
+            def database_connection():
+                pids.append(os.getpid())
+
+            def test_first(database_connection):
+                pass
+
+            @pytest.mark.isolated
+            def test_isolated(database_connection):
+                print("output of the child")
+                assert pids == [os.getppid()]
+                assert False
+
+            def test_shared(database_connection):
+                assert pids == [os.getpid()]
+            """)
+        result = pytester.runpytest(plugins=[ForkServer()])
+
+        result.assert_outcomes(passed=2, failed=1)
+        result.stdout.fnmatch_lines(["*output of the child*"])
+
+    def test_crashed_child(self, pytester):
+        """
+        A test that kills its process only fails itself.
+        """
+        pytester.makepyfile("""
+            import os
+
+            def test_exits():
+                os._exit(3)
+
+            def test_passes():
+                pass
+            """)
+        result = pytester.runpytest(plugins=[ForkServer(isolate_all=True)])
+
+        result.assert_outcomes(passed=1, failed=1)
+        result.stdout.fnmatch_lines(
+            ["*isolated test process exited with 3 before reporting"]
+        )
+
+    def test_preload(self, pytester):
+        """
+        The modules of `lazy_import` in the modules of isolated tests are
+        imported once, before the first child is forked.
+        """
+        pytester.makepyfile("""
+            import sys
+            import pytest
+            from tests.plugins.import_profiling import lazy_import
+
+            json = lazy_import("json.tool")
+
+            @pytest.mark.isolated
+            def test_isolated():
+                pass
+
+            def test_imported():
+                assert "json.tool" in sys.modules
+            """)
+        sys.modules.pop("json.tool", None)
+        pytester.inline_run(plugins=[ForkServer()]).assertoutcome(passed=2)
+
+    def test_cached_pure_tests_are_not_forked(self, pytester):
+        """
+        With `--isolate` a pure test that the result cache already knows is
+        reported as cached instead of being run in a child.
+        """
+        pytester.makepyfile("""
+            import pytest
+
+            @pytest.mark.pure
+            def test_pure():
+                pass
+            """)
+        pytester.inline_run(plugins=[ResultCache()]).assertoutcome(passed=1)
+
+        # Registered after the result cache, like by `conftest.py`.
+        cache = ResultCache()
+        forks = []
+        fork_server = ForkServer(isolate_all=True)
+        fork_server.run_forked = forks.append
+        result = pytester.runpytest(plugins=[cache, fork_server])
+
+        result.stdout.fnmatch_lines(["*1 cached-pass*"])
+        assert cache.cached == ["test_cached_pure_tests_are_not_forked.py::test_pure"]
+        assert forks == []
+
+    @pytest.mark.benchmark
+    def test_benchmark_against_subprocess(self, pytester):
+        """
+        Compares isolating 20 tests in forked children and in new interpreters.
+        """
+        pytester.makepyfile("""
+            import pytest
+            import tests.test_mocking
+
+            @pytest.mark.parametrize("number", range(20))
+            def test_change_global(number):
+                tests.test_mocking.VARIABLE = number
+            """)
+        start = time.perf_counter()
+        pytester.inline_run(plugins=[ForkServer(isolate_all=True)])
+        print(f"fork server: {time.perf_counter() - start:.2f}s")
+
+        env = dict(os.environ, PYTHONPATH=str(Path(__file__).parents[1]))
+        start = time.perf_counter()
+        for number in range(20):
+            subprocess.run(
+                [sys.executable, "-m", "pytest", "-q", f"-k={number}"],
+                cwd=pytester.path,
+                env=env,
+                capture_output=True,
+            )
+        print(f"new interpreters: {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,307 @@
+import contextlib
+import hashlib
+import http.server
+import json
+import mmap
+import os
+import struct
+import threading
+from unittest import mock
+
+import pytest
+
+from tests.plugins.import_profiling import lazy_import
+
+requests = lazy_import("requests")
+
+HEADER = struct.Struct("<4sII")  # magic, number of slots, used slots
+SLOT = struct.Struct("<20sQI")  # request key, offset in data file, length
+MAGIC = b"CAS1"
+EMPTY_KEY = bytes(20)
+
+
+class CassetteMiss(LookupError):
+    """
+    Raised in replay mode for a request that is not in the cassette.
+    """
+
+
+class Cassette:
+    """
+    A compact on-disk store of recorded HTTP responses.
+
+    The responses are appended to a `.data` file, and a `.index` file holds an
+    open addressing hash table from request key to the position of the response
+    in the data file. The index is memory-mapped, so looking up a response only
+    touches the slot that is needed, no matter how many interactions the
+    cassette contains, and nothing has to be parsed up front like with YAML
+    cassettes.
+    """
+
+    def __init__(self, path, slots=1024):
+        self.index_path = f"{path}.index"
+        self.data_path = f"{path}.data"
+        if not os.path.exists(self.index_path):
+            self._create_index(self.index_path, slots)
+        self._index_file = open(self.index_path, "r+b")
+        self._index = mmap.mmap(self._index_file.fileno(), 0)
+        self._data = open(self.data_path, "a+b")
+
+    @staticmethod
+    def _create_index(path, slots):
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, slots, 0))
+            f.truncate(HEADER.size + slots * SLOT.size)
+
+    @staticmethod
+    def key(method, url, body=None):
+        """
+        Return the key identifying a request by method, URL and a hash of the body.
+        """
+        if isinstance(body, str):
+            body = body.encode()
+        body_hash = hashlib.sha256(body or b"").digest()
+        return hashlib.blake2b(
+            b"\0".join([method.upper().encode(), url.encode(), body_hash]),
+            digest_size=20,
+        ).digest()
+
+    def __len__(self):
+        return HEADER.unpack_from(self._index)[2]
+
+    def _find_slot(self, key):
+        # Linear probing, the table is never more than half full so an empty
+        # slot is always found after a few steps.
+        slots = HEADER.unpack_from(self._index)[1]
+        slot = int.from_bytes(key[:8], "little") % slots
+        while True:
+            position = HEADER.size + slot * SLOT.size
+            slot_key, offset, length = SLOT.unpack_from(self._index, position)
+            if slot_key in (key, EMPTY_KEY):
+                return position, slot_key, offset, length
+            slot = (slot + 1) % slots
+
+    def get(self, key):
+        """
+        Return the stored payload for `key`, or None.
+        """
+        _, slot_key, offset, length = self._find_slot(key)
+        if slot_key == EMPTY_KEY:
+            return None
+        return os.pread(self._data.fileno(), length, offset)
+
+    def put(self, key, payload):
+        """
+        Append a payload to the data file and point the index at it.
+        """
+        self._data.seek(0, os.SEEK_END)
+        offset = self._data.tell()
+        self._data.write(payload)
+        self._data.flush()
+
+        position, slot_key, _, _ = self._find_slot(key)
+        SLOT.pack_into(self._index, position, key, offset, len(payload))
+        if slot_key == EMPTY_KEY:
+            magic, slots, used = HEADER.unpack_from(self._index)
+            HEADER.pack_into(self._index, 0, magic, slots, used + 1)
+            if (used + 1) * 2 > slots:
+                self._grow(slots * 2)
+
+    def _grow(self, slots):
+        entries = []
+        for slot in range(HEADER.unpack_from(self._index)[1]):
+            entry = SLOT.unpack_from(self._index, HEADER.size + slot * SLOT.size)
+            if entry[0] != EMPTY_KEY:
+                entries.append(entry)
+        self._index.close()
+        self._index_file.close()
+
+        self._create_index(self.index_path, slots)
+        self._index_file = open(self.index_path, "r+b")
+        self._index = mmap.mmap(self._index_file.fileno(), 0)
+        for key, offset, length in entries:
+            position = self._find_slot(key)[0]
+            SLOT.pack_into(self._index, position, key, offset, length)
+        HEADER.pack_into(self._index, 0, MAGIC, slots, len(entries))
+
+    def close(self):
+        self._index.close()
+        self._index_file.close()
+        self._data.close()
+
+
+def _serialize(response):
+    meta = {
+        "status": response.status_code,
+        "reason": response.reason,
+        "url": response.url,
+        "headers": dict(response.headers),
+    }
+    return json.dumps(meta).encode() + b"\n" + response.content
+
+
+def _deserialize(payload, request):
+    meta, _, body = payload.partition(b"\n")
+    meta = json.loads(meta)
+    response = requests.Response()
+    response.status_code = meta["status"]
+    response.reason = meta["reason"]
+    response.url = meta["url"]
+    response.headers = requests.structures.CaseInsensitiveDict(meta["headers"])
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response._content = body
+    response.request = request
+    return response
+
+
+@contextlib.contextmanager
+def http_cassette(path, mode="replay"):
+    """
+    Record or replay every request made with `requests` through a `Cassette`.
+
+    The patch is applied to `HTTPAdapter.send`, which is used by `requests.get`
+    and friends as well as by a `requests.Session` with pooled connections.
+
+    Args:
+        path: Path of the cassette, without the `.index` and `.data` suffixes.
+        mode: `"record"` sends the requests and stores the responses,
+            `"replay"` serves the stored responses and raises `CassetteMiss`
+            for anything else.
+    """
+    if mode not in ("record", "replay"):
+        raise ValueError(f"Unknown cassette mode {mode!r}")
+    cassette = Cassette(path)
+    adapter_class = requests.adapters.HTTPAdapter
+    real_send = adapter_class.send
+
+    def send(adapter, request, **kwargs):
+        key = Cassette.key(request.method, request.url, request.body)
+        if mode == "record":
+            response = real_send(adapter, request, **kwargs)
+            cassette.put(key, _serialize(response))
+            return response
+        payload = cassette.get(key)
+        if payload is None:
+            raise CassetteMiss(
+                f"No recorded response for {request.method} {request.url}"
+            )
+        return _deserialize(payload, request)
+
+    try:
+        with mock.patch.object(adapter_class, "send", send):
+            yield cassette
+    finally:
+        cassette.close()
+
+
+class LocalApiHandler(http.server.BaseHTTPRequestHandler):
+    """
+    A tiny stand-in for a real API, answering with JSON.
+    """
+
+    requests_served = 0
+
+    def _respond(self, payload):
+        LocalApiHandler.requests_served += 1
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond({"key": "value", "path": self.path})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self._respond({"echo": json.loads(self.rfile.read(length))})
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def local_api():
+    """
+    Run `LocalApiHandler` in a background thread and provide its base URL.
+    """
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), LocalApiHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+class TestHttpCassette:
+    """
+    This class demonstrates recording responses from a local stand-in server
+    once and replaying them afterwards, instead of building every response
+    by hand with `Mock`.
+    """
+
+    def test_record_and_replay(self, local_api, tmp_path):
+        """
+        Responses recorded from the server are replayed without any network
+        access.
+        """
+        path = tmp_path / "api"
+        with http_cassette(path, mode="record"):
+            recorded = requests.get(f"{local_api}/data")
+
+        served = LocalApiHandler.requests_served
+        with http_cassette(path, mode="replay"):
+            response = requests.get(f"{local_api}/data")
+
+        assert LocalApiHandler.requests_served == served
+        assert response.status_code == 200
+        assert response.json() == recorded.json() == {"key": "value", "path": "/data"}
+        assert response.headers["Content-Type"] == "application/json"
+
+    def test_pooled_session(self, local_api, tmp_path):
+        """
+        A `requests.Session` goes through the same adapter, and requests with
+        different bodies are stored separately.
+        """
+        path = tmp_path / "api"
+        with http_cassette(path, mode="record"), requests.Session() as session:
+            for number in range(3):
+                session.post(f"{local_api}/echo", json={"number": number})
+
+        with (
+            http_cassette(path, mode="replay") as cassette,
+            requests.Session() as session,
+        ):
+            assert len(cassette) == 3
+            responses = [
+                session.post(f"{local_api}/echo", json={"number": number}).json()
+                for number in range(3)
+            ]
+
+        assert responses == [{"echo": {"number": n}} for n in range(3)]
+
+    def test_unknown_request(self, local_api, tmp_path):
+        """
+        Replaying a request that was never recorded fails loudly.
+        """
+        with http_cassette(tmp_path / "api", mode="replay"):
+            with pytest.raises(CassetteMiss, match="No recorded response for GET"):
+                requests.get(f"{local_api}/missing")
+
+    def test_index_grows(self, tmp_path):
+        """
+        The index doubles in size when it is half full, every entry stays
+        reachable.
+        """
+        cassette = Cassette(tmp_path / "large", slots=8)
+        keys = [
+            Cassette.key("GET", f"https://api.example.com/{i}") for i in range(1000)
+        ]
+        for i, key in enumerate(keys):
+            cassette.put(key, str(i).encode())
+
+        assert len(cassette) == 1000
+        assert all(cassette.get(key) == str(i).encode() for i, key in enumerate(keys))
+        assert cassette.get(Cassette.key("GET", "https://api.example.com/x")) is None
+        cassette.close()
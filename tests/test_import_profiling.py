@@ -0,0 +1,122 @@
+import sys
+
+import pytest
+
+from tests.plugins.import_profiling import ImportProfiler, LazyModule, lazy_import
+
+EXECUTED = []
+
+
+PROFILED_SUITE = """
+import heavy_dependency
+
+def test_one():
+    assert heavy_dependency.VALUE == 42
+"""
+
+HEAVY_DEPENDENCY = """
+import time
+
+time.sleep(0.2)
+VALUE = 42
+"""
+
+
+class TestImportProfiler:
+    """
+    This class demonstrates measuring where collection time goes and keeping
+    heavy imports out of it.
+    """
+
+    def test_profile(self, pytester):
+        """
+        The cost of a heavy dependency shows up for the test module importing
+        it and for the dependency itself.
+        """
+        pytester.makepyfile(
+            test_suite=PROFILED_SUITE, heavy_dependency=HEAVY_DEPENDENCY
+        )
+        pytester.syspathinsert()
+        profiler = ImportProfiler()
+        pytester.inline_run(plugins=[profiler]).assertoutcome(passed=1)
+
+        assert profiler.modules["test_suite.py"] >= 0.2
+        assert profiler.dependencies["heavy_dependency"] >= 0.2
+        assert profiler.dependencies.most_common(1)[0][0] == "heavy_dependency"
+        assert profiler.startup_time >= 0.2
+
+    def test_budget(self, pytester):
+        """
+        The run fails when startup takes longer than the budget, even though
+        every test passed.
+        """
+        pytester.makepyfile(
+            test_suite=PROFILED_SUITE, heavy_dependency=HEAVY_DEPENDENCY
+        )
+        pytester.syspathinsert()
+        result = pytester.runpytest(plugins=[ImportProfiler(budget=0.1)])
+
+        result.assert_outcomes(passed=1)
+        assert result.ret == pytest.ExitCode.TESTS_FAILED
+        result.stdout.fnmatch_lines(
+            [
+                "*import profile*",
+                "test_suite.py*",
+                "heavy_dependency*",
+                "startup took *s, over the budget of 0.1s",
+            ]
+        )
+
+    def test_lazy_import_moves_cost_to_the_test(self, pytester):
+        """
+        With `lazy_import` the dependency is only executed by the test that
+        uses it, so collection no longer attributes its cost to the module.
+        """
+        pytester.makepyfile(
+            test_lazy="""
+                from tests.plugins.import_profiling import lazy_import
+
+                heavy_dependency = lazy_import("heavy_dependency")
+
+                def test_one():
+                    assert heavy_dependency.VALUE == 42
+                """,
+            test_eager="""
+                import eager_dependency
+
+                def test_one():
+                    assert eager_dependency.VALUE == 42
+                """,
+            heavy_dependency=HEAVY_DEPENDENCY,
+            eager_dependency=HEAVY_DEPENDENCY,
+        )
+        pytester.syspathinsert()
+        profiler = ImportProfiler()
+        pytester.inline_run(plugins=[profiler]).assertoutcome(passed=2)
+
+        assert "heavy_dependency" not in profiler.dependencies
+        assert profiler.dependencies.most_common(1)[0][0] == "eager_dependency"
+        assert profiler.modules["test_lazy.py"] < profiler.modules["test_eager.py"]
+
+    def test_lazy_import(self, pytester):
+        """
+        The module is executed on first attribute access, and only once.
+        """
+        pytester.makepyfile(lazy_target="""
+                import tests.test_import_profiling
+
+                tests.test_import_profiling.EXECUTED.append(__name__)
+                VALUE = 42
+                """)
+        pytester.syspathinsert()
+        EXECUTED.clear()
+        try:
+            module = lazy_import("lazy_target")
+            assert EXECUTED == []
+            assert isinstance(module, LazyModule)
+            assert module.VALUE == 42
+            assert module.VALUE == 42
+            assert EXECUTED == ["lazy_target"]
+            assert lazy_import("lazy_target") is sys.modules["lazy_target"]
+        finally:
+            sys.modules.pop("lazy_target", None)
@@ -0,0 +1,233 @@
+import collections
+import itertools
+import logging
+
+import pytest
+
+from tests.test_logging import custom_log_function, function_to_log
+
+logger = logging.getLogger(__name__)
+
+
+class IndexedLogHandler(logging.Handler):
+    """
+    A log handler that indexes the captured records by level and logger.
+
+    `caplog.records` is a plain list, so every assertion on it scans all
+    captured records and `caplog.text` formats every record each time it is
+    read. This handler keeps counters and buckets per level, per logger and
+    per level and logger up to date as records arrive, so `count` does not
+    depend on the number of records. `contains` answers the exact message of a
+    record logged without arguments from an index, and only looks at the
+    records in the matching bucket for anything else. A message is only
+    formatted when it is needed for a comparison or when `text` is requested,
+    and then only once.
+
+    With a `capacity` the handler only keeps the latest records, like a ring
+    buffer. The counters still include the records that have been dropped.
+    """
+
+    def __init__(self, capacity=None, level=logging.NOTSET):
+        super().__init__(level)
+        self.capacity = capacity
+        self.setFormatter(logging.Formatter("%(levelname)-8s %(name)s:%(message)s"))
+        self.clear()
+
+    def clear(self):
+        """
+        Remove every captured record and reset the counters.
+        """
+        self._records = collections.deque(maxlen=self.capacity)
+        self._by_level = collections.defaultdict(collections.deque)
+        self._by_logger = collections.defaultdict(collections.deque)
+        self._by_level_logger = collections.defaultdict(collections.deque)
+        self._templates = collections.Counter()
+        self._counts = collections.Counter()
+        self._lines = collections.deque()
+
+    def emit(self, record):
+        if self.capacity is not None and len(self._records) == self.capacity:
+            # The oldest record is also the oldest one in its buckets.
+            oldest = self._records[0]
+            self._by_level[oldest.levelno].popleft()
+            self._by_logger[oldest.name].popleft()
+            self._by_level_logger[oldest.levelno, oldest.name].popleft()
+            if _is_plain(oldest):
+                self._templates.subtract(_template_keys(oldest))
+            if self._lines:
+                self._lines.popleft()
+        self._records.append(record)
+        self._by_level[record.levelno].append(record)
+        self._by_logger[record.name].append(record)
+        self._by_level_logger[record.levelno, record.name].append(record)
+        self._counts[record.levelno, record.name] += 1
+        if _is_plain(record):
+            self._templates.update(_template_keys(record))
+
+    @property
+    def records(self):
+        return list(self._records)
+
+    def count(self, level=None, logger=None):
+        """
+        Return how many records were emitted at `level` and/or from `logger`.
+        """
+        return sum(
+            count
+            for (record_level, record_logger), count in self._counts.items()
+            if (level is None or record_level == level)
+            and (logger is None or record_logger == logger)
+        )
+
+    def contains(self, message, level=None, logger=None):
+        """
+        Return True if a retained record contains `message` as a substring.
+        """
+        if self._templates[message, level, logger] > 0:
+            # A record logged without arguments has the message as its template.
+            return True
+
+        if level is not None and logger is not None:
+            candidates = self._by_level_logger[level, logger]
+        elif level is not None:
+            candidates = self._by_level[level]
+        elif logger is not None:
+            candidates = self._by_logger[logger]
+        else:
+            candidates = self._records
+
+        return any(message in _message(record) for record in candidates)
+
+    @property
+    def text(self):
+        """
+        The formatted text of the retained records.
+
+        Only the records that arrived since the last access are formatted.
+        """
+        pending = itertools.islice(self._records, len(self._lines), None)
+        self._lines.extend([self.format(record) for record in pending])
+        return "\n".join(self._lines) + "\n" if self._lines else ""
+
+
+def _is_plain(record):
+    return isinstance(record.msg, str) and not record.args
+
+
+def _template_keys(record):
+    # Every combination of the level and the logger `contains` can filter on,
+    # None stands for any.
+    return [
+        (record.msg, level, logger)
+        for level in (None, record.levelno)
+        for logger in (None, record.name)
+    ]
+
+
+def _message(record):
+    # Formatter.format stores the result on the record, we do the same so a
+    # record is only formatted once.
+    if not hasattr(record, "message"):
+        record.message = record.getMessage()
+    return record.message
+
+
+@pytest.fixture
+def indexed_caplog():
+    """
+    Capture every log record in an `IndexedLogHandler` on the root logger.
+    """
+    handler = IndexedLogHandler()
+    root = logging.getLogger()
+    previous_level = root.level
+    root.addHandler(handler)
+    root.setLevel(logging.DEBUG)
+    yield handler
+    root.setLevel(previous_level)
+    root.removeHandler(handler)
+
+
+class TestIndexedLogCapture:
+    """
+    This class demonstrates an indexed alternative to `caplog` for tests that
+    produce a lot of log records.
+    """
+
+    def test_capture_log_output(self, indexed_caplog):
+        """
+        Both the level and the message can be queried without scanning the
+        complete list of records.
+        """
+        function_to_log()
+
+        assert indexed_caplog.contains("Debug message", level=logging.DEBUG)
+        assert indexed_caplog.contains("Critical message", level=logging.CRITICAL)
+        assert not indexed_caplog.contains("Debug message", level=logging.INFO)
+        assert indexed_caplog.count(level=logging.WARNING) == 1
+        assert indexed_caplog.count(logger="tests.test_logging") == 5
+        assert indexed_caplog.contains(
+            "Debug message", level=logging.DEBUG, logger="tests.test_logging"
+        )
+        assert not indexed_caplog.contains(
+            "Debug message", level=logging.DEBUG, logger=__name__
+        )
+
+    def test_substring_with_arguments(self, indexed_caplog):
+        """
+        Messages logged with arguments are only formatted when they are compared.
+        """
+        logger.info("Result: %s", 42)
+
+        assert indexed_caplog.contains("Result: 42")
+        assert indexed_caplog.contains("42", logger=__name__)
+        assert not indexed_caplog.contains("Result: 43")
+
+    def test_text_is_formatted_lazily(self, indexed_caplog):
+        """
+        `text` only formats records that have not been formatted before.
+        """
+        custom_log_function()
+        assert "This is a custom log message" in indexed_caplog.text
+
+        formatted = []
+        indexed_caplog.format = lambda record: formatted.append(record) or "line"
+        logger.info("Another message")
+        indexed_caplog.text
+        assert len(formatted) == 1
+
+    def test_ring_buffer(self):
+        """
+        With a capacity only the latest records are kept, while the counters
+        still include every record.
+        """
+        handler = IndexedLogHandler(capacity=100)
+        for i in range(1000):
+            handler.handle(
+                logger.makeRecord(__name__, logging.INFO, "", 0, "%d", (i,), None)
+            )
+
+        assert len(handler.records) == 100
+        assert handler.count(level=logging.INFO) == 1000
+        assert handler.contains("999", level=logging.INFO)
+        assert not handler.contains("899", level=logging.INFO)
+        assert handler.text.splitlines()[0].endswith(":900")
+
+        handler.handle(
+            logger.makeRecord(__name__, logging.INFO, "", 0, "plain", (), None)
+        )
+        assert handler.contains("plain", level=logging.INFO, logger=__name__)
+        for i in range(100):
+            handler.handle(
+                logger.makeRecord(__name__, logging.INFO, "", 0, "%d", (i,), None)
+            )
+        assert not handler.contains("plain", level=logging.INFO, logger=__name__)
+
+    def test_clear_logs(self, indexed_caplog):
+        """
+        Clearing the handler drops the records and the counters.
+        """
+        custom_log_function()
+        indexed_caplog.clear()
+
+        assert indexed_caplog.count() == 0
+        assert not indexed_caplog.contains("This is a custom log message")
@@ -0,0 +1,132 @@
+import json
+import logging
+import time
+
+import pytest
+
+from tests.plugins.log_pipeline import JsonLinesFormatter, LogPipeline
+
+logger = logging.getLogger(__name__)
+
+
+def read_jsonl(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+class TestLogPipeline:
+    """
+    This class demonstrates logging through a queue to a background thread
+    that writes structured JSON lines.
+    """
+
+    def test_records_are_written_as_json(self, tmp_path):
+        """
+        Each record ends up as one JSON object per line.
+        """
+        path = tmp_path / "tests.jsonl"
+        with LogPipeline(path, logger=__name__):
+            logger.info("Starting test: %s", "test_addition")
+            logger.warning("Finished test: %s", "test_addition")
+
+        entries = read_jsonl(path)
+        assert [e["message"] for e in entries] == [
+            "Starting test: test_addition",
+            "Finished test: test_addition",
+        ]
+        assert entries[1]["level"] == "WARNING"
+        assert entries[0]["logger"] == __name__
+
+    def test_filtered_records_are_never_formatted(self, tmp_path, monkeypatch):
+        """
+        With %-style arguments the arguments of a filtered DEBUG record are
+        never converted to a string.
+        """
+        # pytest's own log capturing would format the records a second time.
+        monkeypatch.setattr(logger, "propagate", False)
+
+        class Expensive:
+            formatted = 0
+
+            def __str__(self):
+                Expensive.formatted += 1
+                return "expensive"
+
+        with LogPipeline(tmp_path / "tests.jsonl", logger=__name__):
+            logger.debug("Values: %s", Expensive())
+            logger.info("Values: %s", Expensive())
+
+        assert Expensive.formatted == 1
+
+    def test_exceptions_are_included(self, tmp_path):
+        """
+        The traceback of a logged exception is formatted by the listener.
+        """
+        path = tmp_path / "tests.jsonl"
+        with LogPipeline(path, logger=__name__):
+            try:
+                1 / 0
+            except ZeroDivisionError:
+                logger.error("Caught division by zero exception", exc_info=True)
+
+        assert "ZeroDivisionError" in read_jsonl(path)[0]["exception"]
+
+    def test_logger_level_is_restored(self, tmp_path):
+        """
+        The level of the root logger is only changed while the pipeline runs,
+        and a more verbose level is left alone.
+        """
+        root = logging.getLogger()
+        previous = root.level
+        try:
+            root.setLevel(logging.WARNING)
+            with LogPipeline(tmp_path / "tests.jsonl"):
+                assert root.level == logging.INFO
+            assert root.level == logging.WARNING
+
+            root.setLevel(logging.DEBUG)
+            with LogPipeline(tmp_path / "tests.jsonl"):
+                assert root.level == logging.DEBUG
+                logging.getLogger(__name__).debug("Not written")
+            assert root.level == logging.DEBUG
+        finally:
+            root.setLevel(previous)
+        assert not (tmp_path / "tests.jsonl").exists()
+
+    @pytest.mark.benchmark
+    @pytest.mark.parametrize("tests", [50_000])
+    def test_benchmark_against_synchronous_logging(self, tmp_path, monkeypatch, tests):
+        """
+        Measures the time spent in the test for logging the start and end of
+        each test, with a synchronous file handler and with the pipeline. Both
+        sides make the same logging calls, so only the queueing differs.
+        """
+        # Keep the handlers of pytest's own log capturing out of the measurement.
+        monkeypatch.setattr(logger, "propagate", False)
+        sync_handler = logging.FileHandler(tmp_path / "sync.jsonl")
+        sync_handler.setFormatter(JsonLinesFormatter())
+        logger.addHandler(sync_handler)
+        logger.setLevel(logging.INFO)
+        start = time.perf_counter()
+        for i in range(tests):
+            logger.info("Starting test: %s", f"test_{i}")
+            logger.debug("Values: a=%s, b=%s", i, i)
+            logger.info("Finished test: %s", f"test_{i}")
+        synchronous = time.perf_counter() - start
+        logger.removeHandler(sync_handler)
+        logger.setLevel(logging.NOTSET)
+        sync_handler.close()
+
+        with LogPipeline(tmp_path / "queued.jsonl", logger=__name__):
+            start = time.perf_counter()
+            for i in range(tests):
+                logger.info("Starting test: %s", f"test_{i}")
+                logger.debug("Values: a=%s, b=%s", i, i)
+                logger.info("Finished test: %s", f"test_{i}")
+            queued = time.perf_counter() - start
+
+        print(
+            f"{tests} tests: synchronous {synchronous / tests * 1e6:.1f}us per test, "
+            f"queued {queued / tests * 1e6:.1f}us per test"
+        )
+        assert len(read_jsonl(tmp_path / "queued.jsonl")) == 2 * tests
@@ -12,10 +12,13 @@ def log_start_and_end(request):
     Fixture for demonstration purposes of TestLoggingDuringTests.
 
     Fixture to log the start and end of each test.
+
+    The test name is passed as an argument instead of using an f-string, so the
+    message is only formatted if the record is actually handled.
     """
-    logger.info(f"Starting test: {request.node.name}")
+    logger.info("Starting test: %s", request.node.name)
     yield
-    logger.info(f"Finished test: {request.node.name}")
+    logger.info("Finished test: %s", request.node.name)
 
 
 class TestLoggingDuringTests:
@@ -30,9 +33,9 @@ class TestLoggingDuringTests:
         logger.info("Starting test_addition")
         a = 2
         b = 3
-        logger.debug(f"Values: a={a}, b={b}")
+        logger.debug("Values: a=%s, b=%s", a, b)
         result = a + b
-        logger.debug(f"Result: {result}")
+        logger.debug("Result: %s", result)
         logger.info("Asserting the result")
         assert result == 5
         logger.info("Finished test_addition")
@@ -44,9 +47,9 @@ class TestLoggingDuringTests:
         logger.info("Starting test_subtraction")
         a = 10
         b = 5
-        logger.debug(f"Values: a={a}, b={b}")
+        logger.debug("Values: a=%s, b=%s", a, b)
         result = a - b
-        logger.debug(f"Result: {result}")
+        logger.debug("Result: %s", result)
         logger.info("Asserting the result")
         assert result == 5
         logger.info("Finished test_subtraction")
@@ -58,9 +61,9 @@ class TestLoggingDuringTests:
         logger.info("Starting test_multiplication")
         a = 3
         b = 4
-        logger.debug(f"Values: a={a}, b={b}")
+        logger.debug("Values: a=%s, b=%s", a, b)
         result = a * b
-        logger.debug(f"Result: {result}")
+        logger.debug("Result: %s", result)
         logger.info("Asserting the result")
         assert result == 12
         logger.info("Finished test_multiplication")
@@ -72,10 +75,10 @@ class TestLoggingDuringTests:
         logger.info("Starting test_division")
         a = 8
         b = 2
-        logger.debug(f"Values: a={a}, b={b}")
+        logger.debug("Values: a=%s, b=%s", a, b)
         try:
             result = a / b
-            logger.debug(f"Result: {result}")
+            logger.debug("Result: %s", result)
             logger.info("Asserting the result")
             assert result == 4
         except ZeroDivisionError as e:
@@ -90,7 +93,7 @@ class TestLoggingDuringTests:
         logger.info("Starting test_division_by_zero")
         a = 8
         b = 0
-        logger.debug(f"Values: a={a}, b={b}")
+        logger.debug("Values: a=%s, b=%s", a, b)
         with pytest.raises(ZeroDivisionError):
             result = a / b
         logger.info("Finished test_division_by_zero")
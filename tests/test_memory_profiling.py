@@ -0,0 +1,128 @@
+import json
+from unittest import mock
+
+import pytest
+
+from tests.plugins.memory_profiling import MemoryProfiler
+
+LEAKY_SUITE = """
+from unittest import mock
+import pytest
+
+CACHE = []
+
+@pytest.fixture(scope="session")
+def app_config():
+    return {"version": "1.0.0", "seen": []}
+
+@pytest.fixture(scope="module")
+def database_connection():
+    return bytearray(500_000)
+
+def test_large_temporary(database_connection):
+    data = [0] * 1_000_000
+    del data
+
+def test_grows_session_fixture(app_config):
+    app_config["seen"].extend(range(10_000))
+
+def test_retains():
+    CACHE.append(bytearray(200_000))
+
+def test_lingering_patch():
+    mock.patch("os.getcwd").start()
+"""
+
+
+class TestMemoryProfiler:
+    """
+    This class demonstrates measuring the memory of every test, and finding
+    the tests and fixtures that leak it.
+    """
+
+    @pytest.fixture
+    def profiled(self, pytester):
+        pytester.makepyfile(test_leaky=LEAKY_SUITE)
+        profiler = MemoryProfiler(output=pytester.path / "memory.json")
+        try:
+            pytester.inline_run(plugins=[profiler]).assertoutcome(passed=4)
+        finally:
+            mock.patch.stopall()
+        return profiler
+
+    def test_peak_and_retained(self, profiled):
+        """
+        A large temporary list shows up in the peak of the call, memory kept
+        after the test in its retained memory.
+        """
+        temporary = profiled.tests["test_leaky.py::test_large_temporary"]
+        retains = profiled.tests["test_leaky.py::test_retains"]
+
+        assert temporary.peaks["call"] >= 8_000_000
+        assert temporary.retained < 100_000
+        assert retains.retained >= 200_000
+        assert retains.sites[0]["site"].endswith("test_leaky.py:22")
+
+    def test_fixtures(self, profiled):
+        """
+        The memory held by a module scoped fixture is measured, and a session
+        scoped fixture that grows is a leak.
+        """
+        assert profiled.fixtures["test_leaky.py::database_connection"].held >= 500_000
+        assert profiled.fixtures["test_leaky.py::app_config"].growth >= 10_000 * 28
+
+    def test_leaks(self, profiled):
+        """
+        Every kind of leak is reported.
+        """
+        leaks = profiled.leaks()
+
+        assert (
+            "test_leaky.py::test_lingering_patch left patch(os.getcwd) active" in leaks
+        )
+        assert any(
+            leak.startswith("session fixture test_leaky.py::app_config grew")
+            for leak in leaks
+        )
+        assert any(
+            leak.startswith("test_leaky.py::test_retains retained") for leak in leaks
+        )
+
+    def test_json_output(self, profiled, pytester):
+        """
+        The results are written to a JSON file.
+        """
+        data = json.loads(pytester.path.joinpath("memory.json").read_text())
+
+        assert set(data) == {"rss", "tests", "fixtures", "leaks"}
+        assert data["tests"]["test_leaky.py::test_retains"]["peak"] >= 200_000
+
+    def test_terminal_report(self, pytester):
+        """
+        The report is written at the end of the run.
+        """
+        pytester.makepyfile(test_leaky=LEAKY_SUITE)
+        try:
+            result = pytester.runpytest(plugins=[MemoryProfiler()])
+        finally:
+            mock.patch.stopall()
+
+        result.stdout.fnmatch_lines(
+            [
+                "*memory profile*",
+                "test_leaky.py::test_large_temporary *",
+                "leak: test_leaky.py::test_lingering_patch left patch(os.getcwd) active",
+            ]
+        )
+
+    def test_fixture_profile_memory_is_refused(self, pytester):
+        """
+        Both profilers restart `tracemalloc`, so combining them is a usage error
+        instead of two sets of wrong numbers.
+        """
+        result = pytester.runpytest_subprocess(
+            "--memory-profile", "--fixture-profile-memory", "--collect-only", __file__
+        )
+
+        assert result.ret == pytest.ExitCode.USAGE_ERROR
+        result.stderr.fnmatch_lines(["*cannot be combined with --memory-profile"])
@@ -1,7 +1,10 @@
 from unittest import mock
 from tempfile import TemporaryDirectory
 import os
-import requests
+
+from tests.plugins.import_profiling import lazy_import
+
+requests = lazy_import("requests")
 
 VARIABLE = "original_value"
 
@@ -0,0 +1,182 @@
+import pytest
+
+from tests.plugins.bench import BenchRecorder
+from tests.plugins.parallel_scheduler import DurationHistory, ScopeScheduler, schedule
+
+SCOPED_SUITE = """
+import os
+import pytest
+
+@pytest.fixture(scope="session")
+def app_config():
+    with open("setups.txt", "a") as f:
+        f.write(f"session {os.getpid()}\\n")
+
+@pytest.fixture(scope="module")
+def database_connection(app_config):
+    with open("setups.txt", "a") as f:
+        f.write(f"module {__name__}\\n")
+
+@pytest.mark.parametrize("number", range(4))
+def test_query(database_connection, number):
+    pass
+"""
+
+
+class TestScopeScheduler:
+    """
+    This class demonstrates running tests in parallel without setting up their
+    scoped fixtures on every worker.
+    """
+
+    def test_schedule(self, pytester):
+        """
+        Tests sharing a module scoped fixture form one group, other tests are
+        scheduled one by one, longest first.
+        """
+        items = pytester.getitems("""
+            import pytest
+
+            @pytest.fixture(scope="module")
+            def database_connection():
+                pass
+
+            def test_first(database_connection):
+                pass
+
+            def test_second(database_connection):
+                pass
+
+            def test_fast():
+                pass
+
+            def test_slow():
+                pass
+            """)
+        history = DurationHistory(
+            {
+                "test_schedule.py::test_first": 1.0,
+                "test_schedule.py::test_second": 1.0,
+                "test_schedule.py::test_fast": 0.1,
+                "test_schedule.py::test_slow": 3.0,
+            }
+        )
+
+        assert schedule(items, history) == [[3], [0, 1], [2]]
+
+    def test_scoped_fixtures_are_set_up_once(self, pytester):
+        """
+        Every module scoped fixture is set up once, on the worker running its
+        module, and the session scoped fixture once per worker.
+        """
+        pytester.makepyfile(
+            test_first=SCOPED_SUITE, test_second=SCOPED_SUITE, test_third=SCOPED_SUITE
+        )
+        pytester.inline_run(plugins=[ScopeScheduler(workers=2)]).assertoutcome(
+            passed=12
+        )
+
+        setups = pytester.path.joinpath("setups.txt").read_text().splitlines()
+        assert sorted(line for line in setups if line.startswith("module")) == [
+            "module test_first",
+            "module test_second",
+            "module test_third",
+        ]
+        assert len({line for line in setups if line.startswith("session")}) <= 2
+
+    def test_failures_and_durations(self, pytester):
+        """
+        Failures on a worker fail the run, and the durations are recorded for
+        the next run.
+        """
+        pytester.makepyfile("""
+            import time
+
+            def test_passes():
+                time.sleep(0.05)
+
+            def test_fails():
+                print("output of the worker")
+                assert False
+            """)
+        result = pytester.runpytest(plugins=[ScopeScheduler(workers=2)])
+
+        result.assert_outcomes(passed=1, failed=1)
+        result.stdout.fnmatch_lines(["*output of the worker*"])
+        durations = DurationHistory.load(pytester.parseconfigure()).durations
+        assert durations["test_failures_and_durations.py::test_passes"] >= 0.05
+
+    def test_crashed_worker(self, pytester):
+        """
+        A test that kills its worker is reported as failed.
+        """
+        pytester.makepyfile("""
+            import os
+
+            def test_exits():
+                os._exit(1)
+
+            def test_passes():
+                pass
+            """)
+        result = pytester.runpytest(plugins=[ScopeScheduler(workers=2)])
+
+        result.assert_outcomes(passed=1, failed=1)
+        result.stdout.fnmatch_lines(["*worker process exited before running this test"])
+
+    def test_without_cacheprovider(self, pytester):
+        """
+        Without the pytest cache the groups are scheduled from an empty
+        history, and nothing is saved.
+        """
+        pytester.makepyfile(test_scheduler=SCOPED_SUITE)
+        pytester.inline_run(
+            "-p", "no:cacheprovider", plugins=[ScopeScheduler(workers=2)]
+        ).assertoutcome(passed=4)
+
+    def test_workers_must_be_positive(self, pytester):
+        """
+        `--workers 0` is a usage error instead of a run without workers.
+        """
+        result = pytester.runpytest_subprocess(
+            "--workers=0", "--collect-only", __file__
+        )
+
+        assert result.ret == pytest.ExitCode.USAGE_ERROR
+        result.stderr.fnmatch_lines(["*--workers must be a positive number"])
+
+    def test_bench_results_reach_the_main_process(self, pytester):
+        """
+        Results of the `bench` fixture are sent back with the reports, so they
+        are reported like in a serial run.
+        """
+        pytester.makepyfile("""
+            def test_sum(bench):
+                bench(sum, range(10))
+
+            def test_sorted(bench):
+                bench(sorted, range(10))
+            """)
+        recorder = BenchRecorder()
+        pytester.inline_run(
+            "-p", "tests.plugins.bench", plugins=[ScopeScheduler(workers=2), recorder]
+        ).assertoutcome(passed=2)
+
+        assert sorted(recorder.results) == [
+            "test_bench_results_reach_the_main_process.py::test_sorted",
+            "test_bench_results_reach_the_main_process.py::test_sum",
+        ]
+
+    @pytest.mark.parametrize("option", ["--fixture-profile", "--memory-profile"])
+    def test_profilers_are_refused(self, pytester, option):
+        """
+        The fixture and memory profilers measure inside the workers, so
+        combining them with `--workers` is a usage error instead of an empty
+        report.
+        """
+        result = pytester.runpytest_subprocess(
+            "--workers=2", option, "--collect-only", __file__
+        )
+
+        assert result.ret == pytest.ExitCode.USAGE_ERROR
+        result.stderr.fnmatch_lines([f"*{option} cannot be combined with --workers"])
@@ -1,6 +1,7 @@
 import pytest
 
 
+@pytest.mark.pure
 class TestParametrization:
     """
     This class demonstrates the usage of parameterized tests in pytest.
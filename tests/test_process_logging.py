@@ -0,0 +1,194 @@
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+logger = logging.getLogger(__name__)
+
+
+def forward_logs(log_queue, level=logging.DEBUG):
+    """
+    Initializer for worker processes that sends every log record to the parent.
+
+    Pass it as `initializer` to `ProcessPoolExecutor` or `multiprocessing.Pool`,
+    or call it first thing in the target of a `multiprocessing.Process`.
+    """
+    root = logging.getLogger()
+    # A forked child inherits the handlers of the parent, including the ones of
+    # pytest's log capturing, which would never be read.
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+
+class ProcessLogCapture:
+    """
+    Collects log records from child processes into `caplog`.
+
+    Records from the children are sent through a `multiprocessing.Queue` and
+    handed to the `caplog` handler by `collect`, or when `records` is read, so
+    the level set with `caplog.at_level` applies to them as well. The records are
+    kept ordered by their creation time, so records from the test itself and
+    from its workers end up in the order they were logged.
+
+    !!! Note
+        A worker process sends its records in the background. Read the records
+        after the pool has been shut down, which waits until every worker has
+        flushed its queue.
+    """
+
+    def __init__(self, caplog, context=None):
+        self.caplog = caplog
+        self.queue = multiprocessing.get_context(context).Queue()
+        self.initializer = forward_logs
+        self.initargs = (self.queue,)
+
+    def collect(self, timeout=0.0):
+        """
+        Move every record that has arrived from the children into `caplog`.
+
+        With a `timeout`, wait that long for records that are still on the way.
+        """
+        deadline = time.monotonic() + timeout
+        received = False
+        while True:
+            try:
+                record = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            # The level of the logger was already checked in the child, the level
+            # of the handler is the one set by caplog.at_level.
+            if record.levelno >= self.caplog.handler.level:
+                self.caplog.handler.handle(record)
+                received = True
+        if received:
+            # The sort is stable, so records with the same timestamp keep their
+            # order of arrival.
+            self.caplog.handler.records.sort(key=lambda record: record.created)
+
+    @property
+    def records(self):
+        self.collect()
+        return self.caplog.records
+
+    @property
+    def messages(self):
+        return [record.getMessage() for record in self.records]
+
+    def close(self):
+        self.queue.close()
+        self.queue.join_thread()
+
+
+@pytest.fixture
+def process_caplog(caplog):
+    """
+    Provide a `ProcessLogCapture` for a test that starts worker processes.
+
+    Every test gets its own queue, so this also works when the tests themselves
+    are run in parallel by `pytest-xdist`.
+    """
+    capture = ProcessLogCapture(caplog)
+    yield capture
+    capture.close()
+
+
+def square(value):
+    """
+    Function for demonstration purposes, executed in a worker process.
+    """
+    logger.info("Squaring %s", value)
+    if value < 0:
+        logger.warning("Negative value %s", value)
+    return value * value
+
+
+def process_target(log_queue):
+    """
+    Target for demonstration purposes, executed in a `multiprocessing.Process`.
+    """
+    forward_logs(log_queue)
+    logger.error("Error message from process")
+
+
+class TestProcessLogCapture:
+    """
+    This class demonstrates capturing log records from child processes,
+    which `caplog` can not see on its own.
+    """
+
+    def test_process_pool_executor(self, process_caplog, caplog):
+        """
+        Records from a `ProcessPoolExecutor` end up in `caplog.records`.
+        """
+        with caplog.at_level(logging.INFO):
+            with ProcessPoolExecutor(
+                max_workers=2,
+                initializer=process_caplog.initializer,
+                initargs=process_caplog.initargs,
+            ) as executor:
+                assert list(executor.map(square, [1, 2, -3])) == [1, 4, 9]
+
+        assert sorted(process_caplog.messages) == [
+            "Negative value -3",
+            "Squaring -3",
+            "Squaring 1",
+            "Squaring 2",
+        ]
+        assert any(r.levelno == logging.WARNING for r in caplog.records)
+
+    def test_multiprocessing_process(self, process_caplog, caplog):
+        """
+        A plain `multiprocessing.Process` forwards its records by calling
+        `forward_logs` itself.
+        """
+        process = multiprocessing.Process(
+            target=process_target, args=process_caplog.initargs
+        )
+        process.start()
+        process.join()
+
+        assert "Error message from process" in process_caplog.messages
+        assert "Error message from process" in caplog.text
+
+    def test_records_are_ordered(self, process_caplog, caplog):
+        """
+        Records from the parent and from the worker are merged by the time they
+        were created.
+        """
+        with caplog.at_level(logging.INFO):
+            logger.info("Before the pool")
+            with ProcessPoolExecutor(
+                max_workers=1,
+                initializer=process_caplog.initializer,
+                initargs=process_caplog.initargs,
+            ) as executor:
+                executor.submit(square, 2).result()
+            logger.info("After the pool")
+
+        assert process_caplog.messages == [
+            "Before the pool",
+            "Squaring 2",
+            "After the pool",
+        ]
+
+    def test_level_filtering_applies(self, process_caplog, caplog):
+        """
+        `caplog.at_level` also filters the records from the children, as long
+        as they are collected before the level is restored.
+        """
+        with caplog.at_level(logging.WARNING):
+            with ProcessPoolExecutor(
+                max_workers=1,
+                initializer=process_caplog.initializer,
+                initargs=process_caplog.initargs,
+            ) as executor:
+                list(executor.map(square, [2, -2]))
+            process_caplog.collect()
+
+        assert process_caplog.messages == ["Negative value -2"]
@@ -0,0 +1,126 @@
+import pytest
+
+from tests.plugins.result_cache import ResultCache
+
+PURE_SUITE = """
+import pytest
+import helpers
+
+@pytest.mark.pure
+@pytest.mark.parametrize("number, expected", [(1, 2), (2, 3)])
+def test_add_one(number, expected):
+    assert helpers.add_one(number) == expected
+
+@pytest.mark.pure
+def test_without_parameters():
+    pass
+
+def test_not_pure():
+    pass
+"""
+
+
+class TestResultCache:
+    """
+    This class demonstrates skipping pure tests whose outcome cannot have
+    changed since they last passed.
+    """
+
+    @pytest.fixture
+    def suite(self, pytester):
+        pytester.makepyfile(
+            test_suite=PURE_SUITE,
+            helpers="def add_one(number):\n    return number + 1\n",
+        )
+        pytester.syspathinsert()
+        pytester.inline_run(plugins=[ResultCache()]).assertoutcome(passed=4)
+        return pytester
+
+    def test_unchanged_tests_are_cached(self, suite):
+        """
+        On the second run only the test without the marker runs.
+        """
+        result = suite.runpytest("-v", plugins=[ResultCache()])
+
+        result.assert_outcomes(passed=1)
+        result.stdout.fnmatch_lines(
+            [
+                "test_suite.py::test_add_one[[]1-2[]] CACHED-PASS*",
+                "test_suite.py::test_without_parameters CACHED-PASS*",
+                "test_suite.py::test_not_pure PASSED*",
+                "result cache: 3 unchanged pure tests were not run again*",
+                "*1 passed, 3 cached-pass*",
+            ]
+        )
+
+    def test_changed_dependency(self, suite):
+        """
+        Changing a module the tests import runs them again.
+        """
+        suite.makepyfile(helpers="def add_one(number):\n    return number + 2\n")
+        cache = ResultCache()
+        suite.inline_run(plugins=[cache]).assertoutcome(passed=2, failed=2)
+
+        assert cache.cached == []
+        assert "test_suite.py::test_add_one[1-2]" not in cache.results
+
+    def test_changed_indirect_dependency(self, suite):
+        """
+        Changing a module that is only imported by an imported module also
+        runs the tests again.
+        """
+        suite.makepyfile(
+            helpers="from arithmetic import add\n\n"
+            "def add_one(number):\n    return add(number, 1)\n",
+            arithmetic="def add(a, b):\n    return a + b\n",
+        )
+        suite.inline_run(plugins=[ResultCache()]).assertoutcome(passed=4)
+        suite.makepyfile(arithmetic="def add(a, b):\n    return a + b + 1\n")
+        result = suite.runpytest(plugins=[ResultCache()])
+
+        result.assert_outcomes(passed=2, failed=2)
+
+    def test_markers_without_the_plugin(self, pytester):
+        """
+        The markers are registered by `conftest.py` even when the plugins using
+        them are not, so `--strict-markers` accepts them.
+        """
+        result = pytester.runpytest_subprocess(
+            "--strict-markers",
+            "-p",
+            "no:cacheprovider",
+            "--collect-only",
+            "-q",
+            __file__,
+        )
+
+        assert result.ret == pytest.ExitCode.OK
+
+    def test_bypass(self, suite):
+        """
+        With the cache disabled every test runs, and is recorded again.
+        """
+        cache = ResultCache(enabled=False)
+        suite.inline_run(plugins=[cache]).assertoutcome(passed=4)
+
+        assert cache.cached == []
+        assert len(cache.results) == 3
+
+    def test_unstable_parameters_are_not_cached(self, pytester):
+        """
+        A parameter without a stable `repr` would give a different key on
+        every run, so the test always runs.
+        """
+        pytester.makepyfile("""
+            import pytest
+
+            @pytest.mark.pure
+            @pytest.mark.parametrize("value", [object()])
+            def test_object(value):
+                pass
+            """)
+        cache = ResultCache()
+        pytester.inline_run(plugins=[cache])
+        pytester.inline_run(plugins=[cache]).assertoutcome(passed=1)
+
+        assert cache.keys == {}
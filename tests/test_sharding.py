@@ -0,0 +1,87 @@
+import argparse
+import json
+
+import pytest
+
+from tests.plugins.parallel_scheduler import DurationHistory
+from tests.plugins.sharding import Sharding, merge_reports, partition, shard_spec
+
+SHARDED_SUITE = """
+import pytest
+
+@pytest.fixture(scope="module")
+def database_connection():
+    pass
+
+@pytest.mark.parametrize("number", range(4))
+def test_query(database_connection, number):
+    pass
+
+@pytest.mark.parametrize("number", range(8))
+def test_unscoped(number):
+    pass
+
+def test_fails():
+    assert False
+"""
+
+
+class TestSharding:
+    """
+    This class demonstrates splitting a test suite across machines, balanced by
+    the durations of a previous run.
+    """
+
+    def test_partition(self, pytester):
+        """
+        Shards are balanced by duration, without splitting a scoped group.
+        """
+        items = pytester.getitems(SHARDED_SUITE)
+        nodeids = [item.nodeid for item in items]
+        history = DurationHistory(
+            {nodeid: 2.0 if "unscoped" in nodeid else 1.0 for nodeid in nodeids}
+        )
+
+        shards, loads = partition(items, history, 3)
+
+        assert sorted(i for shard in shards for i in shard) == list(range(len(items)))
+        assert any(shard[:4] == [0, 1, 2, 3] for shard in shards)
+        assert max(loads) - min(loads) <= 2.0
+        assert partition(items, history, 3) == (shards, loads)
+
+    def test_shard_spec(self):
+        """
+        Shards are numbered from 1.
+        """
+        assert shard_spec("2/4") == (2, 4)
+        with pytest.raises(argparse.ArgumentTypeError):
+            shard_spec("0/4")
+        with pytest.raises(argparse.ArgumentTypeError):
+            shard_spec("all")
+
+    def test_shard_reports_merge(self, pytester):
+        """
+        Every test runs on exactly one shard, and the merged partial reports
+        can balance the next run.
+        """
+        pytester.makepyfile(test_suite=SHARDED_SUITE)
+        reports = []
+        for index in range(1, 4):
+            report = pytester.path / f"shard-{index}.json"
+            pytester.inline_run(plugins=[Sharding(index, 3, report=report)])
+            reports.append(report)
+
+        merged = merge_reports(reports, pytester.path / "merged.json")
+
+        partial = [json.loads(report.read_text())["outcomes"] for report in reports]
+        assert sum(len(outcomes) for outcomes in partial) == 13
+
+        assert merged["shards"] == ["1/3", "2/3", "3/3"]
+        assert len(merged["outcomes"]) == 13
+        assert merged["outcomes"]["test_suite.py::test_fails"] == "failed"
+        assert set(merged["outcomes"].values()) == {"passed", "failed"}
+
+        sharding = Sharding(1, 3, durations=pytester.path / "merged.json")
+        result = pytester.runpytest(plugins=[sharding])
+        result.stdout.fnmatch_lines(["shard 1/3: * tests, *s estimated"])
+        assert sharding.history.durations == merged["durations"]
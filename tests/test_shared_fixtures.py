@@ -0,0 +1,168 @@
+import array
+import mmap
+import os
+
+import pytest
+
+from tests.plugins.parallel_scheduler import ScopeScheduler
+from tests.plugins.shared_fixtures import (
+    ALIGNMENT,
+    SharedFixtures,
+    attach,
+    publish,
+)
+
+SHARED_CONFTEST = """
+import os
+import pytest
+from tests.plugins.shared_fixtures import shared_fixture
+
+@pytest.fixture(scope="session")
+@shared_fixture
+def complex_data():
+    with open("builds.txt", "a") as f:
+        f.write(f"{os.getpid()}\\n")
+    return {"version": "1.0.0", "payload": b"x" * 10_000_000}
+"""
+
+SHARED_SUITE = """
+import pytest
+
+@pytest.mark.parametrize("number", range(3))
+def test_payload(complex_data, number):
+    assert complex_data["version"] == "1.0.0"
+    assert complex_data["payload"].readonly
+    assert complex_data["payload"][:3] == b"xxx"
+"""
+
+
+class TestSharedFixtures:
+    """
+    This class demonstrates sharing the value of a session fixture between
+    worker processes, instead of building a copy on every worker.
+    """
+
+    def test_publish_and_attach(self, tmp_path):
+        """
+        Buffers come back as read-only views of the file, other values as
+        they were.
+        """
+        path = tmp_path / "value"
+        publish(
+            path,
+            {
+                "name": "Sample Application",
+                "payload": b"x" * 1000,
+                "numbers": array.array("d", [1.0, 2.5]),
+            },
+        )
+
+        value = attach(path)
+
+        assert value["name"] == "Sample Application"
+        assert isinstance(value["payload"].obj, mmap.mmap)
+        assert value["payload"] == b"x" * 1000
+        assert value["numbers"].tolist() == [1.0, 2.5]
+        with pytest.raises(TypeError):
+            value["payload"][0] = 0
+
+    def test_numpy_arrays(self, tmp_path):
+        """
+        NumPy arrays are mapped read-only, without a copy.
+        """
+        numpy = pytest.importorskip("numpy")
+        path = tmp_path / "value"
+        publish(path, {"table": numpy.arange(1_000_000).reshape(1000, 1000)})
+
+        table = attach(path)["table"]
+
+        assert table[999, 999] == 999_999
+        assert not table.flags.writeable
+        assert table.ctypes.data % ALIGNMENT == 0
+
+    def test_built_once_for_every_worker(self, pytester):
+        """
+        The fixture is built by one worker and mapped by the others.
+        """
+        pytester.makeconftest(SHARED_CONFTEST)
+        pytester.makepyfile(
+            test_first=SHARED_SUITE, test_second=SHARED_SUITE, test_third=SHARED_SUITE
+        )
+        plugins = [SharedFixtures(), ScopeScheduler(workers=3)]
+        pytester.inline_run(plugins=plugins).assertoutcome(passed=9)
+
+        builds = pytester.path.joinpath("builds.txt").read_text().splitlines()
+        assert len(builds) == 1
+        assert not plugins[0].directory.exists()
+
+    def test_same_name_in_different_modules(self, pytester):
+        """
+        Fixtures of the same name in different modules are shared separately.
+        """
+        module = """
+            import pytest
+            from tests.plugins.shared_fixtures import shared_fixture
+
+            @pytest.fixture(scope="session")
+            @shared_fixture
+            def data():
+                return __name__
+
+            def test_data(data):
+                assert data == __name__
+            """
+        pytester.makepyfile(test_first=module, test_second=module)
+        plugins = [SharedFixtures(), ScopeScheduler(workers=2)]
+        pytester.inline_run(plugins=plugins).assertoutcome(passed=2)
+
+    def test_without_plugin(self, pytester):
+        """
+        Without the plugin the fixture is built as usual.
+        """
+        pytester.makeconftest(SHARED_CONFTEST)
+        pytester.makepyfile(SHARED_SUITE.replace(".readonly", " is not None"))
+        pytester.inline_run().assertoutcome(passed=3)
+
+    @pytest.mark.benchmark
+    def test_benchmark_memory(self, pytester):
+        """
+        Compares the memory used by four workers reading a 200 MB fixture,
+        shared and not shared.
+        """
+        pytester.makeconftest("""
+            import pytest
+            from tests.plugins.shared_fixtures import shared_fixture
+
+            @pytest.fixture(scope="session")
+            @shared_fixture
+            def shared():
+                return b"x" * 200_000_000
+
+            @pytest.fixture(scope="session")
+            def copied():
+                return b"x" * 200_000_000
+            """)
+        pytester.makepyfile(**{f"test_{number}": """
+                    import os
+
+                    def test_fixture(request):
+                        data = request.getfixturevalue(os.environ["FIXTURE"])
+                        assert sum(data[::4096]) > 0
+                        with open("/proc/self/smaps_rollup") as f:
+                            pss = next(line for line in f if line.startswith("Pss:"))
+                        request.node.user_properties.append(("pss", int(pss.split()[1])))
+                    """ for number in range(4)})
+        for fixture in ["copied", "shared"]:
+            os.environ["FIXTURE"] = fixture
+            try:
+                reprec = pytester.inline_run(
+                    plugins=[SharedFixtures(), ScopeScheduler(workers=4)]
+                )
+            finally:
+                del os.environ["FIXTURE"]
+            pss = sum(
+                dict(report.user_properties)["pss"]
+                for report in reprec.getreports("pytest_runtest_logreport")
+                if report.when == "call"
+            )
+            print(f"{fixture}: {pss / 1024:.0f} MB proportional set size")
@@ -0,0 +1,273 @@
+import csv
+import json
+import mmap
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+import pytest
+
+from tests.plugins.memory_profiling import traced_memory
+from tests.test_exceptions import CustomException, function_that_raises
+
+DATA = Path(__file__).parent / "data"
+MAX_REPORTED_CASES = 10
+
+
+@dataclass(frozen=True)
+class CaseRange:
+    """
+    A part of a case file, which reads its rows only when it is iterated.
+
+    For CSV and JSONL files `start` and `stop` are byte offsets, and the range
+    owns every line that starts inside it. A record is one line, CSV records
+    with a quoted field containing a newline are rejected, since a range
+    cannot tell where they start without reading the file from the start.
+    For Parquet files they are row group numbers. Either way only the part of
+    the file belonging to the range is read, one row at a time, so a range is
+    cheap to create at collection time.
+    """
+
+    path: str
+    start: int
+    stop: int
+
+    def __iter__(self):
+        for _, row in self.located():
+            yield row
+
+    def located(self):
+        """
+        Yield `(location, row)` pairs, where `location` names the row in the
+        file, for example `cases.jsonl@1024` for the row at byte 1024.
+        """
+        suffix = Path(self.path).suffix
+        if suffix == ".parquet":
+            yield from self._parquet_rows()
+            return
+        lines = self._lines()
+        if suffix == ".csv":
+            with open(self.path, newline="") as f:
+                header = next(csv.reader(f))
+            for offset, line in lines:
+                if offset > 0:
+                    try:
+                        values = next(csv.reader([line.decode()], strict=True))
+                    except csv.Error:
+                        raise ValueError(
+                            f"{self._location(offset)}: a quoted field spans "
+                            "several lines, CSV records must fit on one line"
+                        ) from None
+                    yield self._location(offset), dict(zip(header, values))
+        elif suffix == ".jsonl":
+            for offset, line in lines:
+                if line.strip():
+                    yield self._location(offset), json.loads(line)
+        else:
+            raise ValueError(f"Unsupported case file {self.path!r}")
+
+    def _location(self, position):
+        return f"{Path(self.path).name}@{position}"
+
+    def _lines(self):
+        if os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                position = self.start
+                if position > 0 and data[position - 1 : position] != b"\n":
+                    # The line started in the previous range.
+                    position = data.find(b"\n", position) + 1 or len(data)
+                while position < min(self.stop, len(data)):
+                    end = data.find(b"\n", position)
+                    end = len(data) if end == -1 else end
+                    yield position, data[position:end]
+                    position = end + 1
+
+    def _parquet_rows(self):
+        import pyarrow.parquet
+
+        parquet_file = pyarrow.parquet.ParquetFile(self.path)
+        for group in range(self.start, self.stop):
+            batches = parquet_file.iter_batches(row_groups=[group])
+            index = 0
+            for batch in batches:
+                for row in batch.to_pylist():
+                    yield self._location(f"{group}:{index}"), row
+                    index += 1
+
+
+def stream_cases(path, shards=1):
+    """
+    Split a CSV, JSONL or Parquet case file into `shards` parameters for
+    `pytest.mark.parametrize`, without reading the rows.
+
+        @pytest.mark.parametrize("cases", stream_cases("golden.jsonl", shards=8))
+        def test_golden(cases):
+            for case in cases:
+                ...
+
+    Only the size of the file is needed to split it, or the footer of a
+    Parquet file, so collection stays cheap no matter how many cases there
+    are. Every shard is a separate test, so they can run in parallel and be
+    selected by id, like `-k golden-3-of-8`.
+    """
+    path = os.fspath(path)
+    if Path(path).suffix == ".parquet":
+        import pyarrow.parquet
+
+        size = pyarrow.parquet.ParquetFile(path).metadata.num_row_groups
+    else:
+        size = os.path.getsize(path)
+    bounds = [size * shard // shards for shard in range(shards + 1)]
+    return [
+        pytest.param(
+            CaseRange(path, bounds[shard], bounds[shard + 1]),
+            id=f"{Path(path).stem}-{shard}-of-{shards}",
+        )
+        for shard in range(shards)
+    ]
+
+
+def check_cases(cases, check):
+    """
+    Call `check(**row)` for every row of `cases`, and fail listing the location
+    of every failing row.
+    """
+    failures = []
+    checked = 0
+    for location, row in cases.located():
+        checked += 1
+        try:
+            check(**row)
+        except Exception as error:
+            failures.append(f"{location}: {error!r}")
+    if failures:
+        shown = "\n".join(f"    {failure}" for failure in failures[:MAX_REPORTED_CASES])
+        more = len(failures) - MAX_REPORTED_CASES
+        pytest.fail(
+            f"{len(failures)} of {checked} cases failed:\n{shown}"
+            + (f"\n    ... and {more} more" if more > 0 else ""),
+            pytrace=False,
+        )
+
+
+@pytest.fixture
+def large_case_file(tmp_path):
+    """
+    A JSONL case file with 20 000 rows.
+    """
+    path = tmp_path / "large.jsonl"
+    with open(path, "w") as f:
+        for i in range(20_000):
+            f.write(json.dumps({"base": i, "expected": i * i}) + "\n")
+    return path
+
+
+class TestStreamedCases:
+    """
+    This class demonstrates parametrizing tests from case files that are read
+    row by row while the test runs, instead of literal lists in the source.
+    """
+
+    @pytest.mark.parametrize("cases", stream_cases(DATA / "dict_values.jsonl"))
+    def test_dict_values(self, cases):
+        """
+        The cases of `TestParametrization.test_dict_values`, read from a JSONL
+        file.
+        """
+
+        def check(person, request_param, expected_value):
+            assert person[request_param] == expected_value
+
+        check_cases(cases, check)
+
+    @pytest.mark.parametrize("cases", stream_cases(DATA / "exceptions.csv"))
+    def test_multiple_exceptions(self, cases):
+        """
+        The cases of `TestExceptionHandling.test_multiple_exceptions`, read
+        from a CSV file.
+        """
+        exceptions = {
+            "ValueError": ValueError,
+            "KeyError": KeyError,
+            "CustomException": CustomException,
+        }
+
+        def check(input_value, expected_exception, expected_message):
+            with pytest.raises(exceptions[expected_exception], match=expected_message):
+                function_that_raises(int(input_value))
+
+        check_cases(cases, check)
+
+    def test_shards_cover_every_row_once(self, large_case_file):
+        """
+        Splitting by bytes never cuts a row in half or reads it twice.
+        """
+        shards = [param.values[0] for param in stream_cases(large_case_file, 7)]
+        rows = [row["base"] for shard in shards for row in shard]
+
+        assert rows == list(range(20_000))
+        assert shards[0].start == 0
+        assert shards[-1].stop == os.path.getsize(large_case_file)
+
+    def test_streaming_uses_little_memory(self, large_case_file):
+        """
+        Neither splitting the file nor iterating over a shard keeps the rows in
+        memory.
+        """
+        with traced_memory() as memory:
+            (param,) = stream_cases(large_case_file)
+            assert all(row["base"] ** 2 == row["expected"] for row in param.values[0])
+        assert memory.peak < 1024 * 1024
+
+    def test_multi_line_records_are_rejected(self, tmp_path):
+        """
+        A quoted CSV field containing a newline cannot be split into ranges,
+        so it is reported instead of being read as two broken rows.
+        """
+        path = tmp_path / "cases.csv"
+        path.write_text('name,text\nfirst,"one line"\nsecond,"two\nlines"\n')
+        (param,) = stream_cases(path)
+
+        with pytest.raises(ValueError, match="cases.csv@27: a quoted field spans"):
+            list(param.values[0])
+
+    def test_failing_cases_are_located(self, pytester):
+        """
+        A failing case is reported with its position in the file.
+        """
+        pytester.path.joinpath("cases.jsonl").write_text(
+            '{"number": 1, "expected": 2}\n{"number": 2, "expected": 4}\n'
+        )
+        pytester.makepyfile("""
+            import pytest
+            from tests.test_streamed_cases import check_cases, stream_cases
+
+            @pytest.mark.parametrize("cases", stream_cases("cases.jsonl"))
+            def test_add_one(cases):
+                def check(number, expected):
+                    assert number + 1 == expected
+
+                check_cases(cases, check)
+            """)
+        result = pytester.runpytest()
+
+        result.assert_outcomes(failed=1)
+        result.stdout.fnmatch_lines(
+            ["*1 of 2 cases failed:", "*cases.jsonl@29: AssertionError*"]
+        )
+
+    def test_parquet(self, tmp_path):
+        """
+        Parquet files are split by row group.
+        """
+        pyarrow = pytest.importorskip("pyarrow")
+        import pyarrow.parquet
+
+        path = tmp_path / "cases.parquet"
+        table = pyarrow.table({"base": range(1000), "expected": range(1000)})
+        pyarrow.parquet.write_table(table, path, row_group_size=100)
+
+        shards = [param.values[0] for param in stream_cases(path, 3)]
+        assert [row["base"] for shard in shards for row in shard] == list(range(1000))
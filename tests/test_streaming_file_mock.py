@@ -0,0 +1,238 @@
+import builtins
+import io
+import mmap
+import os
+from unittest import mock
+
+import pytest
+
+from tests.plugins.memory_profiling import traced_memory
+
+
+class StreamSource(io.RawIOBase):
+    """
+    A read-only raw stream serving content from a buffer or from chunks.
+
+    `source` can be anything supporting the buffer protocol (`bytes`,
+    `bytearray`, `memoryview` or an `mmap.mmap`), or an iterable of `bytes`
+    chunks such as a generator. Buffers are served through a `memoryview`, so
+    `readinto` copies straight from the source into the caller's buffer and
+    the stream is seekable. Chunks are pulled from the iterable on demand, so
+    a generator producing gigabytes of data never has to be held in memory.
+    """
+
+    def __init__(self, source):
+        super().__init__()
+        self._position = 0
+        if isinstance(source, str):
+            source = source.encode()
+        try:
+            self._view = memoryview(source).cast("B")
+            self._chunks = None
+        except TypeError:
+            self._view = None
+            self._chunks = iter(source)
+            self._pending = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return self._view is not None
+
+    def readinto(self, buffer):
+        target = memoryview(buffer).cast("B")
+        if self._view is not None:
+            chunk = self._view[self._position : self._position + len(target)]
+        else:
+            while not self._pending:
+                try:
+                    self._pending = memoryview(next(self._chunks)).cast("B")
+                except StopIteration:
+                    return 0
+            chunk = self._pending[: len(target)]
+            self._pending = self._pending[len(chunk) :]
+        target[: len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if self._view is None:
+            raise io.UnsupportedOperation("seek on a chunked source")
+        start = {os.SEEK_SET: 0, os.SEEK_CUR: self._position}.get(
+            whence, len(self._view)
+        )
+        self._position = max(start + offset, 0)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+
+def open_stream(source, mode="r", encoding=None, errors=None, newline=None):
+    """
+    Open `source` like `open` would open a file, in text or binary mode.
+    """
+    if any(flag in mode for flag in "wax+"):
+        raise io.UnsupportedOperation(f"Mocked files are read-only, got mode {mode!r}")
+    stream = io.BufferedReader(StreamSource(source))
+    if "b" in mode:
+        return stream
+    return io.TextIOWrapper(
+        stream, encoding=encoding or "utf-8", errors=errors, newline=newline
+    )
+
+
+def map_file(path):
+    """
+    Memory-map a real file, to be used as the content of a mocked file.
+    """
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+@pytest.fixture
+def mock_file():
+    """
+    Patch `open` to serve streamed content, a replacement for `mock.mock_open`.
+
+    Call the fixture with the content and optionally the paths that should be
+    mocked, every other path is opened for real. `content` can also be a
+    function returning a new iterable of chunks, which is called for every
+    `open`, so a generator can be read more than once. The returned mock records
+    the calls to `open`, just like `mock.mock_open`.
+    """
+    real_open = builtins.open
+    patchers = []
+
+    def install(content, paths=None):
+        def fake_open(
+            file,
+            mode="r",
+            buffering=-1,
+            encoding=None,
+            errors=None,
+            newline=None,
+            *args,
+            **kwargs,
+        ):
+            # A file descriptor, like from `os.open`, has no path to select.
+            if paths is not None and (
+                isinstance(file, int) or os.fspath(file) not in paths
+            ):
+                return real_open(
+                    file, mode, buffering, encoding, errors, newline, *args, **kwargs
+                )
+            source = content() if callable(content) else content
+            return open_stream(source, mode, encoding, errors, newline)
+
+        patcher = mock.patch("builtins.open", side_effect=fake_open)
+        patchers.append(patcher)
+        return patcher.start()
+
+    yield install
+    for patcher in reversed(patchers):
+        patcher.stop()
+
+
+def count_lines(path):
+    """
+    Function for demonstration purposes, a parser reading a file line by line.
+    """
+    with open(path) as f:
+        return sum(1 for _ in f)
+
+
+class TestStreamingFileMock:
+    """
+    This class demonstrates a file mock that streams its content, which makes
+    it possible to feed large inputs to the code under test.
+    """
+
+    def test_mock_file(self, mock_file):
+        """
+        The same test as `test_mock_file_pytest` in the mocking section.
+        """
+        mocked_open = mock_file("mocked file content")
+
+        with open("dummy_file.txt") as f:
+            assert f.read() == "mocked file content"
+        mocked_open.assert_called_once_with("dummy_file.txt")
+
+    def test_binary_chunks_and_seek(self, mock_file):
+        """
+        Binary mode supports `read(n)`, `readinto` and seeking.
+        """
+        mock_file(bytes(range(256)))
+
+        with open("dummy_file.bin", "rb") as f:
+            assert f.read(4) == b"\x00\x01\x02\x03"
+            buffer = bytearray(4)
+            assert f.readinto(buffer) == 4
+            assert buffer == b"\x04\x05\x06\x07"
+            f.seek(-2, os.SEEK_END)
+            assert f.read() == b"\xfe\xff"
+
+    def test_generator_content(self, mock_file):
+        """
+        A generator is consumed lazily, a new one is created for every `open`
+        when a function is passed.
+        """
+
+        def lines():
+            for i in range(3):
+                yield f"line {i}\n".encode()
+
+        mock_file(lines)
+
+        with open("dummy_file.txt") as f:
+            assert list(f) == ["line 0\n", "line 1\n", "line 2\n"]
+        assert count_lines("dummy_file.txt") == 3
+
+    def test_only_selected_paths_are_mocked(self, mock_file, tmp_path):
+        """
+        Paths that are not listed are opened for real.
+        """
+        real_file = tmp_path / "real.txt"
+        real_file.write_text("real content")
+        mock_file("mocked file content", paths={"dummy_file.txt"})
+
+        with open("dummy_file.txt") as f:
+            assert f.read() == "mocked file content"
+        with open(real_file) as f:
+            assert f.read() == "real content"
+        with open(os.open(real_file, os.O_RDONLY)) as f:
+            assert f.read() == "real content"
+
+    def test_memory_mapped_file(self, mock_file, tmp_path):
+        """
+        Content can be served straight from a memory-mapped file.
+        """
+        real_file = tmp_path / "input.txt"
+        real_file.write_bytes(b"first\nsecond\n")
+        mock_file(map_file(real_file))
+
+        assert count_lines("dummy_file.txt") == 2
+
+    def test_large_input_uses_little_memory(self, mock_file):
+        """
+        Reading 16 MiB of generated lines does not keep them in memory.
+        """
+
+        def lines():
+            chunk = b"x" * 63 + b"\n"
+            for _ in range(256):
+                yield chunk * 1024
+
+        mock_file(lines)
+        with traced_memory() as memory:
+            assert count_lines("huge_file.txt") == 256 * 1024
+        assert memory.peak < 4 * 1024 * 1024
+
+    def test_write_is_rejected(self, mock_file):
+        """
+        Mocked files are read-only.
+        """
+        mock_file("mocked file content")
+        with pytest.raises(io.UnsupportedOperation, match="read-only"):
+            open("dummy_file.txt", "w")
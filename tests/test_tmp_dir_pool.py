@@ -0,0 +1,250 @@
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+RAM_BACKED_ROOT = "/dev/shm"
+
+
+class TempDirPool:
+    """
+    A pool of recycled temporary directories.
+
+    `tmp_path` creates a new directory for every test and keeps the last few
+    runs around on disk. This pool instead hands out directories from a small
+    set that is emptied and reused between tests. When `/dev/shm` is available
+    the directories live on tmpfs, so no file ever touches the disk.
+
+    A test that leaves more than `max_bytes` behind in its directory fails at
+    teardown, and no directory is handed out while the directories in use hold
+    more than `max_bytes` together, so the pool cannot grow past the limit by
+    handing out more directories. The limit is checked, it is not a quota: a
+    single test can still write more than `max_bytes` before it is done.
+    """
+
+    def __init__(self, base=None, max_bytes=16 * 1024 * 1024, size=4):
+        if base is None:
+            base = RAM_BACKED_ROOT if os.access(RAM_BACKED_ROOT, os.W_OK) else None
+        self.root = tempfile.mkdtemp(prefix="pytest-pool-", dir=base)
+        self.max_bytes = max_bytes
+        self.size = size
+        self.created = 0
+        self._idle = []
+
+    def acquire(self):
+        """
+        Return an empty directory, reusing an idle one when possible.
+
+        Raises `RuntimeError` when the pool already holds more than
+        `max_bytes`.
+        """
+        used = self.usage()
+        if used > self.max_bytes:
+            raise RuntimeError(
+                f"The temporary directories in use hold {used} bytes, "
+                f"the limit is {self.max_bytes} bytes"
+            )
+        if self._idle:
+            return self._idle.pop()
+        self.created += 1
+        path = os.path.join(self.root, str(self.created))
+        os.mkdir(path)
+        return path
+
+    def release(self, path):
+        """
+        Empty the directory and put it back in the pool.
+
+        Returns the number of bytes that were left in the directory.
+        """
+        used = _clear_directory(path)
+        if len(self._idle) < self.size:
+            self._idle.append(path)
+        else:
+            os.rmdir(path)
+        return used
+
+    def usage(self):
+        """
+        Return the number of bytes stored in the directories of the pool.
+
+        Idle directories are empty, so only the directories in use count.
+        """
+        return _directory_size(self.root)
+
+    def close(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def _directory_size(path):
+    used = 0
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                used += _directory_size(entry.path)
+            else:
+                used += entry.stat(follow_symlinks=False).st_size
+    return used
+
+
+def _clear_directory(path):
+    used = 0
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                used += _clear_directory(entry.path)
+                os.rmdir(entry.path)
+            else:
+                used += entry.stat(follow_symlinks=False).st_size
+                os.unlink(entry.path)
+    return used
+
+
+@pytest.fixture(scope="session")
+def tmp_dir_pool():
+    """
+    Session wide pool backing the `pooled_tmp_path` fixture.
+    """
+    pool = TempDirPool()
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def pooled_tmp_path(tmp_dir_pool):
+    """
+    A drop-in replacement for `tmp_path` that uses a recycled directory.
+
+    Just like `tmp_path` it provides an empty `pathlib.Path`, but the content is
+    removed as soon as the test is done.
+    """
+    path = tmp_dir_pool.acquire()
+    yield Path(path)
+    used = tmp_dir_pool.release(path)
+    if used > tmp_dir_pool.max_bytes:
+        pytest.fail(
+            f"Test left {used} bytes in its temporary directory, "
+            f"the limit is {tmp_dir_pool.max_bytes} bytes"
+        )
+
+
+class TestTempDirPool:
+    """
+    This class demonstrates a pooled alternative to the `tmp_path` fixture.
+    """
+
+    def test_temp_file(self, pooled_tmp_path):
+        """
+        The pooled directory is used in exactly the same way as `tmp_path`.
+        """
+        file = pooled_tmp_path / "temp_file.txt"
+        file.write_text("Temporary file content")
+        assert file.read_text() == "Temporary file content"
+
+    def test_directory_is_recycled_empty(self):
+        """
+        A released directory is emptied and handed out again.
+        """
+        pool = TempDirPool()
+        try:
+            first = pool.acquire()
+            os.makedirs(os.path.join(first, "dummy_directory"))
+            with open(os.path.join(first, "dummy_directory", "file1.txt"), "w") as f:
+                f.write("content1")
+
+            assert pool.release(first) == len("content1")
+            second = pool.acquire()
+            assert second == first
+            assert os.listdir(second) == []
+        finally:
+            pool.close()
+
+    def test_pool_size_is_bounded(self):
+        """
+        Directories released while the pool is full are removed.
+        """
+        pool = TempDirPool(size=1)
+        try:
+            paths = [pool.acquire() for _ in range(3)]
+            for path in paths:
+                pool.release(path)
+            assert len(os.listdir(pool.root)) == 1
+        finally:
+            pool.close()
+
+    def test_total_size_is_bounded(self):
+        """
+        Directories in use count towards `max_bytes` together, no directory is
+        handed out while they hold more than that.
+        """
+        pool = TempDirPool(max_bytes=100)
+        try:
+            first = pool.acquire()
+            Path(first, "first.txt").write_text("x" * 80)
+            second = pool.acquire()
+            Path(second, "second.txt").write_text("x" * 40)
+
+            with pytest.raises(RuntimeError, match="hold 120 bytes"):
+                pool.acquire()
+            pool.release(first)
+            assert pool.acquire() == first
+            assert pool.usage() == 40 <= pool.max_bytes
+        finally:
+            pool.close()
+
+    def test_byte_limit(self, pytester):
+        """
+        A test that writes more than `max_bytes` fails during teardown.
+        """
+        pytester.makeconftest("""
+            import pytest
+            from tests.test_tmp_dir_pool import TempDirPool, pooled_tmp_path
+
+            @pytest.fixture(scope="session")
+            def tmp_dir_pool():
+                pool = TempDirPool(max_bytes=10)
+                yield pool
+                pool.close()
+            """)
+        pytester.makepyfile("""
+            def test_small(pooled_tmp_path):
+                (pooled_tmp_path / "small.txt").write_text("tiny")
+
+            def test_large(pooled_tmp_path):
+                (pooled_tmp_path / "large.txt").write_text("x" * 100)
+            """)
+        result = pytester.runpytest()
+        result.assert_outcomes(passed=2, errors=1)
+        result.stdout.fnmatch_lines(["*left 100 bytes*limit is 10 bytes*"])
+
+    @pytest.mark.benchmark
+    @pytest.mark.parametrize("tests", [10_000])
+    def test_benchmark_against_tmp_path(self, pytester, tests):
+        """
+        Runs the same generated suite with `tmp_path` and with
+        `pooled_tmp_path` and prints the wall time of both runs.
+        """
+        pytester.makeconftest(
+            "from tests.test_tmp_dir_pool import tmp_dir_pool, pooled_tmp_path"
+        )
+        durations = {}
+        for fixture in ["tmp_path", "pooled_tmp_path"]:
+            pytester.makepyfile(test_suite=f"""
+                import pytest
+
+                @pytest.mark.parametrize("i", range({tests}))
+                def test_write(i, {fixture}):
+                    (({fixture}) / "file.txt").write_text(str(i))
+                """)
+            start = time.perf_counter()
+            result = pytester.runpytest("-q", "-p", "no:cacheprovider")
+            durations[fixture] = time.perf_counter() - start
+            result.assert_outcomes(passed=tests)
+
+        print(
+            f"{tests} tests: tmp_path {durations['tmp_path']:.2f}s, "
+            f"pooled_tmp_path {durations['pooled_tmp_path']:.2f}s"
+        )
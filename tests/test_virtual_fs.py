@@ -0,0 +1,626 @@
+import builtins
+import collections
+import contextlib
+import errno
+import io
+import os
+import stat
+import time
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+_DELETED = object()
+# Snapshots stack layers, past this depth the frozen layers are merged into one.
+_MAX_LAYERS = 8
+
+
+def _error(cls, code, path):
+    return cls(code, os.strerror(code), path)
+
+
+def _freeze(chain):
+    # Returns a chain with the layers of `chain` frozen and a new top layer.
+    if len(chain.maps) < _MAX_LAYERS:
+        return chain.new_child()
+    merged = {key: value for key, value in chain.items() if value is not _DELETED}
+    return collections.ChainMap({}, merged)
+
+
+class _VirtualFile(io.BytesIO):
+    def __init__(self, fs, path, content, writable, fd=None):
+        super().__init__(content)
+        self._fs = fs
+        self._path = path
+        self._writable = writable
+        self._fd = fd
+
+    def writable(self):
+        return self._writable
+
+    def write(self, data):
+        if not self._writable:
+            raise io.UnsupportedOperation("not writable")
+        return super().write(data)
+
+    def close(self):
+        if not self.closed and self._writable:
+            self._fs._files.maps[0][self._path] = self.getvalue()
+        if self._fd is not None:
+            # Stands in for a descriptor returned by `os.open`.
+            self._fs._descriptors.pop(self._fd, None)
+            self._fs._real["close"](self._fd)
+            self._fd = None
+        super().close()
+
+
+class _DirEntry:
+    def __init__(self, fs, directory, name):
+        self._fs = fs
+        self.name = name
+        self.path = os.path.join(directory, name)
+
+    def is_dir(self, follow_symlinks=True):
+        return self._fs._is_dir(self._fs._normalize(self.path))
+
+    def is_file(self, follow_symlinks=True):
+        return self._fs._is_file(self._fs._normalize(self.path))
+
+    def is_symlink(self):
+        return False
+
+    def stat(self, follow_symlinks=True):
+        return self._fs.stat(self.path)
+
+    def inode(self):
+        return self.stat().st_ino
+
+    def __fspath__(self):
+        return self.path
+
+
+class _ScandirIterator:
+    def __init__(self, entries):
+        self._entries = iter(entries)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._entries)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._entries = iter(())
+
+
+class VirtualFS:
+    """
+    An in-memory filesystem that can be installed in place of the real one.
+
+    Every path below `root` is served from memory by consistent replacements
+    of `open`, `os.open`, `os.listdir`, `os.scandir`, `os.stat`, `os.utime`,
+    `os.mkdir`, `os.remove`, `os.rmdir`, `os.rename` and `os.replace`, and of
+    `os.read`, `os.write` and `os.close` for the descriptors of `os.open`.
+    Since `os.walk`, `os.path` and `pathlib.Path` are built on top of those
+    functions, they see the same files. Paths outside `root` are passed on to
+    the real filesystem, renaming between the two fails like renaming across
+    devices.
+
+    `snapshot` returns a copy-on-write copy, so a large tree can be built once
+    and every test can get its own copy to modify.
+    """
+
+    def __init__(self, root, files=None):
+        self.root = os.path.abspath(root)
+        self._files = collections.ChainMap({})
+        self._children = collections.ChainMap({self.root: set()})
+        self._descriptors = {}
+        for path, content in (files or {}).items():
+            self._add(os.path.join(self.root, path), content)
+
+    @classmethod
+    def from_directory(cls, directory, root=None):
+        """
+        Build a virtual filesystem from a snapshot of a real directory tree.
+        """
+        fs = cls(root or directory)
+        for dirpath, dirnames, filenames in os.walk(directory):
+            relative = os.path.relpath(dirpath, directory)
+            for dirname in dirnames:
+                fs._add(os.path.join(fs.root, relative, dirname) + os.sep, None)
+            for filename in filenames:
+                with open(os.path.join(dirpath, filename), "rb") as f:
+                    fs._add(os.path.join(fs.root, relative, filename), f.read())
+        return fs
+
+    def snapshot(self):
+        """
+        Return a copy-on-write copy of the filesystem.
+
+        The layers of the filesystem are shared by the copy, only the changes
+        made since the last snapshot are frozen into a new layer, so taking
+        many snapshots of an unchanged tree does not make lookups slower.
+        """
+        if self._files.maps[0] or self._children.maps[0]:
+            # Freeze the current layer, both copies write to a new layer on top.
+            self._files = _freeze(self._files)
+            self._children = _freeze(self._children)
+        copy = object.__new__(VirtualFS)
+        copy.root = self.root
+        copy._files = collections.ChainMap({}, *self._files.maps[1:])
+        copy._children = collections.ChainMap({}, *self._children.maps[1:])
+        copy._descriptors = {}
+        return copy
+
+    def _add(self, path, content):
+        path = os.path.normpath(path)
+        self._ensure_directory(os.path.dirname(path))
+        if content is None:
+            self._ensure_directory(path)
+        else:
+            if isinstance(content, str):
+                content = content.encode()
+            self._files.maps[0][path] = content
+            self._writable_children(os.path.dirname(path)).add(os.path.basename(path))
+
+    def _ensure_directory(self, path):
+        if self._is_dir(path):
+            return
+        self._ensure_directory(os.path.dirname(path))
+        self._children.maps[0][path] = set()
+        self._writable_children(os.path.dirname(path)).add(os.path.basename(path))
+
+    def _writable_children(self, directory):
+        # Copy the set of names into the top layer before changing it.
+        top = self._children.maps[0]
+        if directory not in top:
+            top[directory] = set(self._children[directory])
+        return top[directory]
+
+    def _normalize(self, path):
+        if isinstance(path, int):
+            return None
+        path = os.fspath(path)
+        if isinstance(path, bytes):
+            return None
+        path = os.path.normpath(os.path.join(os.getcwd(), path))
+        if path == self.root or path.startswith(self.root + os.sep):
+            return path
+        return None
+
+    def _is_dir(self, path):
+        return self._children.get(path, _DELETED) is not _DELETED
+
+    def _is_file(self, path):
+        return self._files.get(path, _DELETED) is not _DELETED
+
+    def _remove(self, path):
+        self._writable_children(os.path.dirname(path)).discard(os.path.basename(path))
+
+    def _move(self, source, destination):
+        # Moves a file, or a directory with everything below it.
+        prefix = source + os.sep
+        for layers in (self._files, self._children):
+            moved = [
+                (path, value)
+                for path, value in layers.items()
+                if value is not _DELETED and (path == source or path.startswith(prefix))
+            ]
+            for path, value in moved:
+                layers.maps[0][path] = _DELETED
+            for path, value in moved:
+                layers.maps[0][destination + path[len(source) :]] = value
+        self._remove(source)
+        self._writable_children(os.path.dirname(destination)).add(
+            os.path.basename(destination)
+        )
+
+    # Replacements of the real functions, installed by `installed`.
+
+    def open(
+        self,
+        file,
+        mode="r",
+        buffering=-1,
+        encoding=None,
+        errors=None,
+        newline=None,
+        *args,
+        **kwargs,
+    ):
+        path = self._normalize(file)
+        if path is None:
+            return self._real["open"](
+                file, mode, buffering, encoding, errors, newline, *args, **kwargs
+            )
+        if self._is_dir(path):
+            raise _error(IsADirectoryError, errno.EISDIR, file)
+        if not self._is_dir(os.path.dirname(path)):
+            raise _error(FileNotFoundError, errno.ENOENT, file)
+
+        exists = self._is_file(path)
+        if "x" in mode and exists:
+            raise _error(FileExistsError, errno.EEXIST, file)
+        if "r" in mode and not exists:
+            raise _error(FileNotFoundError, errno.ENOENT, file)
+        if "w" in mode or "x" in mode or not exists:
+            content = b""
+            self._add(path, content)
+        else:
+            content = self._files[path]
+
+        writable = any(flag in mode for flag in "wax+")
+        f = _VirtualFile(self, path, content, writable)
+        if "a" in mode:
+            f.seek(0, os.SEEK_END)
+        if "b" in mode:
+            return f
+        return io.TextIOWrapper(
+            f, encoding=encoding or "utf-8", errors=errors, newline=newline
+        )
+
+    def os_open(self, path, flags, mode=0o777, *, dir_fd=None):
+        normalized = self._normalize(path)
+        if normalized is None:
+            return self._real["os_open"](path, flags, mode, dir_fd=dir_fd)
+        if self._is_dir(normalized):
+            raise _error(IsADirectoryError, errno.EISDIR, path)
+        if not self._is_dir(os.path.dirname(normalized)):
+            raise _error(FileNotFoundError, errno.ENOENT, path)
+        exists = self._is_file(normalized)
+        if exists and flags & os.O_CREAT and flags & os.O_EXCL:
+            raise _error(FileExistsError, errno.EEXIST, path)
+        if not exists and not flags & os.O_CREAT:
+            raise _error(FileNotFoundError, errno.ENOENT, path)
+        if not exists or flags & os.O_TRUNC:
+            self._add(normalized, b"")
+        # A real descriptor, so the number is unique and can be closed.
+        fd = self._real["os_open"](os.devnull, os.O_RDONLY)
+        writable = flags & (os.O_WRONLY | os.O_RDWR) != 0
+        f = _VirtualFile(self, normalized, self._files[normalized], writable, fd)
+        if flags & os.O_APPEND:
+            f.seek(0, os.SEEK_END)
+        self._descriptors[fd] = f
+        return fd
+
+    def read(self, fd, n):
+        if fd not in self._descriptors:
+            return self._real["read"](fd, n)
+        return self._descriptors[fd].read(n)
+
+    def write(self, fd, data):
+        if fd not in self._descriptors:
+            return self._real["write"](fd, data)
+        return self._descriptors[fd].write(data)
+
+    def close(self, fd):
+        if fd not in self._descriptors:
+            return self._real["close"](fd)
+        self._descriptors[fd].close()
+
+    def listdir(self, path="."):
+        normalized = self._normalize(path)
+        if normalized is None:
+            return self._real["listdir"](path)
+        if not self._is_dir(normalized):
+            if self._is_file(normalized):
+                raise _error(NotADirectoryError, errno.ENOTDIR, path)
+            raise _error(FileNotFoundError, errno.ENOENT, path)
+        return sorted(self._children[normalized])
+
+    def scandir(self, path="."):
+        if self._normalize(path) is None:
+            return self._real["scandir"](path)
+        names = self.listdir(path)
+        return _ScandirIterator(
+            _DirEntry(self, os.fspath(path), name) for name in names
+        )
+
+    def stat(self, path, *, dir_fd=None, follow_symlinks=True):
+        normalized = self._normalize(path)
+        if normalized is None:
+            real = self._real["stat" if follow_symlinks else "lstat"]
+            return real(path, dir_fd=dir_fd)
+        if self._is_dir(normalized):
+            mode, size = stat.S_IFDIR | 0o755, 0
+        elif self._is_file(normalized):
+            mode, size = stat.S_IFREG | 0o644, len(self._files[normalized])
+        else:
+            raise _error(FileNotFoundError, errno.ENOENT, path)
+        now = int(time.time())
+        return os.stat_result((mode, hash(normalized), 0, 1, 0, 0, size, now, now, now))
+
+    def lstat(self, path, *, dir_fd=None):
+        return self.stat(path, dir_fd=dir_fd, follow_symlinks=False)
+
+    def utime(self, path, *args, **kwargs):
+        normalized = self._normalize(path)
+        if normalized is None:
+            return self._real["utime"](path, *args, **kwargs)
+        # The times are not stored, `stat` always reports the current time.
+        if not self._is_dir(normalized) and not self._is_file(normalized):
+            raise _error(FileNotFoundError, errno.ENOENT, path)
+
+    def mkdir(self, path, mode=0o777, *, dir_fd=None):
+        normalized = self._normalize(path)
+        if normalized is None:
+            return self._real["mkdir"](path, mode, dir_fd=dir_fd)
+        if self._is_dir(normalized) or self._is_file(normalized):
+            raise _error(FileExistsError, errno.EEXIST, path)
+        if not self._is_dir(os.path.dirname(normalized)):
+            raise _error(FileNotFoundError, errno.ENOENT, path)
+        self._ensure_directory(normalized)
+
+    def remove(self, path, *, dir_fd=None):
+        normalized = self._normalize(path)
+        if normalized is None:
+            return self._real["remove"](path, dir_fd=dir_fd)
+        if not self._is_file(normalized):
+            raise _error(FileNotFoundError, errno.ENOENT, path)
+        self._files.maps[0][normalized] = _DELETED
+        self._remove(normalized)
+
+    def rmdir(self, path, *, dir_fd=None):
+        normalized = self._normalize(path)
+        if normalized is None:
+            return self._real["rmdir"](path, dir_fd=dir_fd)
+        if not self._is_dir(normalized):
+            raise _error(FileNotFoundError, errno.ENOENT, path)
+        if self._children[normalized]:
+            raise _error(OSError, errno.ENOTEMPTY, path)
+        self._children.maps[0][normalized] = _DELETED
+        self._remove(normalized)
+
+    def rename(self, src, dst, *, src_dir_fd=None, dst_dir_fd=None):
+        source, destination = self._normalize(src), self._normalize(dst)
+        if source is None and destination is None:
+            return self._real["rename"](
+                src, dst, src_dir_fd=src_dir_fd, dst_dir_fd=dst_dir_fd
+            )
+        if source is None or destination is None:
+            raise _error(OSError, errno.EXDEV, src)
+        if not self._is_dir(source) and not self._is_file(source):
+            raise _error(FileNotFoundError, errno.ENOENT, src)
+        if not self._is_dir(os.path.dirname(destination)):
+            raise _error(FileNotFoundError, errno.ENOENT, dst)
+        if source == destination:
+            return
+        if self._is_dir(source):
+            if destination.startswith(source + os.sep):
+                raise _error(OSError, errno.EINVAL, src)
+            if self._is_file(destination):
+                raise _error(NotADirectoryError, errno.ENOTDIR, dst)
+            if self._is_dir(destination):
+                self.rmdir(destination)
+        elif self._is_dir(destination):
+            raise _error(IsADirectoryError, errno.EISDIR, dst)
+        self._move(source, destination)
+
+    def replace(self, src, dst, *, src_dir_fd=None, dst_dir_fd=None):
+        source, destination = self._normalize(src), self._normalize(dst)
+        if source is None and destination is None:
+            return self._real["replace"](
+                src, dst, src_dir_fd=src_dir_fd, dst_dir_fd=dst_dir_fd
+            )
+        self.rename(src, dst)
+
+    @contextlib.contextmanager
+    def installed(self):
+        """
+        Install the virtual filesystem for the duration of the `with` block.
+        """
+        replacements = {
+            (builtins, "open"): self.open,
+            (io, "open"): self.open,
+            (os, "open"): self.os_open,
+            (os, "read"): self.read,
+            (os, "write"): self.write,
+            (os, "close"): self.close,
+            (os, "listdir"): self.listdir,
+            (os, "scandir"): self.scandir,
+            (os, "stat"): self.stat,
+            (os, "lstat"): self.lstat,
+            (os, "utime"): self.utime,
+            (os, "mkdir"): self.mkdir,
+            (os, "remove"): self.remove,
+            (os, "unlink"): self.remove,
+            (os, "rmdir"): self.rmdir,
+            (os, "rename"): self.rename,
+            (os, "replace"): self.replace,
+        }
+        self._real = {
+            name: getattr(module, name) for module, name in replacements if module is os
+        }
+        self._real["open"] = builtins.open
+        self._real["os_open"] = os.open
+        with contextlib.ExitStack() as stack:
+            for (module, name), replacement in replacements.items():
+                stack.enter_context(mock.patch.object(module, name, replacement))
+            yield self
+
+
+@pytest.fixture
+def virtual_fs():
+    """
+    Provide an empty `VirtualFS` rooted at `/virtual`, installed for the test.
+    """
+    fs = VirtualFS("/virtual")
+    with fs.installed():
+        yield fs
+
+
+@pytest.fixture(scope="module")
+def large_tree():
+    """
+    A virtual tree with 100 directories of 1000 files each, built once per module.
+    """
+    return VirtualFS(
+        "/virtual",
+        {f"dir{d}/file{f}.txt": f"{d}-{f}" for d in range(100) for f in range(1000)},
+    )
+
+
+@pytest.fixture
+def large_fs(large_tree):
+    """
+    A copy-on-write snapshot of `large_tree`, installed for the test.
+    """
+    fs = large_tree.snapshot()
+    with fs.installed():
+        yield fs
+
+
+class TestVirtualFS:
+    """
+    This class demonstrates an in-memory filesystem, where every way of
+    looking at the files agrees on what is there.
+    """
+
+    def test_mock_directory(self, virtual_fs):
+        """
+        The same test as `test_mock_directory_pytest` in the mocking section,
+        without touching the disk or patching `os.listdir` separately.
+        """
+        d = Path("/virtual/dummy_directory")
+        d.mkdir()
+        (d / "file1.txt").write_text("content1")
+        (d / "file2.txt").write_text("content2")
+
+        assert sorted(os.listdir(d)) == ["file1.txt", "file2.txt"]
+        assert [p.name for p in sorted(d.iterdir())] == ["file1.txt", "file2.txt"]
+        assert os.path.isfile(d / "file1.txt")
+        assert os.stat(d / "file2.txt").st_size == len("content2")
+        with open(d / "file1.txt") as f:
+            assert f.read() == "content1"
+
+    def test_seed_from_dict(self):
+        """
+        A filesystem can be seeded from a dictionary of paths and contents,
+        `None` creates an empty directory.
+        """
+        fs = VirtualFS("/virtual", {"data/config.json": "{}", "empty/": None})
+        with fs.installed():
+            assert sorted(os.listdir("/virtual")) == ["data", "empty"]
+            assert os.listdir("/virtual/empty") == []
+            assert Path("/virtual/data/config.json").read_text() == "{}"
+
+    def test_walk(self, large_fs):
+        """
+        `os.walk` runs over 100 000 files without any disk access.
+        """
+        files = sum(len(filenames) for _, _, filenames in os.walk("/virtual"))
+        assert files == 100_000
+
+    def test_snapshots_are_isolated(self, large_tree):
+        """
+        Changes in one snapshot are not visible in the tree or in other
+        snapshots.
+        """
+        first = large_tree.snapshot()
+        with first.installed():
+            os.remove("/virtual/dir0/file0.txt")
+            Path("/virtual/dir0/new.txt").write_text("new")
+            assert len(os.listdir("/virtual/dir0")) == 1000
+
+        second = large_tree.snapshot()
+        with second.installed():
+            assert os.path.exists("/virtual/dir0/file0.txt")
+            assert not os.path.exists("/virtual/dir0/new.txt")
+
+    def test_snapshot_of_real_tree(self, tmp_path):
+        """
+        A real directory can be copied into memory, after which changes do not
+        touch the disk.
+        """
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "file.txt").write_text("real content")
+        fs = VirtualFS.from_directory(tmp_path)
+
+        with fs.installed():
+            assert (tmp_path / "sub" / "file.txt").read_text() == "real content"
+            (tmp_path / "sub" / "file.txt").write_text("virtual content")
+            assert (tmp_path / "sub" / "file.txt").read_text() == "virtual content"
+        assert (tmp_path / "sub" / "file.txt").read_text() == "real content"
+
+    def test_touch_and_rename(self, virtual_fs):
+        """
+        `Path.touch`, `os.open` and renaming work on virtual paths, without
+        touching the disk.
+        """
+        d = Path("/virtual/dummy_directory")
+        d.mkdir()
+        (d / "empty.txt").touch()
+        (d / "file1.txt").write_text("content1")
+        (d / "file1.txt").touch()
+        assert (d / "empty.txt").read_text() == ""
+        assert (d / "file1.txt").read_text() == "content1"
+        with pytest.raises(FileExistsError):
+            (d / "empty.txt").touch(exist_ok=False)
+
+        fd = os.open(d / "low_level.txt", os.O_CREAT | os.O_WRONLY)
+        os.write(fd, b"written")
+        os.close(fd)
+        assert (d / "low_level.txt").read_bytes() == b"written"
+
+        (d / "file1.txt").rename(d / "renamed.txt")
+        os.replace(d / "low_level.txt", d / "empty.txt")
+        assert sorted(os.listdir(d)) == ["empty.txt", "renamed.txt"]
+        assert (d / "empty.txt").read_bytes() == b"written"
+
+        d.rename("/virtual/moved")
+        assert os.listdir("/virtual") == ["moved"]
+        assert Path("/virtual/moved/renamed.txt").read_text() == "content1"
+        with pytest.raises(OSError, match="cross-device"):
+            os.rename("/virtual/moved", "/tmp/moved")
+
+    def test_repeated_snapshots(self):
+        """
+        Every snapshot in a long chain of changes and snapshots keeps the files
+        as they were when it was taken, including removed ones, while the
+        layers behind them are merged.
+        """
+        fs = VirtualFS("/virtual", {"kept.txt": "kept", "removed.txt": "removed"})
+        snapshots = []
+        for i in range(50):
+            with fs.installed():
+                Path(f"/virtual/new{i}.txt").write_text(str(i))
+                if i == 25:
+                    os.remove("/virtual/removed.txt")
+            snapshots.append(fs.snapshot())
+
+        with snapshots[10].installed():
+            assert sorted(os.listdir("/virtual"))[:3] == [
+                "kept.txt",
+                "new0.txt",
+                "new1.txt",
+            ]
+            assert len(os.listdir("/virtual")) == 13
+            assert Path("/virtual/removed.txt").read_text() == "removed"
+        with snapshots[-1].installed():
+            assert len(os.listdir("/virtual")) == 51
+            assert not os.path.exists("/virtual/removed.txt")
+            assert Path("/virtual/new49.txt").read_text() == "49"
+        with fs.installed():
+            assert Path("/virtual/kept.txt").read_text() == "kept"
+
+    def test_errors(self, virtual_fs):
+        """
+        The usual exceptions are raised for missing files and directories.
+        """
+        with pytest.raises(FileNotFoundError):
+            open("/virtual/missing.txt")
+        with pytest.raises(FileNotFoundError):
+            os.listdir("/virtual/missing")
+        with pytest.raises(FileExistsError):
+            os.mkdir("/virtual")
+        Path("/virtual/dummy_directory").mkdir()
+        Path("/virtual/dummy_directory/file1.txt").write_text("content1")
+        with pytest.raises(OSError, match="not empty"):
+            os.rmdir("/virtual/dummy_directory")